@@ -0,0 +1,33 @@
+"""Load code cells from a solution notebook so benchmarks measure the real code.
+
+The workshop notebooks are self-contained and cannot be imported. This helper
+executes selected code cells (found by a marker string, skipping ``%`` and
+``!`` magics) into a module registered in ``sys.modules``, so dataclasses and
+Temporal definitions in the cells behave as they would in a kernel.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import json
+import sys
+from pathlib import Path
+from types import ModuleType
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def load_notebook(path: Path, markers: list[str], module_name: str) -> ModuleType:
+    """Run the first code cell containing each marker, in order, and return the module."""
+    cells = [c for c in json.loads(path.read_text())["cells"] if c["cell_type"] == "code"]
+    module = sys.modules.setdefault(module_name, ModuleType(module_name))
+    for marker in markers:
+        source = next(("".join(c["source"]) for c in cells if marker in "".join(c["source"])), None)
+        if source is None:
+            raise LookupError(f"No code cell in {path.name} contains {marker!r}")
+        code = "\n".join(line for line in source.splitlines() if not line.startswith(("%", "!")))
+        # Cells print progress messages meant for the notebook reader
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(compile(code, str(path), "exec"), module.__dict__)
+    return module
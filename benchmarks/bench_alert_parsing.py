@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Benchmark: full ``response.json()`` vs. streaming early-terminating alert parse.
+
+The weather activities only report the first few alerts, but used to download
+and decode the whole NWS ``/alerts/active/area/{state}`` document. They now
+stream the body through ``read_alert_properties``, which keeps only the
+``properties`` of the first N features and stops reading once it has them.
+
+This script writes NWS-shaped fixture files (GeoJSON features with polygon
+geometry and long descriptions, in the field order api.weather.gov uses) for a
+range of alert counts, serves them through an httpx mock transport in 64 KiB
+chunks, and reports time, peak Python memory and bytes read per lookup for
+both approaches. ``read_alert_properties`` is loaded from the durable agent
+solution notebook, so the benchmark measures the code the workshop runs.
+
+Fixtures are generated once into benchmarks/.fixtures (git-ignored).
+
+To run: python benchmarks/bench_alert_parsing.py --alerts 10 100 1000 3000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+from collections.abc import AsyncIterator, Awaitable, Callable
+from pathlib import Path
+
+import httpx
+from _notebook import ROOT, load_notebook
+
+NOTEBOOK = ROOT / "solutions" / "03_durable_agent" / "solution.ipynb"
+FIXTURES = Path(__file__).resolve().parent / ".fixtures"
+CHUNK_BYTES = 64 * 1024
+POLYGON_POINTS = 120
+
+
+def load_notebook_parser() -> tuple[Callable[..., Awaitable[list[dict]]], int]:
+    """Exec the notebook's import and activity cells; return (read_alert_properties, MAX_ALERTS)."""
+    notebook = load_notebook(
+        NOTEBOOK, ["import httpx", "async def read_alert_properties"], "durable_agent_notebook"
+    )
+    return notebook.read_alert_properties, notebook.MAX_ALERTS
+
+
+def write_fixture(alerts: int) -> Path:
+    """Write (once) an NWS-shaped alerts document with ``alerts`` features."""
+    path = FIXTURES / f"alerts-{alerts}.json"
+    if path.exists():
+        return path
+    rng = random.Random(alerts)
+    features = []
+    for i in range(alerts):
+        lon, lat = rng.uniform(-124, -67), rng.uniform(25, 49)
+        ring = [
+            [round(lon + rng.uniform(-1, 1), 4), round(lat + rng.uniform(-1, 1), 4)]
+            for _ in range(POLYGON_POINTS)
+        ]
+        ring.append(ring[0])
+        features.append(
+            {
+                "id": f"https://api.weather.gov/alerts/urn:oid:2.49.0.1.840.0.{i:08d}",
+                "type": "Feature",
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+                "properties": {
+                    "@id": f"https://api.weather.gov/alerts/urn:oid:2.49.0.1.840.0.{i:08d}",
+                    "areaDesc": f"County {i}; County {i + 1}",
+                    "geocode": {"SAME": [f"{rng.randrange(10**6):06d}" for _ in range(8)]},
+                    "sent": "2024-08-01T12:00:00-05:00",
+                    "severity": rng.choice(["Minor", "Moderate", "Severe", "Extreme"]),
+                    "event": rng.choice(["Flood Warning", "Heat Advisory", "Tornado Watch"]),
+                    "headline": f"Alert {i} issued August 1 at 12:00PM CDT by NWS",
+                    "description": "Flooding caused by excessive rainfall is expected. " * 20,
+                    "instruction": "Turn around, don't drown when encountering flooded roads. " * 5,
+                },
+            }
+        )
+    document = {
+        "@context": ["https://geojson.org/geojson-ld/geojson-context.jsonld"],
+        "type": "FeatureCollection",
+        "features": features,
+        "title": "Current watches, warnings, and advisories",
+        "updated": "2024-08-01T12:00:00+00:00",
+    }
+    FIXTURES.mkdir(exist_ok=True)
+    path.write_text(json.dumps(document))
+    return path
+
+
+class FixtureStream(httpx.AsyncByteStream):
+    """Serves a fixture file in chunks and counts how much of it was read."""
+
+    def __init__(self, path: Path, counter: list[int]):
+        self.path = path
+        self.counter = counter
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with self.path.open("rb") as f:
+            while chunk := f.read(CHUNK_BYTES):
+                self.counter[0] += len(chunk)
+                yield chunk
+
+
+async def measure(
+    fetch: Callable[[httpx.AsyncClient], Awaitable[list[dict]]], path: Path, repeats: int
+) -> tuple[float, float, float]:
+    """Return (ms per lookup, peak traced MiB, MiB read from the body) for one strategy."""
+    counter = [0]
+    client = httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, stream=FixtureStream(path, counter))
+        )
+    )
+    async with client:
+        await fetch(client)  # Warm up
+        counter[0] = 0
+        started = time.perf_counter()
+        for _ in range(repeats):
+            await fetch(client)
+        elapsed_ms = (time.perf_counter() - started) / repeats * 1000
+        read_mib = counter[0] / repeats / 2**20
+
+        tracemalloc.start()
+        await fetch(client)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return elapsed_ms, peak / 2**20, read_mib
+
+
+async def run(alert_counts: list[int], repeats: int) -> None:
+    read_alert_properties, max_alerts = load_notebook_parser()
+    url = "https://api.weather.gov/alerts/active/area/CA"
+
+    async def full_parse(client: httpx.AsyncClient) -> list[dict]:
+        # Before: download everything, decode everything, keep a few
+        response = await client.get(url)
+        features = response.json().get("features") or []
+        return [f.get("properties", {}) for f in features[:max_alerts]]
+
+    async def streaming_parse(client: httpx.AsyncClient) -> list[dict]:
+        # After: stream and stop once the first MAX_ALERTS alerts are parsed
+        async with client.stream("GET", url) as response:
+            return await read_alert_properties(response)
+
+    print(f"Keeping the first {max_alerts} alerts; {repeats} lookups per measurement\n")
+    print(
+        f"{'alerts':>7} {'body MiB':>9} | {'json() ms':>10} {'peak MiB':>9} {'read MiB':>9} |"
+        f" {'stream ms':>10} {'peak MiB':>9} {'read MiB':>9}"
+    )
+    for alerts in alert_counts:
+        path = write_fixture(alerts)
+        body_mib = path.stat().st_size / 2**20
+        full = await measure(full_parse, path, repeats)
+        stream = await measure(streaming_parse, path, repeats)
+        print(
+            f"{alerts:>7} {body_mib:>9.2f} | {full[0]:>10.2f} {full[1]:>9.2f} {full[2]:>9.2f} |"
+            f" {stream[0]:>10.2f} {stream[1]:>9.2f} {stream[2]:>9.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--alerts",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 3000],
+        help="Alert counts to generate fixtures for.",
+    )
+    parser.add_argument("--repeats", type=int, default=5, help="Lookups per measurement.")
+    args = parser.parse_args()
+    asyncio.run(run(args.alerts, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
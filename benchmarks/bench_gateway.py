@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""Load test: routing queries through gateway.py versus one starter.py per query.
+
+Sends the same burst of routing queries three ways and reports latency per
+request, throughput, workflows started and model calls:
+
+- ``starter``: one ``python starter.py "<query>"`` process per query, which
+  imports the SDKs and connects a client every time.
+- ``gateway``: HTTP requests to a RoutingGateway on one shared client.
+- ``gateway-eager``: the same, but the gateway shares the worker's client
+  and requests eager workflow start (``gateway.py --worker``).
+
+The queries repeat a small mix, so the gateway modes share workflows between
+identical requests in flight. Pass ``--distinct`` to make every query unique
+and measure the gateway without that.
+
+Every mode runs against a Temporal server on localhost:7233
+(``make temporal-up``) with an in-process worker on routing-workflow-queue
+that answers with a fake model, so no OpenAI calls are made. Stop any other
+routing worker first; the benchmark refuses to run while one is polling.
+Each workflow includes RoutingWorkflow's 10 second durability pause, so
+latencies are at least 10 s and the differences between modes are the
+overhead in front of the workflow.
+
+To run: python benchmarks/bench_gateway.py --requests 24 --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+import httpx
+from _notebook import ROOT
+from bench_workflows import (
+    ROUTING_QUERIES,
+    FakeModel,
+    FakeModelProvider,
+    git_commit,
+    summarize,
+)
+from temporalio.api.enums.v1 import TaskQueueType
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.api.workflowservice.v1 import DescribeTaskQueueRequest
+from temporalio.client import Client
+from temporalio.contrib.openai_agents import OpenAIAgentsPlugin
+from temporalio.worker import Worker
+
+SOLUTION_DIR = ROOT / "solutions" / "04_agent_routing"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# bench_workflows already put the routing solution's directory on the path
+import agent_registry  # noqa: E402
+from agent_config import MODEL_ACTIVITY_PARAMS, load_agent_config, read_agent_config  # noqa: E402
+from gateway import RoutingGateway  # noqa: E402
+from model_middleware import agent_names_by_instructions  # noqa: E402
+from payload_codec import data_converter_from_env  # noqa: E402
+from sandbox import workflow_runner  # noqa: E402
+from starter import connect  # noqa: E402
+from workflow import TASK_QUEUE, RoutingWorkflow, build_agents  # noqa: E402
+
+MODES = ("starter", "gateway", "gateway-eager")
+
+
+@dataclass
+class ModeResult:
+    requests: int
+    failed: int
+    wall_seconds: float
+    requests_per_second: float
+    latency: dict[str, float]
+    workflows_started: int
+    coalesced: int
+    model_calls: int
+    errors: dict[str, int] = field(default_factory=dict)
+
+
+def query_for(index: int, distinct: bool) -> str:
+    query = ROUTING_QUERIES[index % len(ROUTING_QUERIES)]
+    return f"{query} (#{index})" if distinct else query
+
+
+async def other_pollers(client: Client) -> list[str]:
+    """Identities of workers already polling the routing task queue."""
+    response = await client.workflow_service.describe_task_queue(
+        DescribeTaskQueueRequest(
+            namespace=client.namespace,
+            task_queue=TaskQueue(name=TASK_QUEUE),
+            task_queue_type=TaskQueueType.TASK_QUEUE_TYPE_WORKFLOW,
+        )
+    )
+    return [poller.identity for poller in response.pollers]
+
+
+async def run_starter(query: str) -> None:
+    process = await asyncio.create_subprocess_exec(
+        sys.executable,
+        "starter.py",
+        query,
+        cwd=SOLUTION_DIR,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    _, stderr = await process.communicate()
+    if process.returncode:
+        # The exception line of the traceback
+        lines = stderr.decode(errors="replace").strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit code {process.returncode}")
+
+
+def gateway_sender(http: httpx.AsyncClient) -> Callable[[str], Awaitable[None]]:
+    async def send(query: str) -> None:
+        response = await http.post("/route", json={"query": query})
+        if response.status_code != 200:
+            raise RuntimeError(response.json().get("error", response.status_code))
+
+    return send
+
+
+async def load(
+    send: Callable[[str], Awaitable[None]], args: argparse.Namespace
+) -> tuple[list[float], Counter[str], float]:
+    """Send ``args.requests`` queries, ``args.concurrency`` at a time."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies: list[float] = []
+    errors: Counter[str] = Counter()
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await send(query_for(index, args.distinct))
+            except Exception as e:
+                errors[str(e)] += 1
+                return
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    return latencies, errors, time.perf_counter() - wall_started
+
+
+async def bench_mode(
+    mode: str, worker_client: Client, calls: Counter[str], args: argparse.Namespace
+) -> ModeResult:
+    gateway: RoutingGateway | None = None
+    if mode == "starter":
+        send = run_starter
+    else:
+        if mode == "gateway-eager":
+            gateway = RoutingGateway(worker_client, eager_start=True)
+        else:
+            gateway = RoutingGateway(await connect())
+        server = await asyncio.start_server(gateway.handle_connection, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        http = httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{port}",
+            timeout=httpx.Timeout(120),
+            limits=httpx.Limits(max_connections=args.concurrency),
+        )
+        send = gateway_sender(http)
+
+    try:
+        # Warm up (file cache, first-run sandbox setup) outside the measurement
+        await send(query_for(-1, distinct=True))
+        calls.clear()
+        started_before = gateway.stats.workflows_started if gateway else 0
+        latencies, errors, wall = await load(send, args)
+    finally:
+        if gateway:
+            await http.aclose()
+            server.close()
+            await server.wait_closed()
+
+    failed = sum(errors.values())
+    return ModeResult(
+        requests=args.requests,
+        failed=failed,
+        wall_seconds=round(wall, 3),
+        requests_per_second=round((args.requests - failed) / wall, 2) if wall else 0.0,
+        latency=summarize(latencies),
+        workflows_started=(
+            gateway.stats.workflows_started - started_before if gateway else args.requests - failed
+        ),
+        coalesced=gateway.stats.coalesced if gateway else 0,
+        model_calls=sum(calls.values()),
+        errors=dict(errors),
+    )
+
+
+def print_mode(name: str, result: ModeResult) -> None:
+    latency = result.latency
+    print(f"\n{name}: {result.requests - result.failed}/{result.requests} requests")
+    print(f"   Throughput: {result.requests_per_second} requests/s ({result.wall_seconds} s)")
+    print(f"   Latency: p50 {latency.get('p50_ms')} ms, p95 {latency.get('p95_ms')} ms")
+    print(
+        f"   Workflows started: {result.workflows_started} "
+        f"({result.coalesced} requests coalesced), model calls: {result.model_calls}"
+    )
+    for error, count in result.errors.items():
+        print(f"   ⚠️  {count} × {error}")
+
+
+def print_comparison(baseline_path: Path, report: dict[str, Any]) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nCompared with {baseline_path.name} (commit {baseline.get('commit')})")
+    metrics = [
+        ("requests/s", lambda m: m["requests_per_second"]),
+        ("p50 ms", lambda m: m["latency"].get("p50_ms")),
+        ("p95 ms", lambda m: m["latency"].get("p95_ms")),
+    ]
+    for name, mode in report["modes"].items():
+        old = baseline.get("modes", {}).get(name)
+        if old is None:
+            print(f"   {name}: not in baseline")
+            continue
+        parts = []
+        for label, get in metrics:
+            before, after = get(old), get(mode)
+            if before and after is not None:
+                parts.append(f"{label} {before} → {after} ({(after - before) / before:+.1%})")
+        print(f"   {name}: " + "; ".join(parts))
+
+
+async def run(args: argparse.Namespace) -> None:
+    try:
+        plain = await Client.connect("localhost:7233")
+    except RuntimeError as e:
+        sys.exit(f"No Temporal server on localhost:7233 (run `make temporal-up`): {e}")
+    pollers = await other_pollers(plain)
+    if pollers:
+        sys.exit(f"Stop the routing worker(s) polling {TASK_QUEUE} first: {', '.join(pollers)}")
+
+    config = read_agent_config()
+    agents = agent_registry.install(build_agents(config), key=config.version)
+    calls: Counter[str] = Counter()
+    model = FakeModel(args.model_latency, agent_names_by_instructions(agents.values()), calls)
+    client = await Client.connect(
+        "localhost:7233",
+        # Same codec as starter.py and the gateway, so either can read results
+        data_converter=data_converter_from_env(),
+        plugins=[
+            OpenAIAgentsPlugin(
+                model_params=MODEL_ACTIVITY_PARAMS,
+                model_provider=FakeModelProvider(model),
+            )
+        ],
+    )
+    worker = Worker(
+        client,
+        task_queue=TASK_QUEUE,
+        workflows=[RoutingWorkflow],
+        activities=[load_agent_config],
+        workflow_runner=workflow_runner(),
+    )
+
+    report: dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "temporalio": version("temporalio"),
+            "openai-agents": version("openai-agents"),
+        },
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "distinct": args.distinct,
+            "model_latency_ms": args.model_latency * 1000,
+        },
+        "modes": {},
+    }
+    async with worker:
+        for mode in args.mode or MODES:
+            print(f"Running {mode} ({args.requests} requests, {args.concurrency} at a time)...")
+            result = await bench_mode(mode, client, calls, args)
+            print_mode(mode, result)
+            report["modes"][mode] = asdict(result)
+
+    output = args.output or RESULTS_DIR / f"gateway-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\n💾 Results written to {output}")
+    if args.compare:
+        print_comparison(args.compare, report)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=24, help="Queries per mode.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Queries in flight.")
+    parser.add_argument(
+        "--distinct",
+        action="store_true",
+        help="Make every query unique, so the gateway cannot share workflows.",
+    )
+    parser.add_argument(
+        "--model-latency", type=float, default=0.05, help="Fake model latency in seconds."
+    )
+    parser.add_argument("--mode", action="append", choices=MODES, help="Run only this mode.")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Results JSON file (default: benchmarks/results/gateway-<commit>.json).",
+    )
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare with.")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""Benchmark: history bytes and codec cost of the routing payload compression.
+
+The routing worker can compress large payloads with ``CompressionCodec``
+(solutions/04_agent_routing/payload_codec.py) before they are written to
+workflow history. This script builds the payloads a routing history holds:
+
+- a one-shot RoutingWorkflow that goes through triage (workflow input, two
+  model activity inputs and responses, and the result), and
+- a RoutingSessionWorkflow conversation of ``--turns`` turns, where every
+  model input carries the conversation so far.
+
+The payloads are built the way the OpenAI Agents plugin builds them, with its
+payload converter. The script reports the bytes that would land in history
+with and without the codec, and the encode and decode time per payload.
+
+To run: python benchmarks/bench_payload_codec.py --turns 20 --levels 1 6
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Any
+
+from _notebook import ROOT
+from agents import Agent, handoff
+from temporalio.api.common.v1 import Payload
+from temporalio.contrib.openai_agents import OpenAIAgentsPlugin
+from temporalio.contrib.openai_agents.testing import ResponseBuilders
+from temporalio.converter import DataConverter
+
+# The routing solution uses flat imports, so put its directory on the path
+sys.path.insert(0, str(ROOT / "solutions" / "04_agent_routing"))
+
+from language_detection import SAMPLE_TEXT  # noqa: E402
+from payload_codec import CompressionCodec  # noqa: E402
+from session import SessionReply  # noqa: E402
+from workflow import (  # noqa: E402
+    ROUTE_TRIAGE,
+    SPANISH_AGENT,
+    TRIAGE_AGENT,
+    RoutingResult,
+    build_agents,
+)
+
+QUERY = "Hola, ¿me puedes recomendar una buena película para ver este fin de semana?"
+
+
+def plugin_payload_converter() -> Any:
+    """The payload converter a client gets from OpenAIAgentsPlugin."""
+    config: Any = {"data_converter": DataConverter.default}
+    return OpenAIAgentsPlugin().configure_client(config)["data_converter"].payload_converter
+
+
+def answer(turn: int) -> str:
+    """A specialist-sized answer of varied prose (about 800 characters)."""
+    text = SAMPLE_TEXT["Spanish"]
+    start = (turn * 131) % len(text)
+    return (text[start:] + " " + text)[:800]
+
+
+def model_input(agent: Agent, items: list[dict[str, Any]]) -> dict[str, Any]:
+    """The argument of one model activity, as the plugin sends it."""
+    # build_agents gives every agent a model stub carrying its configured model
+    # name and settings (see agent_config.py)
+    return {
+        "model_name": getattr(agent.model, "model_name", agent.model),
+        "system_instructions": agent.instructions,
+        "input": items,
+        "model_settings": agent.model_settings,
+        "tools": [],
+        "output_schema": None,
+        "handoffs": [
+            {
+                "tool_name": h.tool_name,
+                "tool_description": h.tool_description,
+                "input_json_schema": h.input_json_schema,
+                "agent_name": h.agent_name,
+                "strict_json_schema": h.strict_json_schema,
+            }
+            for h in (handoff(a) for a in agent.handoffs if isinstance(a, Agent))
+        ],
+        "tracing": 1,
+        "previous_response_id": None,
+        "conversation_id": None,
+        "prompt": None,
+    }
+
+
+def routing_history(converter: Any) -> list[Payload]:
+    """Payloads of one RoutingWorkflow run that goes through triage."""
+    agents = {agent.name: agent for agent in build_agents()}
+    user = [{"role": "user", "content": QUERY}]
+    handoff_call = ResponseBuilders.tool_call("{}", handoff(agents[SPANISH_AGENT]).tool_name)
+    return converter.to_payloads(
+        [
+            QUERY,
+            model_input(agents[TRIAGE_AGENT], user),
+            handoff_call,
+            model_input(agents[SPANISH_AGENT], user),
+            ResponseBuilders.output_message(answer(0)),
+            RoutingResult(
+                response=answer(0),
+                agent=SPANISH_AGENT,
+                route=ROUTE_TRIAGE,
+                detected_language="Spanish",
+                confidence=0.5,
+            ),
+        ]
+    )
+
+
+def session_history(converter: Any, turns: int) -> list[Payload]:
+    """Payloads of a session conversation: every model input repeats the chat so far."""
+    agent = {agent.name: agent for agent in build_agents()}[SPANISH_AGENT]
+    messages: list[dict[str, Any]] = []
+    values: list[Any] = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"{QUERY} ({turn})"})
+        values += [
+            f"{QUERY} ({turn})",
+            model_input(agent, messages),
+            ResponseBuilders.output_message(answer(turn)),
+        ]
+        messages.append({"role": "assistant", "content": answer(turn)})
+        values.append(SessionReply(answer(turn), SPANISH_AGENT, "sticky", turn + 1, 0, False))
+    return [payload for value in values for payload in converter.to_payloads([value])]
+
+
+async def measure(
+    codec: CompressionCodec, payloads: list[Payload], repeats: int
+) -> tuple[int, float, float]:
+    """Return (encoded bytes, encode µs per payload, decode µs per payload)."""
+    encoded = await codec.encode(payloads)
+    decoded = await codec.decode(encoded)
+    if decoded != payloads:
+        raise AssertionError("Payloads did not round-trip")
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await codec.encode(payloads)
+    encode_us = (time.perf_counter() - started) / repeats / len(payloads) * 1e6
+    started = time.perf_counter()
+    for _ in range(repeats):
+        await codec.decode(encoded)
+    decode_us = (time.perf_counter() - started) / repeats / len(payloads) * 1e6
+    return sum(p.ByteSize() for p in encoded), encode_us, decode_us
+
+
+async def run(turns: int, levels: list[int], min_bytes: int, repeats: int) -> None:
+    converter = plugin_payload_converter()
+    scenarios = {
+        "routing (triage)": routing_history(converter),
+        f"session ({turns} turns)": session_history(converter, turns),
+    }
+    print(f"Compressing payloads of at least {min_bytes} B; {repeats} passes per measurement\n")
+    print(
+        f"{'history':<20} {'payloads':>8} {'level':>5} {'raw KiB':>9} {'coded KiB':>10}"
+        f" {'saved':>6} {'encode µs':>10} {'decode µs':>10}"
+    )
+    for name, payloads in scenarios.items():
+        raw = sum(p.ByteSize() for p in payloads)
+        for level in levels:
+            codec = CompressionCodec(min_bytes=min_bytes, level=level)
+            coded, encode_us, decode_us = await measure(codec, payloads, repeats)
+            print(
+                f"{name:<20} {len(payloads):>8} {level:>5} {raw / 1024:>9.1f} {coded / 1024:>10.1f}"
+                f" {1 - coded / raw:>6.0%} {encode_us:>10.1f} {decode_us:>10.1f}"
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20, help="Turns in the session history.")
+    parser.add_argument(
+        "--levels", type=int, nargs="+", default=[1, 6], help="zlib levels to compare."
+    )
+    parser.add_argument(
+        "--min-bytes", type=int, default=1024, help="Compression threshold (default 1024)."
+    )
+    parser.add_argument("--repeats", type=int, default=50, help="Passes per measurement.")
+    args = parser.parse_args()
+    asyncio.run(run(args.turns, args.levels, args.min_bytes, args.repeats))
+
+
+if __name__ == "__main__":
+    main()
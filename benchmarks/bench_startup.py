@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Benchmark: routing worker startup and per-workflow sandbox setup cost.
+
+Reports three numbers for solutions/04_agent_routing:
+
+- Import time: wall time for a fresh interpreter to ``import worker``, and
+  the packages that take the most of it (from ``python -X importtime``).
+- Sandbox setup: the cost of the fresh workflow sandbox every
+  RoutingWorkflow and RoutingSessionWorkflow run gets, which re-imports the
+  workflow module. The first instance in a process also pays one-time
+  sandbox costs, so it is reported separately. With PYTHONDONTWRITEBYTECODE
+  set, every sandbox also recompiles the workflow module from source.
+- Time to first poll: from launching ``python worker.py`` until the server
+  lists the new process as a poller on routing-workflow-queue. This needs a
+  Temporal server on localhost:7233 (``make temporal-up``) and is skipped
+  without one. No workflows are started.
+
+Results go to a JSON file keyed by git commit. Run once before a change and
+pass ``--compare`` with that file afterwards to see the difference.
+
+To run: python benchmarks/bench_startup.py --compare benchmarks/results/startup-<commit>.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import replace
+from datetime import datetime, timezone
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+import temporalio.workflow
+from _notebook import ROOT
+from temporalio.api.enums.v1 import TaskQueueType
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.api.workflowservice.v1 import DescribeTaskQueueRequest
+from temporalio.client import Client
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner
+
+SOLUTION_DIR = ROOT / "solutions" / "04_agent_routing"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# The routing solution uses flat imports, so put its directory on the path
+sys.path.insert(0, str(SOLUTION_DIR))
+
+from sandbox import workflow_runner  # noqa: E402
+from session import RoutingSessionWorkflow  # noqa: E402
+from workflow import TASK_QUEUE, RoutingWorkflow  # noqa: E402
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+TIMED_IMPORT = "import time; t = time.perf_counter(); import worker; print(time.perf_counter() - t)"
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def measure_imports(repeats: int, top: int) -> dict[str, Any]:
+    """Median ``import worker`` time over fresh interpreters, and the slowest packages."""
+    runs_ms: list[float] = []
+    self_us: Counter[str] = Counter()
+    for _ in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", TIMED_IMPORT],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=SOLUTION_DIR,
+        )
+        runs_ms.append(float(completed.stdout.strip().splitlines()[-1]) * 1000)
+        # Self time per top-level package, from the last run only
+        self_us.clear()
+        for line in completed.stderr.splitlines():
+            match = IMPORT_TIME_LINE.match(line)
+            if match:
+                self_us[match.group(4).split(".")[0]] += int(match.group(1))
+    return {
+        "median_ms": round(statistics.median(runs_ms), 1),
+        "runs_ms": [round(ms, 1) for ms in runs_ms],
+        "top_packages_ms": {name: round(us / 1000, 1) for name, us in self_us.most_common(top)},
+    }
+
+
+def plugin_runner() -> SandboxedWorkflowRunner:
+    """The worker's sandbox runner, with the passthrough the OpenAI Agents plugin adds."""
+    runner = workflow_runner()
+    return replace(
+        runner,
+        restrictions=runner.restrictions.with_passthrough_modules("openai", "agents", "mcp"),
+    )
+
+
+async def measure_sandbox(instances: int) -> dict[str, dict[str, float]]:
+    """First and median warm sandbox creation per workflow, in ms."""
+    runner = plugin_runner()
+    results: dict[str, dict[str, float]] = {}
+    for cls in (RoutingWorkflow, RoutingSessionWorkflow):
+        defn = temporalio.workflow._Definition.must_from_class(cls)
+        samples: list[float] = []
+        for _ in range(instances + 1):
+            # What the worker does for every run: a sandbox with the workflow imported
+            started = time.perf_counter()
+            runner.prepare_workflow(defn)
+            samples.append((time.perf_counter() - started) * 1000)
+        results[cls.__name__] = {
+            "first_ms": round(samples[0], 2),
+            "median_ms": round(statistics.median(samples[1:]), 2),
+        }
+    return results
+
+
+async def has_poller(client: Client, identity_prefix: str) -> bool:
+    response = await client.workflow_service.describe_task_queue(
+        DescribeTaskQueueRequest(
+            namespace=client.namespace,
+            task_queue=TaskQueue(name=TASK_QUEUE),
+            task_queue_type=TaskQueueType.TASK_QUEUE_TYPE_WORKFLOW,
+        )
+    )
+    return any(poller.identity.startswith(identity_prefix) for poller in response.pollers)
+
+
+async def measure_first_poll(starts: int, timeout: float) -> dict[str, Any] | None:
+    """Median time from launching worker.py to its first workflow poll, or None without a server."""
+    try:
+        client = await Client.connect("localhost:7233")
+    except RuntimeError as e:
+        print(f"   ⚠️  No Temporal server on localhost:7233, skipping ({e})")
+        return None
+
+    runs_ms: list[float] = []
+    for _ in range(starts):
+        started = time.perf_counter()
+        process = subprocess.Popen(
+            [sys.executable, "worker.py"],
+            cwd=SOLUTION_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            # Workers identify themselves as <pid>@<host> by default
+            while not await has_poller(client, f"{process.pid}@"):
+                if process.poll() is not None:
+                    raise RuntimeError(f"worker.py exited with code {process.returncode}")
+                if time.perf_counter() - started > timeout:
+                    raise TimeoutError(f"worker.py did not poll within {timeout} s")
+                await asyncio.sleep(0.01)
+            runs_ms.append((time.perf_counter() - started) * 1000)
+        finally:
+            process.terminate()
+            process.wait()
+    return {
+        "median_ms": round(statistics.median(runs_ms), 1),
+        "runs_ms": [round(ms, 1) for ms in runs_ms],
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    imports = report["imports"]
+    print(f"\nimport worker: median {imports['median_ms']} ms over {len(imports['runs_ms'])} runs")
+    for name, ms in imports["top_packages_ms"].items():
+        print(f"   {name:<28} {ms:>8.1f} ms")
+    print("\nSandbox setup per workflow run:")
+    for name, sandbox in report["sandbox"].items():
+        print(f"   {name:<28} first {sandbox['first_ms']} ms, then {sandbox['median_ms']} ms")
+    first_poll = report["first_poll"]
+    if first_poll:
+        print(f"\nTime to first poll: median {first_poll['median_ms']} ms")
+
+
+def print_comparison(baseline_path: Path, report: dict[str, Any]) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nCompared with {baseline_path.name} (commit {baseline.get('commit')})")
+    metrics: list[tuple[str, Any, Any]] = [
+        ("import worker", baseline["imports"]["median_ms"], report["imports"]["median_ms"])
+    ]
+    for name, sandbox in report["sandbox"].items():
+        old = baseline["sandbox"].get(name, {})
+        metrics.append((f"{name} sandbox", old.get("median_ms"), sandbox["median_ms"]))
+    if baseline.get("first_poll") and report["first_poll"]:
+        metrics.append(
+            (
+                "time to first poll",
+                baseline["first_poll"]["median_ms"],
+                report["first_poll"]["median_ms"],
+            )
+        )
+    for label, before, after in metrics:
+        if before:
+            print(f"   {label:<34} {before} → {after} ms ({(after - before) / before:+.1%})")
+
+
+async def run(args: argparse.Namespace) -> None:
+    report: dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "temporalio": version("temporalio"),
+            "openai-agents": version("openai-agents"),
+        },
+    }
+    print(f"Timing import worker in {args.repeats} fresh interpreters...")
+    report["imports"] = measure_imports(args.repeats, args.top)
+    print(f"Creating {args.instances} sandboxes per workflow...")
+    report["sandbox"] = await measure_sandbox(args.instances)
+    print(f"Starting worker.py {args.starts} times...")
+    report["first_poll"] = await measure_first_poll(args.starts, args.timeout)
+    print_report(report)
+
+    output = args.output or RESULTS_DIR / f"startup-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\n💾 Results written to {output}")
+    if args.compare:
+        print_comparison(args.compare, report)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--repeats", type=int, default=5, help="Fresh interpreters to time imports in."
+    )
+    parser.add_argument("--top", type=int, default=8, help="Slowest packages to list.")
+    parser.add_argument(
+        "--instances", type=int, default=200, help="Sandboxes to create per workflow."
+    )
+    parser.add_argument("--starts", type=int, default=3, help="Worker launches to time.")
+    parser.add_argument(
+        "--timeout", type=float, default=60, help="Seconds to wait for each worker to poll."
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Results JSON file (default: benchmarks/results/startup-<commit>.json).",
+    )
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare with.")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""Benchmark: a new HTTP client per activity call vs. one pooled worker client.
+
+The weather activities in solutions 02 and 03 used to open a fresh
+``httpx.AsyncClient`` for every call, paying for a new connection (and, against
+api.weather.gov, a TLS handshake) each time. They now share one worker-scoped
+client with keep-alive connection pooling. This script serves an NWS-shaped
+alerts payload from a local stub server and times both strategies per call.
+
+The stub speaks plain HTTP on localhost, so the saving shown is the lower
+bound: against the real API every avoided connection also skips TLS setup
+and a network round trip.
+
+To run: python benchmarks/bench_weather_client.py --calls 500 --concurrency 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+HEADERS = {"User-Agent": "Temporal-Workshop (educational)"}
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30)
+
+ALERTS = json.dumps(
+    {
+        "features": [
+            {
+                "properties": {
+                    "event": "Flood Warning",
+                    "headline": f"Flood Warning issued for zone {i}",
+                    "severity": "Severe",
+                    "areaDesc": f"Zone {i}",
+                }
+            }
+            for i in range(5)
+        ]
+    }
+).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every GET with the same alerts payload, keeping connections open."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/geo+json")
+        self.send_header("Content-Length", str(len(ALERTS)))
+        self.end_headers()
+        self.wfile.write(ALERTS)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def start_stub_server() -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def measure(
+    label: str, calls: int, concurrency: int, fetch: Callable[[str], Awaitable[dict]]
+) -> list[float]:
+    """Run ``calls`` fetches, ``concurrency`` at a time; return per-call latencies in ms."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await fetch(f"/alerts/active/area/S{i % 50:02d}")
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<22} mean {statistics.mean(ordered):7.2f} ms   p50 {statistics.median(ordered):7.2f} ms"
+        f"   p95 {p95:7.2f} ms   {calls / elapsed:8.1f} calls/s"
+    )
+    return ordered
+
+
+async def run(calls: int, concurrency: int) -> None:
+    server = start_stub_server()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"Stub NWS server on {base_url}; {calls} calls, concurrency {concurrency}\n")
+
+    async def per_call_client(path: str) -> dict:
+        # Before: every activity call opens (and closes) its own client
+        async with httpx.AsyncClient() as client:
+            response = await client.get(base_url + path, headers=HEADERS, timeout=10.0)
+            response.raise_for_status()
+            return response.json()
+
+    try:
+        before = await measure("new client per call", calls, concurrency, per_call_client)
+
+        # After: one pooled keep-alive client for the worker's lifetime
+        async with httpx.AsyncClient(headers=HEADERS, timeout=10.0, limits=LIMITS) as shared:
+
+            async def pooled_client(path: str) -> dict:
+                response = await shared.get(base_url + path)
+                response.raise_for_status()
+                return response.json()
+
+            after = await measure("shared pooled client", calls, concurrency, pooled_client)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    saved = statistics.mean(before) - statistics.mean(after)
+    print(
+        f"\nSaved per call: {saved:.2f} ms ({saved / statistics.mean(before):.0%} of mean latency)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500, help="Activity calls per strategy.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Calls in flight at once.")
+    args = parser.parse_args()
+    asyncio.run(run(args.calls, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""Offline end-to-end benchmark for RoutingWorkflow and WeatherAgentWorkflow.
+
+Runs both workshop workflows against Temporal's local test environment with
+everything external replaced:
+
+- a deterministic fake model (configurable latency) that hands off, calls
+  tools and answers the way the real agents would,
+- a stub NWS weather API served through an httpx mock transport.
+
+RoutingWorkflow comes from solutions/04_agent_routing. WeatherAgentWorkflow
+and its activities are loaded from the durable agent solution notebook, so
+the code measured is the code the workshop runs.
+
+For each workflow it reports workflows/sec, end-to-end latency, per-step
+latency (time in queue and execution time for each activity type), and
+worker CPU time. Results go to a JSON file keyed by git commit. Pass
+``--compare`` with an earlier results file to see the change.
+
+The time-skipping server skips RoutingWorkflow's 10 second durability pause.
+The test server is downloaded once and then reused from the download cache.
+On machines with no network at all, pass ``--server-path`` (or set
+TEMPORAL_SERVER_PATH) to a pre-downloaded binary.
+
+To run: python benchmarks/bench_workflows.py --workflows 200 --concurrency 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+
+import httpx
+from _notebook import ROOT, load_notebook
+from agents import (
+    AgentOutputSchemaBase,
+    Handoff,
+    Model,
+    ModelProvider,
+    ModelResponse,
+    ModelSettings,
+    ModelTracing,
+    Tool,
+    TResponseInputItem,
+)
+from agents.items import TResponseStreamEvent
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseOutputMessage,
+    ResponseOutputText,
+    ResponseTextDeltaEvent,
+)
+from temporalio import activity
+from temporalio.client import Client
+from temporalio.contrib.openai_agents import OpenAIAgentsPlugin
+from temporalio.contrib.openai_agents.testing import ResponseBuilders
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import (
+    ActivityInboundInterceptor,
+    ExecuteActivityInput,
+    Interceptor,
+    Worker,
+)
+
+# The routing solution uses flat imports, so put its directory on the path
+sys.path.insert(0, str(ROOT / "solutions" / "04_agent_routing"))
+
+import agent_registry  # noqa: E402
+from agent_config import MODEL_ACTIVITY_PARAMS, load_agent_config, read_agent_config  # noqa: E402
+from language_detection import detect_language  # noqa: E402
+from model_middleware import agent_names_by_instructions  # noqa: E402
+from workflow import SPECIALISTS, RoutingWorkflow, build_agents  # noqa: E402
+
+DURABLE_AGENT_NOTEBOOK = ROOT / "solutions" / "03_durable_agent" / "solution.ipynb"
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+# A mix that exercises both the classifier fast path and the triage handoff
+ROUTING_QUERIES = [
+    "Bonjour ! Pouvez-vous me recommander un bon livre pour les vacances d'été ?",
+    "Hola, ¿me puedes recomendar una buena película para ver este fin de semana?",
+    "Hi! Could you tell me a tongue twister that is fun to say out loud?",
+    "Merci !",
+    "¿Qué tal?",
+    "ok?",
+]
+WEATHER_QUERIES = [
+    "What weather alerts are active in CA?",
+    "Are there any weather alerts in TX right now?",
+    "Compare the weather alerts in CA, TX, FL, NY and WA.",
+]
+STATE_CODE = re.compile(r"\b[A-Z]{2}\b")
+
+
+def user_text(input: str | list[TResponseInputItem]) -> str:
+    """The first user message in a model input."""
+    if isinstance(input, str):
+        return input
+    for item in input:
+        if isinstance(item, dict) and item.get("role") == "user":
+            content = item.get("content")
+            return content if isinstance(content, str) else json.dumps(content)
+    return ""
+
+
+class FakeModel(Model):
+    """Deterministic stand-in for the OpenAI model with a fixed latency.
+
+    Agents with handoffs (triage) hand off to the specialist for the detected
+    language; agents with weather tools call them once and then answer; every
+    other agent answers straight away.
+    """
+
+    def __init__(self, latency: float, agent_names: dict[str, str], calls: Counter[str]):
+        self.latency = latency
+        self.agent_names = agent_names
+        self.calls = calls
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        self.calls[self.agent_names.get(system_instructions or "", "unknown")] += 1
+        await asyncio.sleep(self.latency)
+        text = user_text(input)
+
+        if handoffs:
+            target = SPECIALISTS.get(detect_language(text).language, SPECIALISTS["English"])
+            handoff = next((h for h in handoffs if h.agent_name == target), handoffs[0])
+            return ResponseBuilders.tool_call("{}", handoff.tool_name)
+
+        tool_names = {tool.name for tool in tools}
+        answered = not isinstance(input, str) and any(
+            isinstance(item, dict) and item.get("type") == "function_call_output" for item in input
+        )
+        states = STATE_CODE.findall(text) or ["CA"]
+        if not answered and len(states) > 1 and "get_weather_for_states" in tool_names:
+            return ResponseBuilders.tool_call(
+                json.dumps({"states": states}), "get_weather_for_states"
+            )
+        if not answered and "get_weather" in tool_names:
+            return ResponseBuilders.tool_call(json.dumps({"state": states[0]}), "get_weather")
+        return ResponseBuilders.output_message(f"Fake answer to: {text[:40]}")
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        """The same answer as ``get_response``: its text as one delta, then the response."""
+        response = await self.get_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **kwargs,
+        )
+        sequence = 0
+        for index, item in enumerate(response.output):
+            if not isinstance(item, ResponseOutputMessage):
+                continue
+            for part in item.content:
+                if isinstance(part, ResponseOutputText):
+                    yield ResponseTextDeltaEvent(
+                        type="response.output_text.delta",
+                        item_id=item.id,
+                        output_index=index,
+                        content_index=0,
+                        delta=part.text,
+                        logprobs=[],
+                        sequence_number=sequence,
+                    )
+                    sequence += 1
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=sequence,
+            response=Response(
+                id="fake-response",
+                created_at=0,
+                model="fake",
+                object="response",
+                output=response.output,
+                parallel_tool_calls=False,
+                tool_choice="auto",
+                tools=[],
+            ),
+        )
+
+
+class FakeModelProvider(ModelProvider):
+    def __init__(self, model: FakeModel):
+        self.model = model
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.model
+
+
+def stub_weather_transport(latency: float) -> httpx.MockTransport:
+    """An in-process NWS alerts API: every state has three alerts."""
+    body = json.dumps(
+        {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": None,
+                    "properties": {
+                        "event": "Flood Warning",
+                        "headline": f"Flood Warning {i} issued by NWS",
+                        "severity": "Moderate",
+                        "areaDesc": f"County {i}",
+                    },
+                }
+                for i in range(3)
+            ],
+        }
+    ).encode()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        return httpx.Response(200, content=body, headers={"Content-Type": "application/geo+json"})
+
+    return httpx.MockTransport(handler)
+
+
+class StepTimer(Interceptor):
+    """Worker interceptor recording queue time and run time per activity type."""
+
+    def __init__(self) -> None:
+        self.queued_ms: defaultdict[str, list[float]] = defaultdict(list)
+        self.run_ms: defaultdict[str, list[float]] = defaultdict(list)
+
+    def reset(self) -> None:
+        self.queued_ms.clear()
+        self.run_ms.clear()
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _StepTimerInbound(next, self)
+
+
+class _StepTimerInbound(ActivityInboundInterceptor):
+    def __init__(self, next: ActivityInboundInterceptor, timer: StepTimer):
+        super().__init__(next)
+        self._timer = timer
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        info = activity.info()
+        queued = datetime.now(timezone.utc) - info.current_attempt_scheduled_time
+        self._timer.queued_ms[info.activity_type].append(queued.total_seconds() * 1000)
+        started = time.perf_counter()
+        try:
+            return await super().execute_activity(input)
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            self._timer.run_ms[info.activity_type].append(elapsed)
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    """Count, mean and nearest-rank percentiles of latency samples in ms."""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))], 2)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.mean(ordered), 2),
+        "p50_ms": pct(50),
+        "p95_ms": pct(95),
+        "p99_ms": pct(99),
+    }
+
+
+@dataclass
+class SuiteResult:
+    workflows: int
+    failed: int
+    wall_seconds: float
+    workflows_per_second: float
+    worker_cpu_seconds: float
+    cpu_ms_per_workflow: float
+    end_to_end: dict[str, float]
+    steps: dict[str, dict[str, dict[str, float]]]
+    model_calls: dict[str, int]
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+async def run_suite(
+    worker: Worker,
+    timer: StepTimer,
+    calls: Counter[str],
+    start: Callable[[int], Awaitable[Any]],
+    workflows: int,
+    concurrency: int,
+) -> tuple[SuiteResult, list[Any]]:
+    """Run ``workflows`` executions through ``start``, ``concurrency`` at a time."""
+    async with worker:
+        # Warm up so first-run imports and sandbox setup are not measured
+        await start(-1)
+        timer.reset()
+        calls.clear()
+
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+        results: list[Any] = []
+        failed = 0
+
+        async def one(index: int) -> None:
+            nonlocal failed
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    results.append(await start(index))
+                except Exception as e:
+                    failed += 1
+                    print(f"   ⚠️  workflow {index} failed: {e}")
+                    return
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(workflows)))
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+
+    steps = {
+        activity_type: {
+            "queued": summarize(timer.queued_ms[activity_type]),
+            "run": summarize(timer.run_ms[activity_type]),
+        }
+        for activity_type in sorted(timer.run_ms)
+    }
+    completed = workflows - failed
+    return (
+        SuiteResult(
+            workflows=workflows,
+            failed=failed,
+            wall_seconds=round(wall, 3),
+            workflows_per_second=round(completed / wall, 2) if wall else 0.0,
+            worker_cpu_seconds=round(cpu, 3),
+            cpu_ms_per_workflow=round(cpu / completed * 1000, 2) if completed else 0.0,
+            end_to_end=summarize(latencies),
+            steps=steps,
+            model_calls=dict(calls),
+        ),
+        results,
+    )
+
+
+async def bench_routing(env_client: Client, args: argparse.Namespace, run_id: str) -> SuiteResult:
+    config = read_agent_config()
+    agents = agent_registry.install(build_agents(config), key=config.version)
+    calls: Counter[str] = Counter()
+    model = FakeModel(args.model_latency, agent_names_by_instructions(agents.values()), calls)
+    client = with_fake_model(env_client, model)
+    timer = StepTimer()
+    task_queue = f"bench-routing-{run_id}"
+    worker = Worker(
+        client,
+        task_queue=task_queue,
+        workflows=[RoutingWorkflow],
+        activities=[load_agent_config],
+        interceptors=[timer],
+    )
+
+    async def start(index: int) -> Any:
+        return await client.execute_workflow(
+            RoutingWorkflow.run,
+            args=[ROUTING_QUERIES[index % len(ROUTING_QUERIES)], False],
+            id=f"bench-routing-{run_id}-{index}",
+            task_queue=task_queue,
+        )
+
+    result, outcomes = await run_suite(
+        worker, timer, calls, start, args.workflows, args.concurrency
+    )
+    result.extra["routes"] = dict(Counter(outcome.route for outcome in outcomes))
+    return result
+
+
+async def bench_weather(env_client: Client, args: argparse.Namespace, run_id: str) -> SuiteResult:
+    notebook = load_notebook(
+        DURABLE_AGENT_NOTEBOOK,
+        ["import httpx", "class WeatherActivities", "class WeatherAgentWorkflow"],
+        "durable_agent_notebook",
+    )
+    calls: Counter[str] = Counter()
+    model = FakeModel(args.model_latency, {}, calls)
+    client = with_fake_model(env_client, model)
+    timer = StepTimer()
+    task_queue = f"bench-weather-{run_id}"
+
+    async with httpx.AsyncClient(transport=stub_weather_transport(args.weather_latency)) as http:
+        # TTL 0: every lookup reaches the stub API, so the fetch step is measured
+        activities = notebook.WeatherActivities(http, notebook.AlertCache(ttl_seconds=0))
+        worker = Worker(
+            client,
+            task_queue=task_queue,
+            workflows=[notebook.WeatherAgentWorkflow],
+            activities=[activities.get_weather],
+            interceptors=[timer],
+        )
+
+        async def start(index: int) -> Any:
+            return await client.execute_workflow(
+                notebook.WeatherAgentWorkflow.run,
+                WEATHER_QUERIES[index % len(WEATHER_QUERIES)],
+                id=f"bench-weather-{run_id}-{index}",
+                task_queue=task_queue,
+            )
+
+        result, _ = await run_suite(worker, timer, calls, start, args.workflows, args.concurrency)
+    return result
+
+
+def with_fake_model(env_client: Client, model: FakeModel) -> Client:
+    """The environment's client (keeping its time-skipping interceptors) plus the agents plugin."""
+    config = env_client.config()
+    config["plugins"] = [
+        OpenAIAgentsPlugin(
+            model_params=MODEL_ACTIVITY_PARAMS,
+            model_provider=FakeModelProvider(model),
+        )
+    ]
+    return Client(**config)
+
+
+async def start_environment(args: argparse.Namespace) -> WorkflowEnvironment:
+    if args.env == "local":
+        return await WorkflowEnvironment.start_local(dev_server_existing_path=args.server_path)
+    return await WorkflowEnvironment.start_time_skipping(test_server_existing_path=args.server_path)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=ROOT,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_suite(name: str, result: SuiteResult) -> None:
+    e2e = result.end_to_end
+    print(f"\n{name}: {result.workflows - result.failed}/{result.workflows} workflows")
+    print(f"   Throughput: {result.workflows_per_second} workflows/s ({result.wall_seconds} s)")
+    print(
+        f"   End to end: p50 {e2e.get('p50_ms')} ms, p95 {e2e.get('p95_ms')} ms, "
+        f"p99 {e2e.get('p99_ms')} ms"
+    )
+    print(
+        f"   Worker CPU: {result.worker_cpu_seconds} s ({result.cpu_ms_per_workflow} ms/workflow)"
+    )
+    for activity_type, step in result.steps.items():
+        print(
+            f"   {activity_type:<24} run p50 {step['run'].get('p50_ms')} ms, "
+            f"p95 {step['run'].get('p95_ms')} ms; queued p50 {step['queued'].get('p50_ms')} ms"
+        )
+    print(f"   Model calls: {result.model_calls}")
+    for key, value in result.extra.items():
+        print(f"   {key.capitalize()}: {value}")
+
+
+def print_comparison(baseline_path: Path, report: dict[str, Any]) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    print(f"\nCompared with {baseline_path.name} (commit {baseline.get('commit')})")
+    metrics = [
+        ("workflows/s", lambda s: s["workflows_per_second"]),
+        ("p50 ms", lambda s: s["end_to_end"].get("p50_ms")),
+        ("p95 ms", lambda s: s["end_to_end"].get("p95_ms")),
+        ("CPU ms/wf", lambda s: s["cpu_ms_per_workflow"]),
+    ]
+    for name, suite in report["suites"].items():
+        old = baseline.get("suites", {}).get(name)
+        if old is None:
+            print(f"   {name}: not in baseline")
+            continue
+        parts = []
+        for label, get in metrics:
+            before, after = get(old), get(suite)
+            if before and after is not None:
+                parts.append(f"{label} {before} → {after} ({(after - before) / before:+.1%})")
+        print(f"   {name}: " + "; ".join(parts))
+
+
+async def run(args: argparse.Namespace) -> None:
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
+    suites = {"routing": bench_routing, "weather": bench_weather}
+    selected = args.suite or list(suites)
+
+    print(f"Starting {args.env} Temporal environment...")
+    env = await start_environment(args)
+    report: dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "temporalio": version("temporalio"),
+            "openai-agents": version("openai-agents"),
+            "server": args.env,
+        },
+        "config": {
+            "workflows": args.workflows,
+            "concurrency": args.concurrency,
+            "model_latency_ms": args.model_latency * 1000,
+            "weather_latency_ms": args.weather_latency * 1000,
+        },
+        "suites": {},
+    }
+    try:
+        for name in selected:
+            result = await suites[name](env.client, args, run_id)
+            print_suite(name, result)
+            report["suites"][name] = asdict(result)
+    finally:
+        await env.shutdown()
+
+    output = args.output or RESULTS_DIR / f"workflows-{report['commit']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\n💾 Results written to {output}")
+    if args.compare:
+        print_comparison(args.compare, report)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workflows", type=int, default=100, help="Executions per suite.")
+    parser.add_argument("--concurrency", type=int, default=10, help="Executions in flight.")
+    parser.add_argument(
+        "--model-latency", type=float, default=0.05, help="Fake model latency in seconds."
+    )
+    parser.add_argument(
+        "--weather-latency", type=float, default=0.02, help="Stub NWS API latency in seconds."
+    )
+    parser.add_argument(
+        "--suite", action="append", choices=["routing", "weather"], help="Run only this suite."
+    )
+    parser.add_argument(
+        "--env",
+        choices=["time-skipping", "local"],
+        default="time-skipping",
+        help="Temporal test server to run against (default: time-skipping).",
+    )
+    parser.add_argument(
+        "--server-path",
+        default=os.getenv("TEMPORAL_SERVER_PATH"),
+        help="Existing test/dev server binary, for machines without network access.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Results JSON file (default: benchmarks/results/workflows-<commit>.json).",
+    )
+    parser.add_argument("--compare", type=Path, help="Earlier results file to compare with.")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -38,7 +38,12 @@ async def main() -> None:
     Example workflow ID generation:
         est = pytz.timezone("US/Eastern")
         now = datetime.now(est)
-        workflow_id = f"routing-{now.strftime('%a-%b-%d-%I%M%S').lower()}est"
+        # Milliseconds plus a random suffix (secrets.token_hex), so IDs made at
+        # the same moment differ
+        workflow_id = (
+            f"routing-{now.strftime('%a-%b-%d-%H%M%S').lower()}"
+            f".{now.microsecond // 1000:03d}est-{secrets.token_hex(4)}"
+        )
 
     Example workflow execution:
         handle = await client.start_workflow(
@@ -56,8 +61,8 @@ async def main() -> None:
     # Hint: await Client.connect("localhost:7233", plugins=[OpenAIAgentsPlugin()])
 
     # TODO: Generate workflow ID with EST timestamp
-    # Format: "routing-{day}-{month}-{date}-{time}est"
-    # Hint: Use pytz.timezone("US/Eastern") and datetime.now()
+    # Format: "routing-{day}-{month}-{date}-{time}.{ms}est-{random}"
+    # Hint: Use pytz.timezone("US/Eastern"), datetime.now() and secrets.token_hex(4)
 
     # TODO: Define the query to test
     # Use: "Hi! Tell me a tongue twister."
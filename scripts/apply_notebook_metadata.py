@@ -3,11 +3,23 @@
 
 This script keeps the configuration centralized so every notebook across the
 workshop uses the same Python interpreter metadata.
+
+Notebooks whose content hash matches the last time they were found compliant
+(cached in .cache/notebook_metadata.json, per metadata configuration) are
+skipped without being parsed. The rest are checked in parallel worker
+processes. ``--check`` reports drift and exits non-zero without writing,
+for use in pre-commit hooks and CI.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Iterable
 
@@ -32,6 +44,38 @@ DEFAULT_NOTEBOOK_LOCATIONS = (
     Path("temporal_installation.ipynb"),
 )
 
+# Content hashes of notebooks last found compliant (gitignored).
+CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "notebook_metadata.json"
+
+
+def config_hash() -> str:
+    """Identifies the metadata configuration; cached results for another one are ignored."""
+    config = json.dumps([KERNELSPEC, LANGUAGE_INFO], sort_keys=True)
+    return hashlib.sha256(config.encode()).hexdigest()
+
+
+def content_hash(notebook_path: Path) -> str:
+    return hashlib.sha256(notebook_path.read_bytes()).hexdigest()
+
+
+def load_cache(path: Path) -> dict[str, str]:
+    """Notebook path -> content hash, for notebooks compliant with the current configuration."""
+    try:
+        cache = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("config") != config_hash():
+        return {}
+    return dict(cache.get("notebooks", {}))
+
+
+def save_cache(path: Path, notebooks: dict[str, str]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename, so a run that is interrupted never leaves a partial cache
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps({"config": config_hash(), "notebooks": notebooks}, indent=1))
+    os.replace(tmp, path)
+
 
 def iter_notebooks(paths: Iterable[Path]) -> Iterable[Path]:
     """Yield every notebook under the provided paths."""
@@ -45,10 +89,10 @@ def iter_notebooks(paths: Iterable[Path]) -> Iterable[Path]:
             yield path
 
 
-def apply_metadata(notebook_path: Path) -> bool:
+def apply_metadata(notebook_path: Path, write: bool = True) -> bool:
     """Apply the shared metadata to a single notebook.
 
-    Returns True if any changes were written.
+    Returns True if the notebook needed changes (written unless ``write`` is False).
     """
     nb = nbformat.read(notebook_path, as_version=nbformat.NO_CONVERT)
     metadata = nb.metadata
@@ -65,11 +109,17 @@ def apply_metadata(notebook_path: Path) -> bool:
         metadata["language_info"] = updated_info
         changed = True
 
-    if changed:
+    if changed and write:
         nbformat.write(nb, notebook_path)
     return changed
 
 
+def process_notebook(notebook_path: Path, write: bool) -> tuple[bool, str]:
+    """Worker-process entry point: whether it changed, and its content hash afterwards."""
+    changed = apply_metadata(notebook_path, write)
+    return changed, content_hash(notebook_path)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Apply the shared kernelspec metadata to workshop notebooks.",
@@ -81,19 +131,68 @@ def main() -> None:
         default=DEFAULT_NOTEBOOK_LOCATIONS,
         help="Notebook files or directories to update (defaults to all workshop notebooks).",
     )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Report notebooks that need updating and exit 1 if any do, without writing.",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Worker processes for notebooks that must be parsed (default: CPU count).",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Parse every notebook, ignoring (but still refreshing) the hash cache.",
+    )
     args = parser.parse_args()
 
+    started = time.perf_counter()
     notebooks = list(iter_notebooks(args.paths))
     if not notebooks:
         print("No notebooks found.")
         return
 
-    updated = 0
+    cache = {} if args.no_cache else load_cache(CACHE_PATH)
+    known = dict(cache)
+    pending: list[Path] = []
     for notebook in notebooks:
-        if apply_metadata(notebook):
-            updated += 1
-            print(f"Updated: {notebook}")
-    print(f"Metadata applied to {updated} notebook(s) out of {len(notebooks)} checked.")
+        key = str(notebook.resolve())
+        digest = content_hash(notebook)
+        if cache.get(key) == digest:
+            continue
+        known.pop(key, None)
+        pending.append(notebook)
+
+    write = not args.check
+    if len(pending) > 1 and args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=min(args.jobs, len(pending))) as pool:
+            results = list(pool.map(process_notebook, pending, [write] * len(pending)))
+    else:
+        results = [process_notebook(notebook, write) for notebook in pending]
+
+    drifted = 0
+    for notebook, (changed, digest) in zip(pending, results):
+        if changed:
+            drifted += 1
+            print(f"{'Would update' if args.check else 'Updated'}: {notebook}")
+        if write or not changed:
+            known[str(notebook.resolve())] = digest
+    # Forget notebooks that have been deleted or moved
+    save_cache(CACHE_PATH, {key: digest for key, digest in known.items() if Path(key).exists()})
+
+    elapsed = time.perf_counter() - started
+    skipped = len(notebooks) - len(pending)
+    action = "need updating" if args.check else "rewritten"
+    print(
+        f"Scanned {len(notebooks)} notebook(s) in {elapsed:.2f}s: "
+        f"{skipped} unchanged since last run (skipped), {len(pending)} parsed, "
+        f"{drifted} {action}."
+    )
+    if args.check and drifted:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
@@ -1,11 +1,81 @@
 #!/usr/bin/env python3
-"""Environment validation script for the workshop."""
+"""Environment validation script for the workshop.
 
+By default this checks that .env provides OPENAI_API_KEY. With --preflight it
+also checks the Temporal side before a run and flags likely bottlenecks:
+
+- round-trip latency to the Temporal frontend (TEMPORAL_ADDRESS)
+- pollers and backlog on routing-workflow-queue and agents-sdk-queue
+- the worker slot and poller configuration (the launcher's WORKER_* settings),
+  and slot usage when workers export metrics (WORKER_METRICS_PORT)
+- a timed round trip of a no-op workflow through a temporary worker
+
+Results are printed as a verdict table; --json also prints (or writes) them
+as a JSON report. The exit code is 1 if any check fails. Everything works
+against the dev server started by scripts/run_temporal.sh; servers that do
+not report task queue statistics get "n/a" for the backlog.
+
+To run: python scripts/check_env.py --preflight --json preflight.json
+"""
+
+import argparse
+import asyncio
+import json
 import os
+import re
+import statistics
 import sys
+import time
+import urllib.request
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
 from pathlib import Path
+from typing import Any
 
 from dotenv import load_dotenv
+from temporalio import workflow
+from temporalio.api.enums.v1 import TaskQueueType
+from temporalio.api.taskqueue.v1 import TaskQueue
+from temporalio.api.workflowservice.v1 import DescribeTaskQueueRequest, GetSystemInfoRequest
+from temporalio.client import Client
+from temporalio.service import RPCError
+from temporalio.worker import Worker
+
+# Task queues the workshop's workers poll (solution 04, and notebooks 03)
+TASK_QUEUES = ("routing-workflow-queue", "agents-sdk-queue")
+
+# Above these, a check is flagged as a likely bottleneck
+FRONTEND_RTT_WARN_MS = 50.0
+SCHEDULE_TO_START_WARN_SECONDS = 1.0
+WORKFLOW_ROUND_TRIP_WARN_MS = 500.0
+
+# The SDK's defaults when no limit is configured
+DEFAULT_SLOTS = 100
+DEFAULT_POLLERS = 5
+
+RPC_TIMEOUT = timedelta(seconds=5)
+PROMETHEUS_LINE = re.compile(r'^(\w+)\{[^}]*worker_type="(\w+)"[^}]*\}\s+([0-9.eE+-]+)$')
+
+OK, WARN, FAIL, SKIP = "OK", "WARN", "FAIL", "SKIP"
+
+
+@dataclass
+class Check:
+    name: str
+    verdict: str
+    detail: str
+    data: dict[str, Any] = field(default_factory=dict)
+
+
+# Nothing to isolate in a no-op, so the round trip measures the server, not sandbox setup
+@workflow.defn(sandboxed=False)
+class PreflightWorkflow:
+    """Does nothing, so its round trip is all server and worker overhead."""
+
+    @workflow.run
+    async def run(self) -> None:
+        return None
 
 
 def check_environment() -> bool:
@@ -37,6 +107,264 @@ def check_environment() -> bool:
     return True
 
 
+def _env_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+async def check_frontend(client: Client, samples: int = 5) -> Check:
+    """Round-trip time of a cheap frontend call."""
+    rtts: list[float] = []
+    for _ in range(samples):
+        started = time.perf_counter()
+        await client.workflow_service.get_system_info(GetSystemInfoRequest(), timeout=RPC_TIMEOUT)
+        rtts.append((time.perf_counter() - started) * 1000)
+    median = statistics.median(rtts)
+    data = {"median_ms": round(median, 2), "max_ms": round(max(rtts), 2), "samples": samples}
+    detail = f"median {median:.1f} ms, max {max(rtts):.1f} ms over {samples} calls"
+    if median > FRONTEND_RTT_WARN_MS:
+        return Check("Frontend latency", WARN, f"{detail}; every task pays this", data)
+    return Check("Frontend latency", OK, detail, data)
+
+
+async def check_task_queue(client: Client, name: str, task_type: str) -> Check:
+    """Recent pollers and backlog for one task queue and task type."""
+    kind = (
+        TaskQueueType.TASK_QUEUE_TYPE_WORKFLOW
+        if task_type == "workflow"
+        else TaskQueueType.TASK_QUEUE_TYPE_ACTIVITY
+    )
+    response = await client.workflow_service.describe_task_queue(
+        DescribeTaskQueueRequest(
+            namespace=client.namespace,
+            task_queue=TaskQueue(name=name),
+            task_queue_type=kind,
+            report_stats=True,
+        ),
+        timeout=RPC_TIMEOUT,
+    )
+    label = f"{name} ({task_type})"
+    pollers = len(response.pollers)
+    data: dict[str, Any] = {"pollers": pollers, "backlog": None, "backlog_age_seconds": None}
+    backlog = "backlog n/a"
+    age = 0.0
+    # Older servers, including some dev server versions, do not report statistics
+    if response.HasField("stats"):
+        stats = response.stats
+        age = stats.approximate_backlog_age.ToTimedelta().total_seconds()
+        data.update(
+            backlog=stats.approximate_backlog_count,
+            backlog_age_seconds=round(age, 3),
+            add_rate=round(stats.tasks_add_rate, 2),
+            dispatch_rate=round(stats.tasks_dispatch_rate, 2),
+        )
+        backlog = f"backlog {stats.approximate_backlog_count} (oldest {age:.1f} s)"
+
+    detail = f"{pollers} poller(s), {backlog}"
+    if pollers == 0:
+        return Check(label, WARN, f"{detail}; no worker is polling", data)
+    if age > SCHEDULE_TO_START_WARN_SECONDS:
+        return Check(
+            label,
+            WARN,
+            f"{detail}; tasks wait for a free slot (schedule-to-start), "
+            "so raise slot limits or add worker processes",
+            data,
+        )
+    return Check(label, OK, detail, data)
+
+
+def check_slot_config() -> Check:
+    """The slot and poller limits the launcher (and worker.py) will use."""
+    processes = _env_int("WORKER_PROCESSES") or 1
+    config = {
+        "processes": processes,
+        "workflow_task_slots": _env_int("WORKER_MAX_WORKFLOW_TASKS") or DEFAULT_SLOTS,
+        "activity_slots": _env_int("WORKER_MAX_ACTIVITIES") or DEFAULT_SLOTS,
+        "workflow_pollers": _env_int("WORKER_WORKFLOW_POLLERS") or DEFAULT_POLLERS,
+        "activity_pollers": _env_int("WORKER_ACTIVITY_POLLERS") or DEFAULT_POLLERS,
+    }
+    detail = (
+        f"{processes} process(es) x {config['workflow_task_slots']} workflow task / "
+        f"{config['activity_slots']} activity slots, "
+        f"{config['workflow_pollers']}/{config['activity_pollers']} pollers"
+    )
+    if config["activity_pollers"] > config["activity_slots"]:
+        return Check(
+            "Worker slots", WARN, f"{detail}; more activity pollers than slots to fill", config
+        )
+    if config["workflow_pollers"] > config["workflow_task_slots"]:
+        return Check(
+            "Worker slots", WARN, f"{detail}; more workflow pollers than slots to fill", config
+        )
+    return Check("Worker slots", OK, detail, config)
+
+
+def scrape_slots(port: int) -> dict[str, dict[str, float]]:
+    """Slots used and available per worker type from one worker's Prometheus endpoint."""
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=2) as response:
+        text = response.read().decode()
+    slots: dict[str, dict[str, float]] = {}
+    for line in text.splitlines():
+        match = PROMETHEUS_LINE.match(line)
+        if match and match.group(1).endswith(("task_slots_used", "task_slots_available")):
+            kind = "used" if match.group(1).endswith("used") else "available"
+            worker_slots = slots.setdefault(match.group(2), {})
+            worker_slots[kind] = worker_slots.get(kind, 0) + float(match.group(3))
+    return slots
+
+
+def check_slot_usage() -> Check:
+    """Slot pools with no free slot right now, from the launcher's metrics endpoints."""
+    base_port = _env_int("WORKER_METRICS_PORT")
+    if base_port is None:
+        return Check("Slot usage", SKIP, "set WORKER_METRICS_PORT to read it from running workers")
+    processes = _env_int("WORKER_PROCESSES") or 1
+    # The launcher gives process N the port WORKER_METRICS_PORT + N
+    usage: dict[str, dict[str, dict[str, float]]] = {}
+    for index in range(processes):
+        try:
+            usage[str(base_port + index)] = scrape_slots(base_port + index)
+        except OSError:
+            continue
+    if not usage:
+        return Check("Slot usage", SKIP, f"no worker metrics on ports {base_port}+")
+    saturated = [
+        f"{worker_type} on :{port}"
+        for port, slots in usage.items()
+        for worker_type, counts in slots.items()
+        if counts.get("available") == 0 and counts.get("used", 0) > 0
+    ]
+    data = {"ports": usage, "saturated": saturated}
+    if saturated:
+        return Check("Slot usage", WARN, f"no free slots: {', '.join(saturated)}", data)
+    return Check("Slot usage", OK, f"free slots on all {len(usage)} worker(s)", data)
+
+
+async def check_workflow_round_trip(client: Client, runs: int = 5) -> Check:
+    """Start-to-result time of a no-op workflow on a temporary worker and task queue."""
+    task_queue = f"preflight-{uuid.uuid4()}"
+    round_trips: list[float] = []
+    async with Worker(
+        client,
+        task_queue=task_queue,
+        workflows=[PreflightWorkflow],
+    ):
+        for index in range(runs + 1):
+            started = time.perf_counter()
+            await client.execute_workflow(
+                PreflightWorkflow.run,
+                id=f"{task_queue}-{index}",
+                task_queue=task_queue,
+                execution_timeout=timedelta(seconds=30),
+            )
+            round_trips.append((time.perf_counter() - started) * 1000)
+    # The first run also waits for the new worker's first poll
+    median = statistics.median(round_trips[1:])
+    data = {"first_ms": round(round_trips[0], 2), "median_ms": round(median, 2), "runs": runs}
+    detail = f"median {median:.1f} ms (first {round_trips[0]:.1f} ms)"
+    if median > WORKFLOW_ROUND_TRIP_WARN_MS:
+        return Check(
+            "No-op workflow", WARN, f"{detail}; the server is slow to persist or dispatch", data
+        )
+    return Check("No-op workflow", OK, detail, data)
+
+
+async def preflight(address: str, namespace: str) -> list[Check]:
+    checks = [
+        Check(
+            "OPENAI_API_KEY",
+            OK if os.getenv("OPENAI_API_KEY", "").strip() else FAIL,
+            "set" if os.getenv("OPENAI_API_KEY", "").strip() else "missing; see .env.sample",
+        ),
+        check_slot_config(),
+        check_slot_usage(),
+    ]
+
+    started = time.perf_counter()
+    try:
+        client = await Client.connect(address, namespace=namespace)
+    except RuntimeError as e:
+        checks.append(Check("Temporal connection", FAIL, f"{address}: {e}"))
+        server_checks = ["Frontend latency", "Task queues", "No-op workflow"]
+        checks += [Check(name, SKIP, "no connection") for name in server_checks]
+        return checks
+    connect_ms = (time.perf_counter() - started) * 1000
+    checks.append(
+        Check(
+            "Temporal connection",
+            OK,
+            f"{address} namespace {namespace} in {connect_ms:.0f} ms",
+            {"address": address, "namespace": namespace, "connect_ms": round(connect_ms, 1)},
+        )
+    )
+
+    try:
+        checks.append(await check_frontend(client))
+        for name in TASK_QUEUES:
+            for task_type in ("workflow", "activity"):
+                checks.append(await check_task_queue(client, name, task_type))
+        checks.append(await check_workflow_round_trip(client))
+    except RPCError as e:
+        checks.append(Check("Temporal request", FAIL, f"{e.status.name}: {e.message}"))
+    return checks
+
+
+def print_table(checks: list[Check]) -> None:
+    width = max(len(check.name) for check in checks)
+    print(f"{'Check':<{width}}  {'Verdict':<7}  Detail")
+    print(f"{'-' * width}  {'-' * 7}  {'-' * 40}")
+    for check in checks:
+        print(f"{check.name:<{width}}  {check.verdict:<7}  {check.detail}")
+    flagged = [check for check in checks if check.verdict in (WARN, FAIL)]
+    print(
+        f"\n{len(flagged)} likely bottleneck(s) or problem(s) flagged."
+        if flagged
+        else "\nAll clear."
+    )
+
+
+def main() -> int:
+    # Settings such as TEMPORAL_ADDRESS may come from .env
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Check the workshop environment.")
+    parser.add_argument(
+        "--preflight",
+        action="store_true",
+        help="Also check the Temporal server, task queues and workers for bottlenecks.",
+    )
+    parser.add_argument(
+        "--address",
+        default=os.getenv("TEMPORAL_ADDRESS", "localhost:7233"),
+        help="Temporal frontend (TEMPORAL_ADDRESS, default: localhost:7233).",
+    )
+    parser.add_argument(
+        "--namespace",
+        default=os.getenv("TEMPORAL_NAMESPACE", "default"),
+        help="Namespace (TEMPORAL_NAMESPACE, default: default).",
+    )
+    parser.add_argument(
+        "--json",
+        nargs="?",
+        const="-",
+        metavar="PATH",
+        help="Write the preflight report as JSON to PATH (or print it when no PATH is given).",
+    )
+    args = parser.parse_args()
+    if not args.preflight:
+        return 0 if check_environment() else 1
+
+    checks = asyncio.run(preflight(args.address, args.namespace))
+    print_table(checks)
+    if args.json:
+        report = json.dumps({"checks": [asdict(check) for check in checks]}, indent=2)
+        if args.json == "-":
+            print(report)
+        else:
+            Path(args.json).write_text(report + "\n")
+            print(f"Report written to {args.json}")
+    return 1 if any(check.verdict == FAIL for check in checks) else 0
+
+
 if __name__ == "__main__":
-    success = check_environment()
-    sys.exit(0 if success else 1)
+    sys.exit(main())
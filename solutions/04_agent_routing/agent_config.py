@@ -0,0 +1,202 @@
+"""
+Per-agent model, timeout, retry and token settings, loaded from TOML.
+
+Every agent used to run on ``gpt-4`` with the worker's single 30 second
+model activity timeout. agents.toml (or the file named by AGENT_CONFIG) now
+sets these per agent, so a small classification task like triage can use a
+faster model with a tighter timeout:
+
+    [defaults]
+    model = "gpt-4"
+    timeout_seconds = 30
+
+    [tiers.fast]
+    model = "gpt-4o-mini"
+    timeout_seconds = 10
+
+    [agents."Triage Agent"]
+    tier = "fast"
+    max_tokens = 64
+    retry = { maximum_attempts = 3, initial_interval_seconds = 0.5 }
+
+An agent's settings are the defaults, overridden by its tier, overridden by
+its own table. Workflows read the file through the ``load_agent_config``
+local activity when a run starts, so the result is recorded in history
+(replays see the same settings) and edits apply to new runs without a
+redeploy.
+"""
+
+import dataclasses
+import hashlib
+import os
+import tomllib
+from dataclasses import dataclass, field, fields, replace
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+
+from agents import Agent, ModelSettings
+from temporalio import activity
+from temporalio.common import RetryPolicy
+from temporalio.contrib.openai_agents import ModelActivityParameters
+
+# The plugin's per-model activity stub. ModelActivityParameters and RunConfig
+# only set options for every agent in a run; giving one agent its own relies
+# on the plugin leaving agents whose model is already a stub as they are.
+# Both are private, so pyproject.toml pins temporalio to a minor version and
+# tests/test_agent_config.py fails if either changes.
+from temporalio.contrib.openai_agents._temporal_model_stub import _TemporalModelStub
+
+DEFAULT_CONFIG_PATH = Path(__file__).with_name("agents.toml")
+
+# Used when neither the file nor a tier sets it; matches the old worker-wide value.
+# Without a configured model an agent keeps the one its factory in workflow.py sets.
+DEFAULT_TIMEOUT_SECONDS = 30.0
+
+# Model calls are retried for this long, then fail the workflow instead of
+# retrying forever. The limit is in time, not attempts, because every call the
+# rate limiter defers (rate_limit.py) is a retry too. A bad key or a model
+# that does not exist fails at once: the plugin marks those non-retryable.
+DEFAULT_GIVE_UP_SECONDS = 600.0
+
+
+@dataclass
+class RetrySettings:
+    """Retry policy for an agent's model activity (Temporal's defaults when unset)."""
+
+    maximum_attempts: int = 0
+    """0 retries until DEFAULT_GIVE_UP_SECONDS have passed. Rate limiter
+    deferrals count as attempts, so a low limit fails calls under throttling."""
+    initial_interval_seconds: float = 1.0
+    backoff_coefficient: float = 2.0
+    maximum_interval_seconds: float | None = None
+
+    def policy(self) -> RetryPolicy:
+        return RetryPolicy(
+            maximum_attempts=self.maximum_attempts,
+            initial_interval=timedelta(seconds=self.initial_interval_seconds),
+            backoff_coefficient=self.backoff_coefficient,
+            maximum_interval=(
+                timedelta(seconds=self.maximum_interval_seconds)
+                if self.maximum_interval_seconds is not None
+                else None
+            ),
+        )
+
+
+# Activity options for every model call: the worker passes them to the plugin,
+# and configure_agent layers each agent's timeout and retries on top
+MODEL_ACTIVITY_PARAMS = ModelActivityParameters(
+    start_to_close_timeout=timedelta(seconds=DEFAULT_TIMEOUT_SECONDS),
+    schedule_to_close_timeout=timedelta(seconds=DEFAULT_GIVE_UP_SECONDS),
+    retry_policy=RetrySettings().policy(),
+)
+
+
+@dataclass
+class AgentSettings:
+    """Settings for one agent; None leaves the value to the next level down."""
+
+    model: str | None = None
+    timeout_seconds: float | None = None
+    max_tokens: int | None = None
+    retry: RetrySettings | None = None
+
+    def merged(self, override: "AgentSettings") -> "AgentSettings":
+        """These settings with every value ``override`` sets replacing ours."""
+        return replace(
+            self,
+            **{
+                f.name: getattr(override, f.name)
+                for f in fields(override)
+                if getattr(override, f.name) is not None
+            },
+        )
+
+
+@dataclass
+class AgentConfig:
+    """Resolved settings for every configured agent."""
+
+    defaults: AgentSettings = field(default_factory=AgentSettings)
+    agents: dict[str, AgentSettings] = field(default_factory=dict)
+    version: str = "builtin"
+    """Hash of the file the settings came from; agent graphs are cached per version."""
+
+    def for_agent(self, name: str) -> AgentSettings:
+        return self.agents.get(name, self.defaults)
+
+
+def _settings(table: dict[str, Any], where: str) -> AgentSettings:
+    known = {f.name for f in fields(AgentSettings)} | {"tier"}
+    unknown = sorted(set(table) - known)
+    if unknown:
+        raise ValueError(f"{where}: unknown setting(s) {', '.join(unknown)}")
+    values = {k: v for k, v in table.items() if k != "tier"}
+    if "retry" in values:
+        values["retry"] = RetrySettings(**values["retry"])
+    return AgentSettings(**values)
+
+
+def parse_agent_config(text: str, version: str = "builtin") -> AgentConfig:
+    """Resolve a TOML document into per-agent settings (defaults < tier < agent)."""
+    document = tomllib.loads(text)
+    defaults = AgentSettings(timeout_seconds=DEFAULT_TIMEOUT_SECONDS)
+    defaults = defaults.merged(_settings(document.get("defaults", {}), "[defaults]"))
+    tiers = {
+        name: _settings(table, f"[tiers.{name}]")
+        for name, table in document.get("tiers", {}).items()
+    }
+
+    agents: dict[str, AgentSettings] = {}
+    for name, table in document.get("agents", {}).items():
+        resolved = defaults
+        tier = table.get("tier")
+        if tier is not None:
+            if tier not in tiers:
+                raise ValueError(f'[agents."{name}"]: unknown tier {tier!r}')
+            resolved = resolved.merged(tiers[tier])
+        agents[name] = resolved.merged(_settings(table, f'[agents."{name}"]'))
+    return AgentConfig(defaults=defaults, agents=agents, version=version)
+
+
+def read_agent_config(path: str | Path | None = None) -> AgentConfig:
+    """Read AGENT_CONFIG (or agents.toml next to this module); built-in defaults if absent."""
+    path = Path(path or os.getenv("AGENT_CONFIG") or DEFAULT_CONFIG_PATH)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return parse_agent_config("")
+    return parse_agent_config(data.decode(), version=hashlib.sha256(data).hexdigest()[:16])
+
+
+@activity.defn
+async def load_agent_config() -> AgentConfig:
+    """Local activity: the settings new workflow runs should use."""
+    return read_agent_config()
+
+
+def configure_agent(
+    agent: Agent, config: AgentConfig, base: ModelActivityParameters = MODEL_ACTIVITY_PARAMS
+) -> Agent:
+    """A copy of ``agent`` with its configured model, token limit and activity options.
+
+    The activity options are ``base`` (the worker's) with the agent's timeout
+    and retry policy in place of its own. Call this before wiring agents into
+    handoffs, so handoffs reach the configured copies.
+    """
+    settings = config.for_agent(agent.name)
+    model_name = settings.model or (agent.model if isinstance(agent.model, str) else None)
+    model_settings = agent.model_settings
+    if settings.max_tokens is not None:
+        model_settings = model_settings.resolve(ModelSettings(max_tokens=settings.max_tokens))
+    params = dataclasses.replace(
+        base,
+        start_to_close_timeout=timedelta(
+            seconds=settings.timeout_seconds or DEFAULT_TIMEOUT_SECONDS
+        ),
+        retry_policy=settings.retry.policy() if settings.retry else base.retry_policy,
+    )
+    configured = agent.clone(model_settings=model_settings)
+    configured.model = _TemporalModelStub(model_name, model_params=params, agent=configured)
+    return configured
@@ -0,0 +1,87 @@
+"""
+Prebuilt agent definitions shared by every workflow run on a worker.
+
+Workflow code runs in Temporal's sandbox, which re-imports ``workflow.py`` for
+each run and each replay. Building the agent graph there means four new
+``Agent`` objects (and their handoff wiring) every time. This module is
+imported through the sandbox instead, so the graph is built once per worker
+process and workflows only look agents up by name.
+
+Agents in the registry are shared between concurrent runs: treat them as
+read-only and use ``agent.clone(...)`` for per-run changes.
+
+Registries are kept per key, the version of the agent configuration
+(agent_config.py) they were built with. Runs that start after the
+configuration file changes build and then share a graph for the new version.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping
+from types import MappingProxyType
+
+from agents import Agent
+
+
+class AgentRegistry(Mapping[str, Agent]):
+    """Read-only mapping from agent name to a prebuilt Agent."""
+
+    def __init__(self, agents: Iterable[Agent]):
+        by_name: dict[str, Agent] = {}
+        for agent in agents:
+            if agent.name in by_name:
+                raise ValueError(f"Duplicate agent name: {agent.name!r}")
+            by_name[agent.name] = agent
+        self._agents = MappingProxyType(by_name)
+
+    def __getitem__(self, name: str) -> Agent:
+        try:
+            return self._agents[name]
+        except KeyError:
+            known = ", ".join(sorted(self._agents))
+            raise KeyError(f"Unknown agent {name!r} (registered: {known})") from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._agents)
+
+    def __len__(self) -> int:
+        return len(self._agents)
+
+
+DEFAULT_KEY = "builtin"
+
+# Long-running workflows may still use older configuration versions
+MAX_REGISTRIES = 8
+
+_registries: OrderedDict[str, AgentRegistry] = OrderedDict()
+_install_lock = threading.Lock()
+
+
+def install(agents: Iterable[Agent], key: str = DEFAULT_KEY) -> AgentRegistry:
+    """Build the process-wide registry. Called once when the worker starts."""
+    with _install_lock:
+        registry = _registries[key] = AgentRegistry(agents)
+        _evict()
+        return registry
+
+
+def get_registry(build: Callable[[], Iterable[Agent]], key: str = DEFAULT_KEY) -> AgentRegistry:
+    """Return the registry for ``key``, building it with ``build`` on first use.
+
+    The fallback keeps workflows working in processes that never called
+    ``install`` (replayers, notebooks) and picks up new configuration
+    versions, at the cost of one build per process and version.
+    """
+    registry = _registries.get(key)
+    if registry is None:
+        with _install_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = _registries[key] = AgentRegistry(build())
+                _evict()
+    return registry
+
+
+def _evict() -> None:
+    while len(_registries) > MAX_REGISTRIES:
+        _registries.popitem(last=False)
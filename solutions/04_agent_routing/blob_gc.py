@@ -0,0 +1,76 @@
+"""
+Garbage-collect claim-check blobs that no open workflow references.
+
+Lists every running workflow in the namespace, reads its history without
+decoding it, and gathers the blob keys referenced by claim-check payloads
+(see claim_check.py). Blobs in PAYLOAD_CLAIM_CHECK_DIR that are not
+referenced are deleted. Blobs written within ``--min-age-hours`` are kept
+even when unreferenced, because a starter or worker may have just stored a
+payload whose event is not in history yet. Each blob's age is checked again
+just before it is deleted, in case it was stored again while histories were
+being read.
+
+To run: python blob_gc.py --dry-run
+"""
+
+import argparse
+import asyncio
+import os
+
+from claim_check import FileBlobStore, collect, delete_stale, referenced_keys
+from dotenv import load_dotenv
+from temporalio.client import Client
+
+# Load environment variables from .env file (includes PAYLOAD_CLAIM_CHECK_DIR)
+load_dotenv()
+
+
+async def open_workflow_references(client: Client) -> tuple[set[str], int]:
+    """Blob keys referenced by running workflows, and how many workflows were read."""
+    referenced: set[str] = set()
+    workflows = 0
+    async for execution in client.list_workflows('ExecutionStatus="Running"'):
+        handle = client.get_workflow_handle(execution.id, run_id=execution.run_id)
+        history = await handle.fetch_history()
+        for event in history.events:
+            referenced.update(referenced_keys(event))
+        workflows += 1
+    return referenced, workflows
+
+
+async def main(directory: str, min_age_hours: float, dry_run: bool) -> None:
+    store = FileBlobStore(directory)
+    # No codec: histories are read as stored, references included
+    client = await Client.connect("localhost:7233")
+
+    referenced, workflows = await open_workflow_references(client)
+    garbage = collect(store, referenced, min_age_hours * 3600)
+    print(f"🔎 {workflows} open workflow(s) reference {len(referenced)} blob(s)")
+
+    if dry_run:
+        print(f"🧹 Would delete {len(garbage)} blob(s) from {directory}")
+        return
+    deleted = delete_stale(store, garbage, min_age_hours * 3600)
+    print(f"🧹 Deleted {len(deleted)} blob(s) from {directory}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete claim-check blobs no open workflow uses.")
+    parser.add_argument(
+        "--dir",
+        default=os.getenv("PAYLOAD_CLAIM_CHECK_DIR"),
+        help="Blob directory (default: PAYLOAD_CLAIM_CHECK_DIR).",
+    )
+    parser.add_argument(
+        "--min-age-hours",
+        type=float,
+        default=1.0,
+        help="Keep unreferenced blobs younger than this (default: 1).",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report what would be deleted, delete nothing."
+    )
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir or PAYLOAD_CLAIM_CHECK_DIR is required")
+    asyncio.run(main(args.dir, args.min_age_hours, args.dry_run))
@@ -0,0 +1,178 @@
+"""
+Claim-check offloading of large payloads to a blob store.
+
+Temporal rejects payloads over its size limit (2 MB by default) and every
+history fetch carries every payload. Long conversations and large tool
+results get close to that. ``ClaimCheckCodec`` writes payloads above a
+threshold to a content-addressed ``BlobStore`` and puts a small reference in
+history instead; decoding fetches the original back. Blobs are keyed by the
+SHA-256 of their bytes, so identical payloads (the same instructions or
+conversation sent again) are stored once.
+
+``FileBlobStore`` keeps blobs in a local directory, which works for one host
+or a shared filesystem. Any object with the ``BlobStore`` methods (an S3 or
+GCS bucket, say) can replace it.
+
+Blobs are never deleted by the codec. blob_gc.py removes the ones no open
+workflow references any more. A closed workflow whose blobs were collected
+can no longer be replayed or have its results read.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from pathlib import Path
+from typing import Protocol
+
+from google.protobuf.descriptor import FieldDescriptor
+from google.protobuf.message import Message
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import PayloadCodec
+
+# Metadata encoding that marks a payload as a reference into the blob store
+ENCODING = b"claim-check/sha256"
+
+
+class BlobStore(Protocol):
+    """Content-addressed storage for payload bytes."""
+
+    def put(self, key: str, data: bytes) -> None: ...
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def keys(self) -> Iterable[str]: ...
+
+    def last_written(self, key: str) -> float:
+        """Unix time the blob was last stored, used to spare fresh blobs from collection."""
+        ...
+
+
+class FileBlobStore:
+    """Blobs as files in a local directory, sharded by the first two hex digits."""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key
+
+    def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        try:
+            # Already stored: only refresh its age so collection spares it
+            os.utime(path)
+            return
+        except FileNotFoundError:
+            # Never stored, or collected since; write it again
+            pass
+        path.parent.mkdir(exist_ok=True)
+        # Write then rename, so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, key: str) -> bytes | None:
+        try:
+            return self._path(key).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, key: str) -> None:
+        self._path(key).unlink(missing_ok=True)
+
+    def keys(self) -> Iterator[str]:
+        for path in self.directory.glob("??/*"):
+            if not path.name.startswith(".tmp-"):
+                yield path.name
+
+    def last_written(self, key: str) -> float:
+        return self._path(key).stat().st_mtime
+
+
+class ClaimCheckCodec(PayloadCodec):
+    """Offload payloads of at least ``min_bytes`` to ``store``, keeping a reference."""
+
+    def __init__(self, store: BlobStore, min_bytes: int = 256 * 1024):
+        self.store = store
+        self.min_bytes = min_bytes
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [await self._check(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [await self._claim(payload) for payload in payloads]
+
+    async def _check(self, payload: Payload) -> Payload:
+        if payload.ByteSize() < self.min_bytes:
+            return payload
+        data = payload.SerializeToString()
+        key = hashlib.sha256(data).hexdigest()
+        await asyncio.to_thread(self.store.put, key, data)
+        return Payload(metadata={"encoding": ENCODING}, data=key.encode())
+
+    async def _claim(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != ENCODING:
+            return payload
+        key = payload.data.decode()
+        data = await asyncio.to_thread(self.store.get, key)
+        if data is None:
+            raise LookupError(f"Claim-check blob {key} is missing from the blob store")
+        if hashlib.sha256(data).hexdigest() != key:
+            raise ValueError(f"Claim-check blob {key} is corrupt")
+        return Payload.FromString(data)
+
+
+def referenced_keys(message: Message) -> Iterator[str]:
+    """Blob keys referenced anywhere in a protobuf message, such as a history event."""
+    if isinstance(message, Payload):
+        if message.metadata.get("encoding") == ENCODING:
+            yield message.data.decode()
+        return
+    for field, value in message.ListFields():
+        if field.type != FieldDescriptor.TYPE_MESSAGE:
+            continue
+        if field.message_type.GetOptions().map_entry:
+            if field.message_type.fields_by_name["value"].type != FieldDescriptor.TYPE_MESSAGE:
+                continue
+            items: Iterable[Message] = value.values()
+        elif isinstance(value, Message):
+            items = [value]
+        else:
+            items = value  # Repeated field
+        for item in items:
+            yield from referenced_keys(item)
+
+
+def collect(store: BlobStore, referenced: set[str], min_age_seconds: float) -> list[str]:
+    """Keys of blobs that are unreferenced and older than ``min_age_seconds``."""
+    cutoff = time.time() - min_age_seconds
+    return [
+        key for key in store.keys() if key not in referenced and store.last_written(key) < cutoff
+    ]
+
+
+def delete_stale(store: BlobStore, keys: Iterable[str], min_age_seconds: float) -> list[str]:
+    """Delete the blobs ``collect`` returned, except any stored again since.
+
+    A starter or worker may put an identical payload between collection and
+    deletion, which refreshes the blob instead of writing it, so each blob's
+    age is checked again right before it is removed. Returns the deleted keys.
+    """
+    deleted = []
+    for key in keys:
+        try:
+            written = store.last_written(key)
+        except FileNotFoundError:
+            continue  # Already gone
+        if written >= time.time() - min_age_seconds:
+            continue
+        store.delete(key)
+        deleted.append(key)
+    return deleted
@@ -0,0 +1,351 @@
+"""
+Local HTTP gateway for the routing workflow.
+
+Every ``python starter.py`` run starts a new process, imports the Temporal
+and Agents SDKs, loads .env and connects a client before it can start a
+workflow, which takes seconds before the query even reaches Temporal. The
+gateway pays for that once and keeps one client open, so routing a query
+costs one local HTTP request.
+
+Endpoints (JSON in and out):
+- POST /route  ``{"query": "...", "speculate": 0, "stream": false}``
+  Starts a RoutingWorkflow and returns its RoutingResult. With
+  ``"stream": true`` the response is newline-delimited JSON sent while the
+  answer is generated: ``{"chunk": "..."}`` lines, then ``{"result": {...}}``
+  (or ``{"error": "..."}``). A ``{"restart": true}`` line means a model call
+  was retried: discard the chunks received so far.
+- GET /stats   Requests served, workflows started and requests coalesced.
+
+Identical requests (same query, speculation and streaming) that arrive while
+an earlier one is still running share its workflow instead of starting
+another, so a burst of the same question costs one set of model calls. Only
+in-flight workflows are shared; once one finishes, the next request for the
+same query starts a new workflow.
+
+With ``--worker`` the gateway also runs the routing worker in its own
+process, on the same client, and requests eager start for every workflow:
+the server returns the first workflow task in its reply to the start call,
+so the local worker runs it without waiting to poll for it.
+
+To run: python gateway.py --port 8000 --worker
+Example: curl -s localhost:8000/route -d '{"query": "Bonjour !"}'
+"""
+
+import argparse
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from starter import connect, make_workflow_id
+from temporalio.client import Client, WorkflowFailureError, WorkflowHandle
+from worker import WorkerSettings, create_worker
+
+# Import workflow class and task queue from workflow module
+from workflow import TASK_QUEUE, RoutingResult, RoutingWorkflow
+
+# How often streaming requests poll the workflow for new output
+STREAM_POLL_SECONDS = 0.2
+
+# Largest request body accepted
+MAX_BODY_BYTES = 64 * 1024
+
+# Most header lines accepted; each line is capped by the stream's 64 KiB limit
+MAX_HEADERS = 100
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Content Too Large",
+    414: "URI Too Long",
+    431: "Request Header Fields Too Large",
+    502: "Bad Gateway",
+}
+
+
+class HttpError(Exception):
+    """A request the gateway answers with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class Request:
+    method: str
+    path: str
+    keep_alive: bool
+    body: bytes
+
+
+@dataclass
+class GatewayStats:
+    requests: int = 0
+    workflows_started: int = 0
+    coalesced: int = 0
+    """Requests answered by a workflow an earlier identical request started."""
+    failed: int = 0
+    """Workflows that failed to start or finished with an error."""
+
+
+@dataclass
+class Flight:
+    """One workflow, shared by every identical request that arrives while it runs."""
+
+    started: "asyncio.Task[WorkflowHandle]"
+    result: "asyncio.Task[RoutingResult]"
+
+
+async def read_request(
+    reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> Request | None:
+    """Read one HTTP/1.1 request, or None once the client has closed the connection."""
+    line = await read_line(reader, HttpError(414, "Request line is too long"))
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line") from None
+
+    headers: dict[str, str] = {}
+    too_large = HttpError(431, "Request headers are too large")
+    lines = 0
+    while (line := await read_line(reader, too_large)) not in (b"\r\n", b"\n", b""):
+        lines += 1
+        if lines > MAX_HEADERS:
+            raise too_large
+        name, colon, value = line.decode("latin-1").partition(":")
+        if not colon:
+            raise HttpError(400, "Malformed header line")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length") from None
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, f"Request body is larger than {MAX_BODY_BYTES} bytes")
+    if length and headers.get("expect", "").lower() == "100-continue":
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+    body = await reader.readexactly(length)
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    return Request(method, target.split("?", 1)[0], keep_alive, body)
+
+
+async def read_line(reader: asyncio.StreamReader, too_long: HttpError) -> bytes:
+    """One line of the request head, raising ``too_long`` past the stream's limit."""
+    try:
+        return await reader.readline()
+    except ValueError:
+        # readline's LimitOverrunError, converted: the line is longer than the limit
+        raise too_long from None
+
+
+def response_head(status: int, content_type: str, keep_alive: bool, length: int | None) -> bytes:
+    """Status line and headers; a body without a length is sent in chunks."""
+    lines = [
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+        f"Content-Type: {content_type}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked",
+    ]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+async def write_json(
+    writer: asyncio.StreamWriter, status: int, value: Any, keep_alive: bool
+) -> None:
+    body = json.dumps(value, ensure_ascii=False).encode()
+    writer.write(response_head(status, "application/json", keep_alive, len(body)) + body)
+    await writer.drain()
+
+
+async def write_line(writer: asyncio.StreamWriter, value: Any) -> None:
+    """Send one newline-delimited JSON value as one HTTP chunk."""
+    data = (json.dumps(value, ensure_ascii=False) + "\n").encode()
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+    await writer.drain()
+
+
+def describe_failure(error: BaseException) -> str:
+    if isinstance(error, WorkflowFailureError) and error.cause:
+        error = error.cause
+    return f"{type(error).__name__}: {error}"
+
+
+class RoutingGateway:
+    """Starts routing workflows for HTTP requests over one shared client."""
+
+    def __init__(self, client: Client, eager_start: bool = False):
+        self.client = client
+        self.eager_start = eager_start
+        self.stats = GatewayStats()
+        self._id_prefix = make_workflow_id("routing-gateway")
+        self._in_flight: dict[tuple[str, int, bool], Flight] = {}
+
+    def submit(self, query: str, speculate: int = 0, stream: bool = False) -> Flight:
+        """The in-flight workflow for this request, started if there is none."""
+        key = (query, speculate, stream)
+        flight = self._in_flight.get(key)
+        if flight is not None:
+            self.stats.coalesced += 1
+            return flight
+
+        started = asyncio.create_task(self._start(query, speculate, stream))
+        flight = Flight(started, asyncio.create_task(self._result(started)))
+        self._in_flight[key] = flight
+        flight.result.add_done_callback(lambda task: self._finished(key, task))
+        return flight
+
+    async def _start(self, query: str, speculate: int, stream: bool) -> WorkflowHandle:
+        self.stats.workflows_started += 1
+        return await self.client.start_workflow(
+            RoutingWorkflow.run,
+            args=[query, stream, speculate],
+            # One prefix per gateway process, numbered like starter.py's bulk mode
+            id=f"{self._id_prefix}-{self.stats.workflows_started:06d}",
+            task_queue=TASK_QUEUE,
+            # Only takes effect when a worker shares this client (--worker)
+            request_eager_start=self.eager_start,
+        )
+
+    async def _result(self, started: "asyncio.Task[WorkflowHandle]") -> RoutingResult:
+        handle = await started
+        return await handle.result()
+
+    def _finished(self, key: tuple[str, int, bool], task: "asyncio.Task[RoutingResult]") -> None:
+        self._in_flight.pop(key, None)
+        # Also marks the error as seen when every waiting request has gone away
+        if not task.cancelled() and task.exception() is not None:
+            self.stats.failed += 1
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """Serve requests on one connection until the client closes it."""
+        try:
+            while (request := await read_request(reader, writer)) is not None:
+                self.stats.requests += 1
+                try:
+                    await self._dispatch(request, writer)
+                except HttpError as e:
+                    await write_json(writer, e.status, {"error": str(e)}, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except HttpError as e:
+            # The request could not be read, so the connection cannot be reused
+            await write_json(writer, e.status, {"error": str(e)}, keep_alive=False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        if request.path == "/stats":
+            if request.method != "GET":
+                raise HttpError(405, "Use GET /stats")
+            stats = asdict(self.stats) | {"in_flight": len(self._in_flight)}
+            await write_json(writer, 200, stats, request.keep_alive)
+        elif request.path == "/route":
+            if request.method != "POST":
+                raise HttpError(405, "Use POST /route")
+            await self._route(request, writer)
+        else:
+            raise HttpError(404, f"No endpoint at {request.path}")
+
+    async def _route(self, request: Request, writer: asyncio.StreamWriter) -> None:
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            raise HttpError(400, "Request body must be JSON") from None
+        query = payload.get("query") if isinstance(payload, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            raise HttpError(400, 'Expected a JSON object with a "query" string')
+        speculate = payload.get("speculate", 0)
+        # bool is an int subclass, but JSON true is not a branch count
+        if isinstance(speculate, bool) or not isinstance(speculate, int) or speculate < 0:
+            raise HttpError(400, '"speculate" must be a non-negative integer')
+        stream = payload.get("stream", False) is True
+
+        flight = self.submit(query, speculate, stream)
+        if stream:
+            await self._stream(flight, writer, request.keep_alive)
+            return
+        try:
+            # Shielded: a client that disconnects must not cancel a shared workflow
+            result = await asyncio.shield(flight.result)
+        except Exception as e:
+            raise HttpError(502, describe_failure(e)) from None
+        await write_json(writer, 200, asdict(result), request.keep_alive)
+
+    async def _stream(self, flight: Flight, writer: asyncio.StreamWriter, keep_alive: bool) -> None:
+        """Send the answer as it is generated, then the result, as NDJSON."""
+        writer.write(response_head(200, "application/x-ndjson", keep_alive, None))
+        try:
+            handle = await asyncio.shield(flight.started)
+            offset = restarts = 0
+            while True:
+                snapshot = await handle.query(RoutingWorkflow.output_since, offset)
+                if snapshot.restarts != restarts:
+                    # A model call was retried and its partial output discarded
+                    await write_line(writer, {"restart": True})
+                    offset, restarts = 0, snapshot.restarts
+                    continue
+                for chunk in snapshot.chunks:
+                    await write_line(writer, {"chunk": chunk})
+                offset += len(snapshot.chunks)
+                if snapshot.done:
+                    # Nothing was streamed (e.g. a cached response): send the answer whole
+                    if offset == 0 and snapshot.response:
+                        await write_line(writer, {"chunk": snapshot.response})
+                    break
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+            last = {"result": asdict(await asyncio.shield(flight.result))}
+        except Exception as e:
+            last = {"error": describe_failure(e)}
+        await write_line(writer, last)
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+async def serve(gateway: RoutingGateway, host: str, port: int) -> None:
+    server = await asyncio.start_server(gateway.handle_connection, host, port)
+    print(f"🌐 Routing gateway listening on http://{host}:{port}")
+    print(f'   curl -s {host}:{port}/route -d \'{{"query": "Bonjour !"}}\'')
+    print("⏳ Serving requests... (Press Ctrl+C to stop)\n")
+    async with server:
+        await server.serve_forever()
+
+
+async def main(host: str, port: int, with_worker: bool) -> None:
+    """Connect once, then serve routing requests until stopped."""
+    if not with_worker:
+        await serve(RoutingGateway(await connect()), host, port)
+        return
+
+    # The worker's client starts workflows, so the server can hand them to it eagerly
+    worker, _ = await create_worker(WorkerSettings())
+    print(f"⚙️  Running the routing worker in-process on {TASK_QUEUE} (eager start)")
+    async with worker:
+        await serve(RoutingGateway(worker.client, eager_start=True), host, port)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve RoutingWorkflow over local HTTP.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8000, help="Port to listen on.")
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Also run the routing worker in this process and start workflows eagerly.",
+    )
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port, args.worker))
@@ -0,0 +1,154 @@
+"""
+Hedged model requests: cut the tail latency of slow model calls.
+
+Most model calls finish close to their usual latency, but now and then one
+stalls for many times longer, and the workflow waits for it until it
+returns or the activity times out. ``HedgingModelProvider`` watches each
+call. If it has not returned by a percentile (p95 by default) of that
+agent's recent latency, it sends the same call again. The first response
+to arrive wins and the other call is cancelled.
+
+Every hedge is an extra model call, so hedging is capped per agent. Each
+call earns the agent ``budget`` hedges (0.05 means at most 5% extra calls),
+up to a small reserve, and each hedge spends one. While an agent has no
+budget left, its slow calls simply wait. Agents also need ``min_samples``
+calls of history before they are hedged, so the percentile means something.
+
+Streamed calls are never hedged: two streams would signal the workflow
+twice. The activity still returns a single ModelResponse, so workflow
+history and replay are unaffected by which call won.
+"""
+
+import asyncio
+import dataclasses
+import math
+import time
+from collections import defaultdict, deque
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from agents import Agent, ModelProvider, ModelResponse
+from model_middleware import CallNext, MiddlewareModelProvider, ModelCall
+from model_streaming import STREAM_METADATA_KEY
+from temporalio import activity
+
+# Metric name, next to the model metrics in telemetry.py
+HEDGES = "agent_model_hedges"
+
+
+@dataclass
+class HedgeStats:
+    """Counters reported by HedgingModelProvider."""
+
+    calls: int = 0
+    hedged: int = 0
+    """Calls that were sent a second time."""
+    hedge_wins: int = 0
+    """Hedged calls answered by the second request."""
+    over_budget: int = 0
+    """Slow calls not hedged because the agent's budget was spent."""
+
+
+@dataclass
+class _AgentHedging:
+    """Recent latencies and hedge budget for one agent."""
+
+    latencies: deque[float]
+    credits: float = 0.0
+
+    def delay(self, percentile: float, min_samples: int) -> float | None:
+        """Seconds to wait before hedging, or None without enough history."""
+        if len(self.latencies) < max(min_samples, 1):
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(percentile / 100 * len(ordered)) - 1)]
+
+
+class HedgingModelProvider(MiddlewareModelProvider):
+    """Send a second request for calls slower than an agent's usual latency.
+
+    Place this inside the response cache, so cache hits are never hedged,
+    and outside the rate limiter, so hedges count against the limit too.
+    """
+
+    def __init__(
+        self,
+        inner: ModelProvider | None = None,
+        agents: Iterable[Agent] = (),
+        percentile: float = 95,
+        budget: float = 0.05,
+        max_credits: float = 10,
+        window: int = 200,
+        min_samples: int = 20,
+        unhedged_agents: Iterable[str] = (),
+    ):
+        super().__init__(inner, agents)
+        self.percentile = percentile
+        self.budget = budget
+        self.max_credits = max_credits
+        self.min_samples = min_samples
+        self.unhedged_agents = set(unhedged_agents)
+        self.stats = HedgeStats()
+        self._agents: defaultdict[str, _AgentHedging] = defaultdict(
+            lambda: _AgentHedging(deque(maxlen=window))
+        )
+
+    def _record(self, call: ModelCall, outcome: str) -> None:
+        activity.metric_meter().create_counter(
+            HEDGES, "Slow model calls sent a second time, by which request won"
+        ).add(1, {"agent": call.agent_name or "unknown", "outcome": outcome})
+
+    async def handle(self, call: ModelCall, call_next: CallNext) -> ModelResponse:
+        streamed = STREAM_METADATA_KEY in (call.model_settings.metadata or {})
+        if streamed or call.agent_name in self.unhedged_agents or not activity.in_activity():
+            return await call_next(call)
+
+        self.stats.calls += 1
+        agent = self._agents[call.agent_name or "unknown"]
+        agent.credits = min(self.max_credits, agent.credits + self.budget)
+        delay = agent.delay(self.percentile, self.min_samples)
+
+        started = time.monotonic()
+        primary = asyncio.create_task(call_next(call))
+        tasks = [primary]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done or agent.credits < 1:
+                if not done:
+                    self.stats.over_budget += 1
+                    self._record(call, "over_budget")
+                response = await primary
+            else:
+                agent.credits -= 1
+                self.stats.hedged += 1
+                # A copy, so middleware further in can adjust each call separately
+                tasks.append(asyncio.create_task(call_next(dataclasses.replace(call))))
+                winner = await _first_success(tasks)
+                hedge_won = winner is not primary
+                self.stats.hedge_wins += hedge_won
+                self._record(call, "hedge_won" if hedge_won else "primary_won")
+                response = winner.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Wait for the loser to unwind, so its slot and connection are released now
+            await asyncio.gather(*tasks, return_exceptions=True)
+        # When the hedge won, the primary took at least this long
+        agent.latencies.append(time.monotonic() - started)
+        return response
+
+
+async def _first_success(
+    tasks: list["asyncio.Task[ModelResponse]"],
+) -> "asyncio.Task[ModelResponse]":
+    """The first task to return a response; raises the first error if all fail."""
+    pending = set(tasks)
+    errors: list[BaseException] = []
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is None:
+                return task
+            errors.append(error)
+    raise errors[0]
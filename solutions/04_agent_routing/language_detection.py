@@ -0,0 +1,172 @@
+"""
+Deterministic, in-process language detection for the routing workflow.
+
+A tiny character-trigram Naive Bayes model trained on the sample text below.
+It is pure Python with no I/O or randomness, so it is safe to call from
+workflow code and gives the same answer on every replay. When it is confident
+the workflow can hand the query straight to a specialist agent and skip the
+triage model call entirely.
+"""
+
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+# Training text that ships with the module, one short corpus per language.
+# Conversational phrases dominate because that is what users send.
+SAMPLE_TEXT = {
+    "French": (
+        "Bonjour, comment allez-vous aujourd'hui ? Je vais très bien, merci beaucoup. "
+        "Salut ! Est-ce que tu peux m'aider avec une question ? Raconte-moi une histoire. "
+        "Je voudrais savoir quel temps il fait à Paris cette semaine. "
+        "Pourquoi le ciel est-il bleu ? Qu'est-ce que c'est que ce bruit ? "
+        "Nous avons besoin d'une réponse rapide, s'il vous plaît. "
+        "Il était une fois un petit garçon qui vivait dans une maison près de la forêt. "
+        "Les enfants jouent dans le jardin pendant que leurs parents préparent le dîner. "
+        "Où se trouve la gare la plus proche ? Combien coûte ce livre ? "
+        "Je ne comprends pas, pouvez-vous répéter plus lentement ? "
+        "C'est une très bonne idée, j'aimerais beaucoup essayer avec vous. "
+        "Un chasseur sachant chasser doit savoir chasser sans son chien. "
+        "Les chaussettes de l'archiduchesse sont-elles sèches ou archi-sèches ? "
+        "Donne-moi un virelangue, une blague ou une recette de cuisine française. "
+        "Quelle heure est-il ? J'ai faim, allons manger au restaurant ce soir. "
+        "Votre commande sera livrée demain matin avant midi."
+    ),
+    "Spanish": (
+        "¡Hola! ¿Cómo estás hoy? Estoy muy bien, gracias por preguntar. "
+        "¿Puedes ayudarme con una pregunta? Cuéntame un cuento o un trabalenguas. "
+        "Quisiera saber qué tiempo hace en Madrid esta semana. "
+        "¿Por qué el cielo es azul? ¿Qué es ese ruido que se escucha? "
+        "Necesitamos una respuesta rápida, por favor. "
+        "Había una vez un niño pequeño que vivía en una casa cerca del bosque. "
+        "Los niños juegan en el jardín mientras sus padres preparan la cena. "
+        "¿Dónde está la estación más cercana? ¿Cuánto cuesta este libro? "
+        "No entiendo, ¿puedes repetirlo más despacio? "
+        "Es una muy buena idea, me gustaría mucho intentarlo contigo. "
+        "Tres tristes tigres tragaban trigo en un trigal. "
+        "Pablito clavó un clavito, ¿qué clavito clavó Pablito? "
+        "Dame un chiste, una adivinanza o una receta de cocina española. "
+        "¿Qué hora es? Tengo hambre, vamos a comer al restaurante esta noche. "
+        "Su pedido será entregado mañana por la mañana antes del mediodía."
+    ),
+    "English": (
+        "Hello! How are you doing today? I am doing great, thanks for asking. "
+        "Hi there, can you help me with a question? Tell me a story or a tongue twister. "
+        "I would like to know what the weather is like in London this week. "
+        "Why is the sky blue? What is that noise I can hear outside? "
+        "We need a quick answer, please. "
+        "Once upon a time there was a little boy who lived in a house near the forest. "
+        "The children play in the garden while their parents cook dinner. "
+        "Where is the nearest train station? How much does this book cost? "
+        "I don't understand, could you say that again more slowly? "
+        "That is a really good idea, I would love to try it with you. "
+        "Peter Piper picked a peck of pickled peppers. "
+        "She sells seashells by the seashore, and the shells she sells are surely seashells. "
+        "Give me a joke, a riddle or a recipe for something tasty. "
+        "What time is it? I'm hungry, let's go eat at the restaurant tonight. "
+        "Your order will be delivered tomorrow morning before noon."
+    ),
+}
+
+# Queries with fewer trigrams than this are too short to judge ("Hi!")
+MIN_NGRAMS = 8
+
+# Scales the per-trigram average log-likelihood before the softmax; higher
+# values make the model more decisive. Tuned so short, clear sentences land
+# above 0.9 while mixed-language text stays below it.
+SHARPNESS = 12.0
+
+# Queries where more than this share of trigrams never appear in the best
+# language's sample text are out of distribution: a language the model does
+# not know (Portuguese scores as Spanish, German as French) rather than a
+# confident match. They get a uniform distribution, so triage decides.
+MAX_UNSEEN_SHARE = 0.4
+
+_NON_LETTERS = re.compile(r"[^\w']+|[\d_]+")
+
+
+@dataclass(frozen=True)
+class LanguageDetection:
+    """Outcome of classifying a query."""
+
+    language: str
+    """Most likely language name, matching the specialist agent prefix."""
+
+    confidence: float
+    """Posterior probability of ``language`` in the range [0, 1]."""
+
+
+def _trigrams(text: str) -> list[str]:
+    """Lowercase, strip punctuation and pad words so word edges become features."""
+    words = _NON_LETTERS.sub(" ", text.lower()).split()
+    grams = []
+    for word in words:
+        padded = f" {word} "
+        grams.extend(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramLanguageModel:
+    """Character-trigram Naive Bayes classifier with add-one smoothing."""
+
+    def __init__(self, samples: dict[str, str]):
+        self._log_probs: dict[str, dict[str, float]] = {}
+        self._unseen: dict[str, float] = {}
+        vocabulary = {gram for text in samples.values() for gram in _trigrams(text)}
+        for language, text in samples.items():
+            counts = Counter(_trigrams(text))
+            total = sum(counts.values()) + len(vocabulary) + 1
+            self._log_probs[language] = {g: math.log((c + 1) / total) for g, c in counts.items()}
+            self._unseen[language] = math.log(1 / total)
+
+    def scores(self, text: str) -> dict[str, float]:
+        """Posterior probability for every known language.
+
+        Uniform (never confident) for text that is too short or looks like
+        none of the known languages.
+        """
+        grams = _trigrams(text)
+        if len(grams) < MIN_NGRAMS:
+            # Too little evidence: report a uniform (never confident) distribution
+            return {language: 1 / len(self._log_probs) for language in self._log_probs}
+
+        # Average log-likelihood per trigram keeps long inputs from saturating at 1.0
+        averages = {
+            language: sum(table.get(g, self._unseen[language]) for g in grams) / len(grams)
+            for language, table in self._log_probs.items()
+        }
+        best_language = max(averages, key=lambda language: averages[language])
+        unseen = sum(g not in self._log_probs[best_language] for g in grams)
+        if unseen / len(grams) > MAX_UNSEEN_SHARE:
+            return {language: 1 / len(self._log_probs) for language in self._log_probs}
+
+        best = averages[best_language]
+        weights = {lang: math.exp(SHARPNESS * (avg - best)) for lang, avg in averages.items()}
+        total = sum(weights.values())
+        return {language: weight / total for language, weight in weights.items()}
+
+    def detect(self, text: str) -> LanguageDetection:
+        """Return the most likely language and its confidence."""
+        return self.rank(text)[0]
+
+    def rank(self, text: str) -> list[LanguageDetection]:
+        """Every known language, most likely first."""
+        scores = self.scores(text)
+        # Sort by name first so ties always break the same way
+        ordered = sorted(sorted(scores), key=lambda lang: scores[lang], reverse=True)
+        return [LanguageDetection(language=lang, confidence=scores[lang]) for lang in ordered]
+
+
+# Built once per process; the workflow imports this module passed through the sandbox
+DEFAULT_MODEL = TrigramLanguageModel(SAMPLE_TEXT)
+
+
+def detect_language(text: str) -> LanguageDetection:
+    """Classify ``text`` with the bundled model."""
+    return DEFAULT_MODEL.detect(text)
+
+
+def rank_languages(text: str) -> list[LanguageDetection]:
+    """Rank every language for ``text`` with the bundled model, most likely first."""
+    return DEFAULT_MODEL.rank(text)
@@ -0,0 +1,262 @@
+"""
+Multi-process launcher for the routing worker.
+
+One asyncio worker process runs workflow tasks, payload conversion and sandbox
+work on a single core. This launcher starts N copies of worker.py, all
+polling routing-workflow-queue, so a many-core host can use its cores.
+
+Each process gets the same slot and poller limits. On SIGTERM (or Ctrl+C)
+every process stops polling, lets in-flight work finish, and reports the peak
+slot usage it saw. The launcher prints those reports as a summary table.
+
+With ``--metrics-port`` each process serves Prometheus metrics on its own
+port (the given port plus the process index) and the slot summary is replaced
+by the SDK's ``temporal_worker_task_slots_*`` gauges on those endpoints.
+``--tracing`` exports OpenTelemetry spans; see telemetry.py for both.
+
+To run: python launcher.py --processes 4 --max-activities 50
+
+Every option can also be set through the environment variable shown in --help.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import queue
+import signal
+from dataclasses import dataclass, field, replace
+from multiprocessing.queues import Queue
+
+from temporalio.runtime import MetricBuffer, Runtime, TelemetryConfig
+from worker import WorkerSettings
+from worker import main as run_worker
+
+# How often each process samples its slot gauges
+SAMPLE_INTERVAL_SECONDS = 1.0
+
+
+@dataclass
+class SlotUsage:
+    """Peak slot usage for one worker type (workflow, activity, ...)."""
+
+    peak_used: int = 0
+    capacity: int = 0
+
+
+@dataclass
+class ProcessReport:
+    """What a worker process reports back when it exits."""
+
+    index: int
+    pid: int
+    slots: dict[str, SlotUsage] = field(default_factory=dict)
+
+
+class SlotTracker:
+    """Folds the SDK's slot gauges from a MetricBuffer into peak usage per worker type."""
+
+    def __init__(self, buffer: MetricBuffer):
+        self._buffer = buffer
+        self._used: dict[str, int] = {}
+        self._available: dict[str, int] = {}
+        self.slots: dict[str, SlotUsage] = {}
+
+    def sample(self) -> None:
+        for update in self._buffer.retrieve_updates():
+            name = update.metric.name
+            worker_type = str(update.attributes.get("worker_type", "unknown"))
+            if name.endswith("worker_task_slots_used"):
+                self._used[worker_type] = int(update.value)
+            elif name.endswith("worker_task_slots_available"):
+                self._available[worker_type] = int(update.value)
+            else:
+                continue
+            usage = self.slots.setdefault(worker_type, SlotUsage())
+            used = self._used.get(worker_type, 0)
+            usage.peak_used = max(usage.peak_used, used)
+            usage.capacity = max(usage.capacity, used + self._available.get(worker_type, 0))
+
+
+async def _run_process(index: int, settings: WorkerSettings, reports: Queue) -> None:
+    # Stop gracefully on SIGTERM from the launcher or Ctrl+C from the terminal
+    shutdown_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, shutdown_event.set)
+
+    # A runtime has one metrics sink: Prometheus when asked for (the worker
+    # sets that up), otherwise a private buffer we read slot usage from
+    if settings.metrics_port is not None:
+        try:
+            await run_worker(settings, None, shutdown_event)
+        finally:
+            reports.put(ProcessReport(index, os.getpid()))
+        return
+
+    buffer = MetricBuffer(10_000)
+    runtime = Runtime(telemetry=TelemetryConfig(metrics=buffer))
+    tracker = SlotTracker(buffer)
+
+    async def sample_forever() -> None:
+        while True:
+            tracker.sample()
+            await asyncio.sleep(SAMPLE_INTERVAL_SECONDS)
+
+    sampler = asyncio.create_task(sample_forever())
+    try:
+        await run_worker(settings, runtime, shutdown_event)
+    finally:
+        sampler.cancel()
+        tracker.sample()
+        reports.put(ProcessReport(index, os.getpid(), tracker.slots))
+
+
+def _process_main(index: int, settings: WorkerSettings, reports: Queue) -> None:
+    asyncio.run(_run_process(index, settings, reports))
+
+
+def _env_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def print_summary(reports: list[ProcessReport], expected: int, metrics_port: int | None) -> None:
+    if metrics_port is not None:
+        print(f"\n📊 {len(reports)} process(es) stopped; slot usage was exported to Prometheus")
+        if len(reports) < expected:
+            print(f"   ⚠️  {expected - len(reports)} process(es) exited without a report")
+        return
+    print("\n📊 Worker slot usage (peak / capacity)")
+    print(f"   {'Process':<8} {'PID':<8} {'Workflow tasks':<16} {'Activities':<16}")
+    for report in sorted(reports, key=lambda r: r.index):
+        columns = []
+        for worker_type in ("WorkflowWorker", "ActivityWorker"):
+            usage = report.slots.get(worker_type)
+            columns.append(f"{usage.peak_used}/{usage.capacity}" if usage else "-")
+        print(f"   {report.index:<8} {report.pid:<8} {columns[0]:<16} {columns[1]:<16}")
+        for usage in report.slots.values():
+            if usage.capacity and usage.peak_used >= usage.capacity:
+                print(f"   ⚠️  Process {report.index} saturated a slot pool; raise its limit")
+                break
+    if len(reports) < expected:
+        print(f"   ⚠️  {expected - len(reports)} process(es) exited without a report")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run several routing worker processes.")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=_env_int("WORKER_PROCESSES") or os.cpu_count() or 1,
+        help="Worker processes to start (WORKER_PROCESSES, default: CPU count).",
+    )
+    parser.add_argument(
+        "--max-workflow-tasks",
+        type=int,
+        default=_env_int("WORKER_MAX_WORKFLOW_TASKS"),
+        help="Concurrent workflow tasks per process (WORKER_MAX_WORKFLOW_TASKS).",
+    )
+    parser.add_argument(
+        "--max-activities",
+        type=int,
+        default=_env_int("WORKER_MAX_ACTIVITIES"),
+        help="Concurrent activities per process (WORKER_MAX_ACTIVITIES).",
+    )
+    parser.add_argument(
+        "--workflow-pollers",
+        type=int,
+        default=_env_int("WORKER_WORKFLOW_POLLERS"),
+        help="Concurrent workflow task polls per process (WORKER_WORKFLOW_POLLERS).",
+    )
+    parser.add_argument(
+        "--activity-pollers",
+        type=int,
+        default=_env_int("WORKER_ACTIVITY_POLLERS"),
+        help="Concurrent activity task polls per process (WORKER_ACTIVITY_POLLERS).",
+    )
+    parser.add_argument(
+        "--graceful-shutdown",
+        type=float,
+        default=float(os.getenv("WORKER_GRACEFUL_SHUTDOWN_SECONDS", "30")),
+        help="Seconds in-flight activities get to finish on shutdown "
+        "(WORKER_GRACEFUL_SHUTDOWN_SECONDS, default: 30).",
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=_env_int("WORKER_METRICS_PORT"),
+        help="Serve Prometheus metrics from port N + process index (WORKER_METRICS_PORT, "
+        "default: off).",
+    )
+    parser.add_argument(
+        "--tracing",
+        action="store_true",
+        default=os.getenv("WORKER_TRACING", "").lower() in ("1", "true", "yes"),
+        help="Export OpenTelemetry spans (WORKER_TRACING, default: off).",
+    )
+    args = parser.parse_args()
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+
+    settings = WorkerSettings(
+        max_concurrent_workflow_tasks=args.max_workflow_tasks,
+        max_concurrent_activities=args.max_activities,
+        max_concurrent_workflow_task_polls=args.workflow_pollers,
+        max_concurrent_activity_task_polls=args.activity_pollers,
+        graceful_shutdown_seconds=args.graceful_shutdown,
+        metrics_port=args.metrics_port,
+        tracing=args.tracing,
+    )
+
+    def process_settings(index: int) -> WorkerSettings:
+        # Each process needs its own metrics port
+        if settings.metrics_port is None:
+            return settings
+        return replace(settings, metrics_port=settings.metrics_port + index)
+
+    # Spawn (not fork) so each process starts with a clean event loop and runtime
+    context = multiprocessing.get_context("spawn")
+    reports: Queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_process_main, args=(i, process_settings(i), reports), name=f"worker-{i}"
+        )
+        for i in range(args.processes)
+    ]
+
+    def forward_shutdown(signum: int, _frame: object) -> None:
+        print(f"\n🛑 Received {signal.Signals(signum).name}, stopping {len(processes)} worker(s)...")
+        for process in processes:
+            if process.is_alive() and process.pid is not None:
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward_shutdown)
+    signal.signal(signal.SIGINT, forward_shutdown)
+
+    print(f"🚀 Launching {args.processes} worker process(es)")
+    print(f"⚙️  {settings}")
+    for process in processes:
+        process.start()
+
+    # Drain reports while waiting so a full queue never blocks a child's exit
+    collected: list[ProcessReport] = []
+    while len(collected) < len(processes) and any(p.is_alive() for p in processes):
+        try:
+            collected.append(reports.get(timeout=0.5))
+        except queue.Empty:
+            continue
+    for process in processes:
+        process.join()
+    # Reports from processes that exited during the last poll may still be in flight
+    while len(collected) < len(processes):
+        try:
+            collected.append(reports.get(timeout=1))
+        except queue.Empty:
+            break
+
+    print_summary(collected, args.processes, settings.metrics_port)
+
+
+if __name__ == "__main__":
+    main()
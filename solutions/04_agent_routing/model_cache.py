@@ -0,0 +1,201 @@
+"""
+Content-addressed response cache for model activities.
+
+Byte-identical model calls (same agent, instructions, model, tool schema and
+input items) return the stored response instead of calling OpenAI again.
+Entries expire after a TTL and the least recently used ones are evicted once
+the cache is full. The SQLite backend lives in a single file, so several
+worker processes on one host can share it.
+
+Caching happens inside the model activity, so the workflow still records the
+response in its history and replays stay deterministic.
+"""
+
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Collection, Iterable
+from dataclasses import dataclass, is_dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+from agents import Agent, FunctionTool, ModelProvider, ModelResponse
+from model_middleware import CallNext, MiddlewareModelProvider, ModelCall
+from pydantic import BaseModel, TypeAdapter
+
+_RESPONSE_ADAPTER = TypeAdapter(ModelResponse)
+
+
+class ResponseCache(Protocol):
+    """Storage backend for serialized model responses."""
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def put(self, key: str, value: bytes) -> None: ...
+
+
+class MemoryResponseCache:
+    """Per-process LRU cache with TTL expiry."""
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 600):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        # Calls arrive on worker threads (asyncio.to_thread), not only the loop
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() + self._ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+
+class SqliteResponseCache:
+    """LRU cache with TTL expiry stored in a SQLite file shared between processes."""
+
+    def __init__(self, path: str | Path, max_entries: int = 10_000, ttl_seconds: float = 600):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # WAL lets readers in other worker processes proceed while one writes
+        self._db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._db.commit()
+
+    def get(self, key: str) -> bytes | None:
+        now = time.time()
+        with self._lock, self._db:
+            row = self._db.execute(
+                "SELECT value FROM responses WHERE key = ? AND expires_at > ?", (key, now)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, key: str, value: bytes) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, value, now + self._ttl_seconds, now),
+            )
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+
+
+@dataclass
+class CacheStats:
+    """Counters reported by CachingModelProvider."""
+
+    hits: int = 0
+    misses: int = 0
+    bypassed: int = 0
+    """Calls never looked up: opted-out agents or server-side conversation state."""
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def _jsonable(value: Any) -> Any:
+    """Fallback for json.dumps so pydantic models and dataclasses hash stably."""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json", exclude_none=True)
+    if hasattr(value, "to_json_dict"):
+        return value.to_json_dict()
+    if is_dataclass(value) and not isinstance(value, type):
+        return {k: v for k, v in vars(value).items() if not callable(v)}
+    return repr(value)
+
+
+def _tool_schema(tool: Any) -> Any:
+    if isinstance(tool, FunctionTool):
+        return {"name": tool.name, "description": tool.description, "params": tool.params_json_schema}
+    return {"type": type(tool).__name__, "config": tool}
+
+
+def cache_key(call: ModelCall) -> str:
+    """Stable SHA-256 over everything that determines the model's answer."""
+    material = {
+        "agent": call.agent_name,
+        "instructions": call.system_instructions,
+        "model": call.model_name,
+        "settings": call.model_settings,
+        "tools": [_tool_schema(tool) for tool in call.tools],
+        "handoffs": [
+            {"name": h.tool_name, "agent": h.agent_name, "schema": h.input_json_schema}
+            for h in call.handoffs
+        ],
+        "output_schema": (
+            call.output_schema.json_schema()
+            if call.output_schema and not call.output_schema.is_plain_text()
+            else None
+        ),
+        "input": call.input,
+    }
+    encoded = json.dumps(material, sort_keys=True, separators=(",", ":"), default=_jsonable)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CachingModelProvider(MiddlewareModelProvider):
+    """Serve repeated model calls from a ResponseCache."""
+
+    def __init__(
+        self,
+        cache: ResponseCache,
+        inner: ModelProvider | None = None,
+        agents: Iterable[Agent] = (),
+        uncached_agents: Collection[str] = (),
+    ):
+        super().__init__(inner, agents)
+        self.cache = cache
+        self.uncached_agents = frozenset(uncached_agents)
+        self.stats = CacheStats()
+
+    async def handle(self, call: ModelCall, call_next: CallNext) -> ModelResponse:
+        # Calls chained to server-side state depend on more than their inputs
+        stateful = call.kwargs.get("previous_response_id") or call.kwargs.get("conversation_id")
+        if call.agent_name in self.uncached_agents or stateful:
+            self.stats.bypassed += 1
+            return await call_next(call)
+
+        key = cache_key(call)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            self.stats.hits += 1
+            return _RESPONSE_ADAPTER.validate_json(cached)
+
+        self.stats.misses += 1
+        response = await call_next(call)
+        await asyncio.to_thread(self.cache.put, key, _RESPONSE_ADAPTER.dump_json(response))
+        return response
@@ -0,0 +1,189 @@
+"""
+Building blocks for wrapping the model calls made by OpenAIAgentsPlugin.
+
+The plugin runs every LLM call as a Temporal activity and asks its
+``model_provider`` for the model to use. Wrapping that provider lets the
+worker add behaviour around each call (caching, metrics, rate limiting, ...)
+without touching workflow code, so none of it affects determinism.
+
+Activity inputs do not carry the calling agent's name, so middleware looks it
+up from the system instructions of the agents this worker knows about.
+"""
+
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from agents import (
+    Agent,
+    AgentOutputSchemaBase,
+    Handoff,
+    Model,
+    ModelProvider,
+    ModelResponse,
+    ModelSettings,
+    ModelTracing,
+    OpenAIProvider,
+    Tool,
+    TResponseInputItem,
+)
+from agents.items import TResponseStreamEvent
+from openai import AsyncOpenAI
+
+
+@dataclass
+class ModelCall:
+    """One model invocation as seen by middleware."""
+
+    agent_name: str | None
+    model_name: str | None
+    system_instructions: str | None
+    input: str | list[TResponseInputItem]
+    model_settings: ModelSettings
+    tools: list[Tool]
+    output_schema: AgentOutputSchemaBase | None
+    handoffs: list[Handoff]
+    tracing: ModelTracing
+    kwargs: dict[str, Any] = field(default_factory=dict)
+    """Extra keyword arguments (previous_response_id, prompt, ...) passed through as-is."""
+    model: Model | None = None
+    """The wrapped model, for middleware that needs ``stream_response``."""
+
+    def stream(self) -> AsyncIterator[TResponseStreamEvent]:
+        """Stream this call from the wrapped model, bypassing ``get_response``."""
+        if self.model is None:
+            raise RuntimeError("ModelCall has no wrapped model to stream from")
+        return self.model.stream_response(
+            self.system_instructions,
+            self.input,
+            self.model_settings,
+            self.tools,
+            self.output_schema,
+            self.handoffs,
+            self.tracing,
+            **self.kwargs,
+        )
+
+
+CallNext = Callable[[ModelCall], Awaitable[ModelResponse]]
+
+
+def default_model_provider() -> ModelProvider:
+    """The provider OpenAIAgentsPlugin uses when none is given.
+
+    Client retries are disabled so Temporal's activity retry policy is the only
+    retry mechanism.
+    """
+    return OpenAIProvider(openai_client=AsyncOpenAI(max_retries=0))
+
+
+def agent_names_by_instructions(agents: Iterable[Agent]) -> dict[str, str]:
+    """Map static instruction strings to agent names (dynamic instructions are skipped)."""
+    return {agent.instructions: agent.name for agent in agents if isinstance(agent.instructions, str)}
+
+
+class MiddlewareModelProvider(ModelProvider):
+    """A ModelProvider that routes every ``get_response`` call through ``handle``.
+
+    Subclasses override ``handle`` and call ``call_next`` to continue to the
+    wrapped model. Providers can be nested to stack several behaviours.
+    """
+
+    def __init__(
+        self,
+        inner: ModelProvider | None = None,
+        agents: Iterable[Agent] = (),
+    ):
+        self._inner = inner
+        self._agent_names = agent_names_by_instructions(agents)
+
+    @property
+    def inner(self) -> ModelProvider:
+        # Created lazily so the OpenAI client (and its API key check) is only
+        # needed once a model call actually happens
+        if self._inner is None:
+            self._inner = default_model_provider()
+        return self._inner
+
+    def agent_name(self, system_instructions: str | None) -> str | None:
+        """Name of the agent whose instructions these are, if known."""
+        if system_instructions is None:
+            return None
+        return self._agent_names.get(system_instructions)
+
+    def get_model(self, model_name: str | None) -> Model:
+        return _MiddlewareModel(self, self.inner.get_model(model_name), model_name)
+
+    async def handle(self, call: ModelCall, call_next: CallNext) -> ModelResponse:
+        """Override to add behaviour around a model call."""
+        return await call_next(call)
+
+
+class _MiddlewareModel(Model):
+    """Model returned by MiddlewareModelProvider; delegates to the wrapped model."""
+
+    def __init__(self, provider: MiddlewareModelProvider, inner: Model, model_name: str | None):
+        self._provider = provider
+        self._inner = inner
+        self._model_name = model_name
+
+    async def _call_inner(self, call: ModelCall) -> ModelResponse:
+        return await self._inner.get_response(
+            call.system_instructions,
+            call.input,
+            call.model_settings,
+            call.tools,
+            call.output_schema,
+            call.handoffs,
+            call.tracing,
+            **call.kwargs,
+        )
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        call = ModelCall(
+            agent_name=self._provider.agent_name(system_instructions),
+            model_name=self._model_name,
+            system_instructions=system_instructions,
+            input=input,
+            model_settings=model_settings,
+            tools=tools,
+            output_schema=output_schema,
+            handoffs=handoffs,
+            tracing=tracing,
+            kwargs=kwargs,
+            model=self._inner,
+        )
+        return await self._provider.handle(call, self._call_inner)
+
+    def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        # Streaming calls pass straight through to the wrapped model
+        return self._inner.stream_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **kwargs,
+        )
@@ -0,0 +1,110 @@
+"""
+Stream model output from a model activity back to its workflow.
+
+A workflow opts in per call by setting ``STREAM_METADATA_KEY`` in the model
+settings metadata. For those calls the activity streams the response from
+OpenAI and signals batches of text deltas to the calling workflow as they
+arrive, so clients can show partial output long before the run finishes.
+
+The activity still returns the complete ModelResponse, which is what the
+workflow records in history, so results and durability are unchanged. If a
+signal fails, streaming stops for that call but the response is still
+returned.
+
+Each signal carries the activity attempt. When a model activity is retried,
+the workflow drops the output the failed attempt streamed before appending
+the new one, so clients never see an answer twice.
+"""
+
+import dataclasses
+import time
+from collections.abc import Iterable
+
+from agents import Agent, ModelProvider, ModelResponse, Usage
+from agents.exceptions import ModelBehaviorError
+from model_middleware import CallNext, MiddlewareModelProvider, ModelCall
+from openai.types.responses import ResponseCompletedEvent, ResponseTextDeltaEvent
+from routing_types import OutputChunk
+from temporalio import activity
+
+# Model settings metadata key that asks the activity to stream
+STREAM_METADATA_KEY = "temporal_stream_output"
+
+
+def _usage(completed: ResponseCompletedEvent) -> Usage:
+    usage = completed.response.usage
+    if usage is None:
+        return Usage(requests=1)
+    return Usage(
+        requests=1,
+        input_tokens=usage.input_tokens,
+        output_tokens=usage.output_tokens,
+        total_tokens=usage.total_tokens,
+    )
+
+
+class StreamingModelProvider(MiddlewareModelProvider):
+    """Signal text deltas to the calling workflow for calls that ask for it.
+
+    Place this innermost (directly around the OpenAI provider) so outer
+    middleware such as the response cache still sees a normal call.
+    """
+
+    def __init__(
+        self,
+        signal_name: str,
+        inner: ModelProvider | None = None,
+        agents: Iterable[Agent] = (),
+        batch_interval: float = 0.2,
+    ):
+        super().__init__(inner, agents)
+        self.signal_name = signal_name
+        self.batch_interval = batch_interval
+
+    async def handle(self, call: ModelCall, call_next: CallNext) -> ModelResponse:
+        metadata = dict(call.model_settings.metadata or {})
+        if metadata.pop(STREAM_METADATA_KEY, None) is None or not activity.in_activity():
+            return await call_next(call)
+
+        # The flag is for this worker only; do not send it to OpenAI
+        call.model_settings = dataclasses.replace(call.model_settings, metadata=metadata or None)
+
+        info = activity.info()
+        handle = activity.client().get_workflow_handle(
+            info.workflow_id or "", run_id=info.workflow_run_id
+        )
+        pending: list[str] = []
+        last_flush = time.monotonic()
+        streaming = True
+
+        async def flush() -> None:
+            nonlocal last_flush, streaming
+            last_flush = time.monotonic()
+            if not pending or not streaming:
+                return
+            chunk = OutputChunk(info.activity_id, info.attempt, "".join(pending))
+            pending.clear()
+            try:
+                await handle.signal(self.signal_name, chunk)
+            except Exception as e:
+                # Partial output is best effort; the final response still returns
+                activity.logger.warning(f"Stopped streaming output: {e}")
+                streaming = False
+
+        completed: ResponseCompletedEvent | None = None
+        async for event in call.stream():
+            if isinstance(event, ResponseTextDeltaEvent):
+                pending.append(event.delta)
+                if time.monotonic() - last_flush >= self.batch_interval:
+                    await flush()
+            elif isinstance(event, ResponseCompletedEvent):
+                completed = event
+        await flush()
+
+        if completed is None:
+            raise ModelBehaviorError("Model stream ended without a completed response")
+        return ModelResponse(
+            output=completed.response.output,
+            usage=_usage(completed),
+            response_id=completed.response.id,
+        )
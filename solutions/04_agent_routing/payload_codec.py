@@ -0,0 +1,120 @@
+"""
+Payload codecs for the routing worker and starter.
+
+Every model activity stores its full input (instructions, conversation items,
+tool and handoff schemas) and the model's response in workflow history. That
+JSON is repetitive and compresses well, so ``CompressionCodec`` zlib-compresses
+payloads above a size threshold before they leave the client. Small payloads,
+and payloads that would not shrink, are sent unchanged.
+
+A compressed payload wraps the original one, metadata included, so decoding
+restores exactly what the payload converter produced and every payload type
+round-trips. Payloads without the codec's encoding are passed through as-is,
+which makes it safe to enable for workflows that are already running: their
+existing uncompressed history still decodes. Turn it on for workers first
+(or together with starters); a process without the codec cannot read
+compressed payloads. The Temporal UI shows compressed payloads as binary
+unless it is pointed at a codec server.
+
+Payloads that are still large after compression can be offloaded to a blob
+store with the claim-check codec in claim_check.py.
+
+Enable both with environment variables, read by worker.py and starter.py:
+- PAYLOAD_COMPRESSION: "1" to compress payloads
+- PAYLOAD_COMPRESSION_MIN_BYTES: smallest payload worth compressing (default 1024)
+- PAYLOAD_COMPRESSION_LEVEL: zlib level, 1 (fastest) to 9 (smallest) (default 1)
+- PAYLOAD_CLAIM_CHECK_DIR: blob directory; payloads over the threshold go there
+- PAYLOAD_CLAIM_CHECK_MIN_BYTES: smallest payload to offload (default 262144)
+"""
+
+import os
+import zlib
+from collections.abc import Sequence
+
+from claim_check import ClaimCheckCodec, FileBlobStore
+from temporalio.api.common.v1 import Payload
+from temporalio.converter import DataConverter, PayloadCodec
+
+# Metadata encoding that marks a payload compressed by this codec
+ENCODING = b"binary/zlib"
+
+
+class CompressionCodec(PayloadCodec):
+    """Compress payloads of at least ``min_bytes`` with zlib."""
+
+    def __init__(self, min_bytes: int = 1024, level: int = 1):
+        self.min_bytes = min_bytes
+        self.level = level
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._compress(payload) for payload in payloads]
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._decompress(payload) for payload in payloads]
+
+    def _compress(self, payload: Payload) -> Payload:
+        if payload.ByteSize() < self.min_bytes:
+            return payload
+        original = payload.SerializeToString()
+        compressed = zlib.compress(original, self.level)
+        if len(compressed) >= len(original):
+            return payload
+        return Payload(metadata={"encoding": ENCODING}, data=compressed)
+
+    def _decompress(self, payload: Payload) -> Payload:
+        if payload.metadata.get("encoding") != ENCODING:
+            return payload
+        return Payload.FromString(zlib.decompress(payload.data))
+
+
+class CodecChain(PayloadCodec):
+    """Apply several codecs: encode in the given order, decode in reverse."""
+
+    def __init__(self, codecs: Sequence[PayloadCodec]):
+        self.codecs = list(codecs)
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        encoded = list(payloads)
+        for codec in self.codecs:
+            encoded = await codec.encode(encoded)
+        return encoded
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        decoded = list(payloads)
+        for codec in reversed(self.codecs):
+            decoded = await codec.decode(decoded)
+        return decoded
+
+
+def codecs_from_env() -> list[PayloadCodec]:
+    """The codecs enabled by environment variables, in encoding order."""
+    codecs: list[PayloadCodec] = []
+    if os.getenv("PAYLOAD_COMPRESSION", "").strip().lower() in ("1", "true", "yes", "zlib"):
+        codecs.append(
+            CompressionCodec(
+                min_bytes=int(os.getenv("PAYLOAD_COMPRESSION_MIN_BYTES", "1024")),
+                level=int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "1")),
+            )
+        )
+    # Offload what is still large once compressed
+    claim_check_dir = os.getenv("PAYLOAD_CLAIM_CHECK_DIR", "").strip()
+    if claim_check_dir:
+        codecs.append(
+            ClaimCheckCodec(
+                FileBlobStore(claim_check_dir),
+                min_bytes=int(os.getenv("PAYLOAD_CLAIM_CHECK_MIN_BYTES", str(256 * 1024))),
+            )
+        )
+    return codecs
+
+
+def data_converter_from_env() -> DataConverter:
+    """The client data converter, with the codecs enabled in the environment.
+
+    The OpenAI Agents plugin swaps in its own payload converter and keeps the
+    codec, so this is passed to ``Client.connect`` alongside the plugin.
+    """
+    codecs = codecs_from_env()
+    if not codecs:
+        return DataConverter.default
+    return DataConverter(payload_codec=codecs[0] if len(codecs) == 1 else CodecChain(codecs))
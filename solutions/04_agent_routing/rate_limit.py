@@ -0,0 +1,444 @@
+"""
+Host-wide rate limiting and adaptive concurrency for model activities.
+
+Without a limit, every worker process sends model calls as fast as its
+activity slots allow. Under load they all hit OpenAI's rate limits at once,
+get 429s, and retry together in waves, which ruins tail latency.
+``RateLimitedModelProvider`` puts two gates in front of each model call:
+
+- A token bucket sized in requests and tokens per minute. ``SqliteTokenBucket``
+  keeps it in a file, so every worker process on the host draws from the same
+  budget. Each call reserves its estimated tokens (prompt plus completion
+  limit) up front, and the estimate is corrected once the real usage is known.
+  A 429 drains the bucket, so every process pauses instead of only the one
+  that was told to.
+- An AIMD concurrency limit per process. The limit grows by about one for
+  every ``limit`` calls that complete normally. It halves on a 429 and shrinks
+  by 10% when recent latency climbs well above its long-run average for that
+  model, which usually means the provider is queueing requests.
+
+Waiting happens inside the model activity, so it counts against the
+activity's start-to-close timeout. A call that could not start in time is
+instead failed with a retryable error that tells Temporal when to retry, so
+its slot is freed for work that can run now. Each deferral is an activity
+attempt, so model activities need a retry policy limited by time rather than
+attempts (agent_config.py). A call that is deferred or cancelled before it
+is sent gives its reservation back.
+
+The current limit, time spent throttled and 429s are exported as metrics
+(see telemetry.py) and counted in ``RateLimitStats``.
+"""
+
+import asyncio
+import json
+import math
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Protocol
+
+from agents import Agent, ModelProvider, ModelResponse
+from model_middleware import CallNext, MiddlewareModelProvider, ModelCall
+from openai import RateLimitError
+from temporalio import activity
+from temporalio.exceptions import ApplicationError
+
+# Metric names, next to the model metrics in telemetry.py
+CONCURRENCY_LIMIT = "agent_model_concurrency_limit"
+THROTTLED = "agent_model_throttled"
+RATE_LIMITED = "agent_model_rate_limited"
+DEFERRED = "agent_model_deferred"
+
+# Completion tokens assumed for calls whose settings do not cap them
+DEFAULT_COMPLETION_TOKENS = 512
+
+# Roughly how many characters make one token for English-like text
+CHARS_PER_TOKEN = 4
+
+
+class TokenBucket(Protocol):
+    """Request and token budgets shared by everything that calls the model."""
+
+    def reserve(self, requests: float, tokens: float, max_wait: float) -> float:
+        """Seconds to wait before the reservation is usable.
+
+        Nothing is reserved when the wait would be longer than ``max_wait``.
+        """
+        ...
+
+    def adjust(self, tokens: float) -> None:
+        """Charge (or refund, when negative) tokens after the real usage is known."""
+        ...
+
+    def refund(self, requests: float, tokens: float) -> None:
+        """Give back a reservation for a call that was never sent."""
+        ...
+
+    def drain(self, seconds: float) -> None:
+        """Use up the request budget so every caller waits at least ``seconds``."""
+        ...
+
+
+def _reserve(
+    levels: dict[str, tuple[float, float]],
+    rates: dict[str, float],
+    capacities: dict[str, float],
+    amounts: dict[str, float],
+    now: float,
+    max_wait: float,
+) -> tuple[float, dict[str, tuple[float, float]]]:
+    """Refill each bucket to ``now`` and take ``amounts`` from it if the wait fits.
+
+    Levels may go negative: that debt is what later callers wait out, so
+    reservations are served in the order they were made. Negative amounts
+    are refunds, which never fill a bucket past its capacity.
+    """
+    refilled = {}
+    for name, rate in rates.items():
+        level, updated = levels.get(name, (capacities[name], now))
+        refilled[name] = min(capacities[name], level + (now - updated) * rate)
+    wait = max(
+        (max(0.0, amounts[name] - refilled[name]) / rate for name, rate in rates.items()),
+        default=0.0,
+    )
+    if wait > max_wait:
+        return wait, {name: (level, now) for name, level in refilled.items()}
+    return wait, {
+        name: (min(capacities[name], level - amounts[name]), now)
+        for name, level in refilled.items()
+    }
+
+
+class _Limits:
+    """Per-second refill rates and burst capacities for the configured budgets."""
+
+    def __init__(
+        self,
+        requests_per_minute: float | None,
+        tokens_per_minute: float | None,
+        burst_seconds: float,
+    ):
+        per_minute = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.rates = {name: limit / 60 for name, limit in per_minute.items() if limit}
+        # Allow a few seconds' worth at once, not a whole minute's quota in one burst
+        self.capacities = {name: rate * burst_seconds for name, rate in self.rates.items()}
+
+
+class MemoryTokenBucket(_Limits):
+    """Per-process token bucket."""
+
+    def __init__(
+        self,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        burst_seconds: float = 10,
+    ):
+        super().__init__(requests_per_minute, tokens_per_minute, burst_seconds)
+        self._levels: dict[str, tuple[float, float]] = {}
+
+    def reserve(self, requests: float, tokens: float, max_wait: float) -> float:
+        wait, self._levels = _reserve(
+            self._levels,
+            self.rates,
+            self.capacities,
+            {"requests": requests, "tokens": tokens},
+            time.time(),
+            max_wait,
+        )
+        return wait
+
+    def adjust(self, tokens: float) -> None:
+        if "tokens" in self._levels:
+            level, updated = self._levels["tokens"]
+            self._levels["tokens"] = (level - tokens, updated)
+
+    def refund(self, requests: float, tokens: float) -> None:
+        self.reserve(-requests, -tokens, math.inf)
+
+    def drain(self, seconds: float) -> None:
+        if "requests" in self.rates:
+            self.reserve(0, 0, math.inf)
+            level, updated = self._levels["requests"]
+            self._levels["requests"] = (min(level, -seconds * self.rates["requests"]), updated)
+
+
+class SqliteTokenBucket(_Limits):
+    """Token bucket stored in a SQLite file shared by the worker processes on a host.
+
+    Every process must be configured with the same limits.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        burst_seconds: float = 10,
+    ):
+        super().__init__(requests_per_minute, tokens_per_minute, burst_seconds)
+        self._lock = threading.Lock()
+        # Transactions are managed by hand: BEGIN IMMEDIATE serializes the
+        # read-refill-write of a reservation across processes
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _update(self, amounts: dict[str, float], max_wait: float, debt: dict[str, float]) -> float:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                levels = {
+                    name: (level, updated)
+                    for name, level, updated in self._db.execute(
+                        "SELECT name, level, updated FROM buckets"
+                    )
+                }
+                wait, levels = _reserve(
+                    levels, self.rates, self.capacities, amounts, time.time(), max_wait
+                )
+                for name, extra in debt.items():
+                    if name in levels:
+                        level, updated = levels[name]
+                        levels[name] = (min(level, -extra), updated)
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?)",
+                    [(name, level, updated) for name, (level, updated) in levels.items()],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return wait
+
+    def reserve(self, requests: float, tokens: float, max_wait: float) -> float:
+        return self._update({"requests": requests, "tokens": tokens}, max_wait, {})
+
+    def adjust(self, tokens: float) -> None:
+        self._update({"requests": 0, "tokens": tokens}, math.inf, {})
+
+    def refund(self, requests: float, tokens: float) -> None:
+        self._update({"requests": -requests, "tokens": -tokens}, math.inf, {})
+
+    def drain(self, seconds: float) -> None:
+        rate = self.rates.get("requests")
+        if rate:
+            self._update({"requests": 0, "tokens": 0}, math.inf, {"requests": seconds * rate})
+
+
+class AdaptiveConcurrency:
+    """Additive-increase, multiplicative-decrease limit on model calls in flight."""
+
+    def __init__(
+        self,
+        maximum: int = 64,
+        initial: int = 8,
+        minimum: int = 1,
+        latency_tolerance: float = 2.0,
+    ):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(max(minimum, min(initial, maximum)))
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self._released = asyncio.Event()
+        # Per model: (short-run average, long-run average, samples) of latency in seconds
+        self._latency: dict[str | None, tuple[float, float, int]] = {}
+        self._last_decrease = 0.0
+
+    async def acquire(self, timeout: float) -> bool:
+        """Take a slot, or return False if none frees up within ``timeout`` seconds."""
+        deadline = time.monotonic() + timeout
+        while self.in_flight >= int(self.limit):
+            self._released.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._released.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._released.set()
+
+    def expected_latency(self, model: str | None) -> float | None:
+        """Long-run average latency of this model's calls, once there is one."""
+        stats = self._latency.get(model)
+        return stats[1] if stats else None
+
+    def on_success(self, model: str | None, latency: float) -> None:
+        short, long, samples = self._latency.get(model, (latency, latency, 0))
+        short += 0.3 * (latency - short)
+        long += 0.02 * (latency - long)
+        self._latency[model] = (short, long, samples + 1)
+        if samples >= 10 and short > self.latency_tolerance * long:
+            # Calls are queueing at the provider: back off before the 429s start
+            self._decrease(0.9, short)
+        else:
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+        self._released.set()
+
+    def on_overload(self) -> None:
+        """A 429: the provider is already over its limit."""
+        short = max((stats[0] for stats in self._latency.values()), default=1.0)
+        self._decrease(0.5, short)
+
+    def _decrease(self, factor: float, interval: float) -> None:
+        # Once per round trip: the calls already in flight all see the same overload
+        now = time.monotonic()
+        if now - self._last_decrease < interval:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * factor)
+
+
+@dataclass
+class RateLimitStats:
+    """Counters reported by RateLimitedModelProvider."""
+
+    calls: int = 0
+    throttled_calls: int = 0
+    """Calls that waited for the token bucket or a concurrency slot."""
+    throttled_seconds: float = 0.0
+    rate_limited: int = 0
+    """429 responses from the provider."""
+    deferred: int = 0
+    """Calls handed back to Temporal to retry later instead of waiting."""
+
+
+def estimate_tokens(call: ModelCall) -> int:
+    """Prompt tokens (from its length) plus the completion limit, as providers count them."""
+    prompt = call.input if isinstance(call.input, str) else json.dumps(call.input, default=str)
+    prompt_chars = len(prompt) + len(call.system_instructions or "")
+    completion = call.model_settings.max_tokens or DEFAULT_COMPLETION_TOKENS
+    return prompt_chars // CHARS_PER_TOKEN + completion
+
+
+def retry_after_seconds(error: RateLimitError) -> float:
+    """How long a 429 asks callers to wait, defaulting to one second."""
+    headers = error.response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        return float(headers.get("retry-after") or 1)
+    except ValueError:
+        # An HTTP date, which OpenAI does not send
+        return 1.0
+
+
+def _activity_time_left() -> float:
+    info = activity.info()
+    if info.start_to_close_timeout is None:
+        return math.inf
+    elapsed = (datetime.now(timezone.utc) - info.started_time).total_seconds()
+    return info.start_to_close_timeout.total_seconds() - elapsed
+
+
+class RateLimitedModelProvider(MiddlewareModelProvider):
+    """Hold model calls to a shared token bucket and an adaptive concurrency limit.
+
+    Place this inside the response cache, so cache hits are never throttled,
+    and outside InstrumentedModelProvider, so model latency excludes waiting.
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket | None,
+        concurrency: AdaptiveConcurrency,
+        inner: ModelProvider | None = None,
+        agents: Iterable[Agent] = (),
+    ):
+        super().__init__(inner, agents)
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.stats = RateLimitStats()
+
+    def _defer(self, wait: float, reason: str) -> ApplicationError:
+        self.stats.deferred += 1
+        activity.metric_meter().create_counter(
+            DEFERRED, "Model calls sent back to Temporal to retry later"
+        ).add(1)
+        return ApplicationError(
+            f"Model call deferred: {reason}",
+            type="ModelRateLimited",
+            next_retry_delay=timedelta(seconds=max(wait, 1.0)),
+        )
+
+    async def _refund(self, estimate: int) -> None:
+        if self.bucket is not None:
+            await asyncio.to_thread(self.bucket.refund, 1, estimate)
+
+    async def handle(self, call: ModelCall, call_next: CallNext) -> ModelResponse:
+        if not activity.in_activity():
+            return await call_next(call)
+
+        self.stats.calls += 1
+        meter = activity.metric_meter().with_additional_attributes(
+            {"agent": call.agent_name or "unknown"}
+        )
+        # Leave the call itself enough of the activity's timeout
+        expected = self.concurrency.expected_latency(call.model_name)
+        time_left = _activity_time_left()
+        max_wait = max(0.0, time_left - expected if expected is not None else time_left / 2)
+
+        started = time.monotonic()
+        estimate = estimate_tokens(call)
+        wait = 0.0
+        if self.bucket is not None:
+            wait = await asyncio.to_thread(self.bucket.reserve, 1, estimate, max_wait)
+            if wait > max_wait:
+                raise self._defer(wait, f"host rate limit needs {wait:.1f}s")
+        try:
+            if wait:
+                await asyncio.sleep(wait)
+            queued = self.concurrency.in_flight >= int(self.concurrency.limit)
+            acquired = await self.concurrency.acquire(
+                max(0.0, max_wait - (time.monotonic() - started))
+            )
+        except asyncio.CancelledError:
+            # A losing hedge or a cancelled activity: the call is never sent
+            await self._refund(estimate)
+            raise
+        if not acquired:
+            # The call is not sent now, so its retry must not pay twice
+            await self._refund(estimate)
+            raise self._defer(expected or 1.0, f"{int(self.concurrency.limit)} calls in flight")
+
+        throttled = time.monotonic() - started
+        if wait or queued:
+            self.stats.throttled_calls += 1
+            self.stats.throttled_seconds += throttled
+        meter.create_histogram_timedelta(
+            THROTTLED, "Time model calls waited for the rate limiter", unit="ms"
+        ).record(timedelta(seconds=throttled))
+
+        call_started = time.monotonic()
+        try:
+            response = await call_next(call)
+        except RateLimitError as e:
+            self.stats.rate_limited += 1
+            meter.create_counter(RATE_LIMITED, "429 responses from the model provider").add(1)
+            self.concurrency.on_overload()
+            if self.bucket is not None:
+                await asyncio.to_thread(self.bucket.drain, retry_after_seconds(e))
+            raise
+        finally:
+            self.concurrency.release()
+            activity.metric_meter().create_gauge(
+                CONCURRENCY_LIMIT, "Model calls allowed in flight in this process"
+            ).set(int(self.concurrency.limit))
+
+        self.concurrency.on_success(call.model_name, time.monotonic() - call_started)
+        if self.bucket is not None and response.usage.total_tokens:
+            await asyncio.to_thread(self.bucket.adjust, response.usage.total_tokens - estimate)
+        return response
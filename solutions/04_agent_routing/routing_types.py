@@ -0,0 +1,101 @@
+"""
+Data types passed into and out of the routing workflows.
+
+They live outside workflow.py and session.py so the worker can pass this
+module through to the workflow sandbox (see sandbox.py). Every workflow run
+re-imports its workflow module in a fresh sandbox, and building dataclasses
+is the largest part of that import; classes defined here are built once per
+process instead. Keep this module to plain data: no workflow logic, I/O or
+clocks.
+"""
+
+from dataclasses import dataclass, field
+
+
+@dataclass
+class RoutingResult:
+    """Workflow result plus the routing decision, kept for auditing."""
+
+    response: str
+    agent: str
+    route: str
+    detected_language: str
+    confidence: float
+    speculation: str | None = None
+    """"hit" or "miss" when triage ran speculatively, otherwise None."""
+
+
+@dataclass
+class OutputChunk:
+    """A batch of streamed text, signalled to the workflow by a model activity."""
+
+    activity_id: str
+    attempt: int
+    """The activity attempt that produced it; a retry replaces earlier output."""
+    text: str
+
+
+@dataclass
+class OutputSnapshot:
+    """Partial output returned by the ``output_since`` query."""
+
+    chunks: list[str]
+    done: bool
+    response: str | None = None
+    """The specialist's full answer, set once the agents have finished."""
+    restarts: int = 0
+    """Times output was discarded because a model call was retried. When it
+    changes, earlier offsets are stale: poll again from offset 0."""
+
+
+@dataclass
+class SessionConfig:
+    """Limits for one conversation; carried over on continue-as-new."""
+
+    prompt_token_budget: int = 3000
+    """Compact older turns once the estimated prompt is larger than this."""
+    keep_recent_messages: int = 6
+    """Messages (user and assistant) always kept verbatim when compacting."""
+    summarize: bool = True
+    """Fold compacted turns into a summary; when False they are dropped."""
+    max_history_events: int = 1000
+    """Continue as new once event history is this long."""
+    idle_timeout_seconds: float = 3600
+    """End the session after this long without a message."""
+
+
+@dataclass
+class SessionState:
+    """The compacted conversation, handed from one run to the next."""
+
+    messages: list[dict[str, str]] = field(default_factory=list)
+    summary: str | None = None
+    turns: int = 0
+    compactions: int = 0
+    agent: str | None = None
+    """Specialist serving the conversation; later turns skip triage."""
+    triage_avoided: int = 0
+    """Turns routed straight to ``agent`` that would otherwise have run triage."""
+    runs: int = 1
+    """How many runs (continue-as-new generations) this session has used."""
+
+
+@dataclass
+class SessionInput:
+    """Arguments for RoutingSessionWorkflow.run."""
+
+    config: SessionConfig = field(default_factory=SessionConfig)
+    state: SessionState | None = None
+
+
+@dataclass
+class SessionReply:
+    """Result of one ``send_message`` update."""
+
+    response: str
+    agent: str
+    route: str
+    turn: int
+    prompt_tokens: int
+    """Estimated prompt size sent for this turn, after any compaction."""
+    compacted: bool
@@ -0,0 +1,36 @@
+"""
+Workflow sandbox configuration for the routing worker.
+
+Temporal runs every workflow in a sandbox: each run re-imports its workflow
+module in isolation, so state left behind by one run cannot leak into the
+next. Modules that are passed through are imported once by the worker
+process and shared by every sandbox instead of being re-imported per run.
+
+The OpenAI Agents plugin already passes ``openai``, ``agents`` and ``mcp``
+through. ``PASSTHROUGH_MODULES`` adds this solution's own modules that
+workflow code imports and that are deterministic: data types, the agent
+registry and configuration, the language classifier and streaming helpers.
+workflow.py and session.py also import them inside
+``workflow.unsafe.imports_passed_through()``; naming them here keeps them
+shared however they are imported. The workflow modules themselves stay
+sandboxed, so the sandbox still checks their code for non-determinism.
+"""
+
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner, SandboxRestrictions
+
+PASSTHROUGH_MODULES = (
+    "agent_config",
+    "agent_registry",
+    "language_detection",
+    "model_streaming",
+    "routing_types",
+    # Imported lazily by pydantic while decoding workflow input
+    "annotated_types",
+)
+
+
+def workflow_runner() -> SandboxedWorkflowRunner:
+    """The sandbox runner for Worker(), with this solution's modules passed through."""
+    return SandboxedWorkflowRunner(
+        restrictions=SandboxRestrictions.default.with_passthrough_modules(*PASSTHROUGH_MODULES)
+    )
@@ -0,0 +1,210 @@
+"""
+Long-lived conversational routing session.
+
+RoutingWorkflow answers one message and finishes, so every follow-up pays for
+triage again and loses the conversation. RoutingSessionWorkflow keeps a chat
+open instead: each user message arrives as a ``send_message`` update, is
+routed like a RoutingWorkflow query, and is answered with the earlier turns
+as context. The update returns the answer to the caller.
+
+Routing is sticky: once a specialist has answered, later messages go
+straight to it and only a detected language switch sends the conversation
+back through the fast path or triage. ``SessionState.triage_avoided`` counts
+the triage calls this saved.
+
+Two limits keep very long chats bounded:
+
+- Prompt size. Only the user messages and the specialists' final answers
+  are kept (handoff tool calls add nothing to later turns). Once the
+  estimated prompt passes ``prompt_token_budget``, older turns are folded
+  into a running summary by the summarizer agent (or dropped, with
+  ``summarize=False``), keeping the most recent messages verbatim.
+- Event history. Once history passes ``max_history_events`` (or the server
+  suggests it), the workflow waits for in-flight updates and continues as
+  new, carrying only the compacted conversation. Replays never have to
+  process more than one run's worth of turns.
+
+The session ends on the ``end_session`` signal or after ``idle_timeout_seconds``
+without a message.
+"""
+
+import asyncio
+from datetime import timedelta
+from typing import cast
+
+from agents import Runner, TResponseInputItem, trace
+from temporalio import workflow
+
+# Pure-Python and deterministic, so it is safe to share across sandboxed runs
+with workflow.unsafe.imports_passed_through():
+    import agent_registry
+    from routing_types import SessionConfig, SessionInput, SessionReply, SessionState
+
+# Workflow code: imported inside the sandbox, so its determinism is still checked
+from workflow import (
+    ROUTE_STICKY,
+    SPECIALISTS,
+    SUMMARIZER_AGENT,
+    choose_starting_agent,
+    load_agents,
+    record_routing_outcome,
+)
+
+# Rough token estimate for English-like text; close enough to size prompts
+CHARS_PER_TOKEN = 4
+# Role and framing tokens the API adds to every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+SUMMARIZE_REQUEST = "Summarize the conversation above."
+
+
+def estimate_tokens(messages: list[dict[str, str]]) -> int:
+    """Approximate prompt tokens for a list of role/content messages."""
+    return sum(
+        len(message["content"]) // CHARS_PER_TOKEN + MESSAGE_OVERHEAD_TOKENS for message in messages
+    )
+
+
+@workflow.defn
+class RoutingSessionWorkflow:
+    def __init__(self) -> None:
+        self._config = SessionConfig()
+        self._state = SessionState()
+        self._ended = False
+        # Loaded once per run, so a continue-as-new picks up configuration changes
+        self._agents: agent_registry.AgentRegistry | None = None
+        # Updates may arrive together; turns are answered one at a time, in order
+        self._turn_lock = asyncio.Lock()
+
+    @workflow.run
+    async def run(self, session: SessionInput) -> SessionState:
+        self._config = session.config
+        self._agents = await load_agents()
+        if session.state is not None:
+            self._state = session.state
+            self._state.runs += 1
+
+        idle_timeout = timedelta(seconds=self._config.idle_timeout_seconds)
+        while not self._ended and not self._history_too_long():
+            turns = self._state.turns
+            try:
+                # Wake up on every answered message so the idle timer restarts
+                await workflow.wait_condition(
+                    lambda: self._ended or self._history_too_long() or self._state.turns != turns,
+                    timeout=idle_timeout,
+                )
+            except asyncio.TimeoutError:
+                if not self._turn_lock.locked():
+                    workflow.logger.info("Session idle, ending it")
+                    self._ended = True
+
+        # Let accepted updates finish before this run closes
+        await workflow.wait_condition(workflow.all_handlers_finished)
+        if not self._ended:
+            workflow.logger.info(
+                f"History at {workflow.info().get_current_history_length()} events, "
+                "continuing as new"
+            )
+            workflow.continue_as_new(SessionInput(config=self._config, state=self._state))
+        return self._state
+
+    @workflow.update
+    async def send_message(self, msg: str) -> SessionReply:
+        async with self._turn_lock:
+            return await self._answer(msg)
+
+    @send_message.validator
+    def validate_message(self, msg: str) -> None:
+        if not msg.strip():
+            raise ValueError("Message is empty")
+        if self._ended:
+            raise ValueError("Session has ended")
+
+    @workflow.signal
+    def end_session(self) -> None:
+        self._ended = True
+
+    @workflow.query
+    def conversation(self) -> SessionState:
+        return self._state
+
+    def _history_too_long(self) -> bool:
+        info = workflow.info()
+        return (
+            info.get_current_history_length() >= self._config.max_history_events
+            or info.is_continue_as_new_suggested()
+        )
+
+    async def _loaded_agents(self) -> agent_registry.AgentRegistry:
+        # Updates can arrive before run() has loaded the configuration
+        await workflow.wait_condition(lambda: self._agents is not None)
+        assert self._agents is not None
+        return self._agents
+
+    def _summary_messages(self) -> list[dict[str, str]]:
+        if self._state.summary is None:
+            return []
+        return [{"role": "system", "content": SUMMARY_PREFIX + self._state.summary}]
+
+    async def _answer(self, msg: str) -> SessionReply:
+        agents = await self._loaded_agents()
+        user_message = {"role": "user", "content": msg}
+        compacted = await self._compact(user_message)
+
+        prompt = [*self._summary_messages(), *self._state.messages, user_message]
+        starting_agent, route, detection = choose_starting_agent(agents, msg, self._state.agent)
+        with trace("Routing session", group_id=workflow.info().workflow_id):
+            result = await Runner.run(starting_agent, input=cast(list[TResponseInputItem], prompt))
+        response = str(result.final_output)
+        record_routing_outcome(route, detection.language, result.last_agent.name)
+        if route == ROUTE_STICKY:
+            self._state.triage_avoided += 1
+        # Remember the specialist that answered (triage itself never does)
+        if result.last_agent.name in SPECIALISTS.values():
+            self._state.agent = result.last_agent.name
+
+        # Keep the turn only once it has been answered, so messages stay in pairs
+        self._state.messages += [user_message, {"role": "assistant", "content": response}]
+        self._state.turns += 1
+        return SessionReply(
+            response=response,
+            agent=result.last_agent.name,
+            route=route,
+            turn=self._state.turns,
+            prompt_tokens=estimate_tokens(prompt),
+            compacted=compacted,
+        )
+
+    async def _compact(self, next_message: dict[str, str]) -> bool:
+        """Summarize or drop older turns if the next prompt would exceed the budget."""
+        prompt = [*self._summary_messages(), *self._state.messages, next_message]
+        if estimate_tokens(prompt) <= self._config.prompt_token_budget:
+            return False
+
+        # Cut on a turn boundary so no answer is kept without its question
+        keep = self._config.keep_recent_messages - self._config.keep_recent_messages % 2
+        cut = len(self._state.messages) - keep
+        if cut <= 0:
+            return False
+        older, recent = self._state.messages[:cut], self._state.messages[cut:]
+
+        if self._config.summarize:
+            agents = await self._loaded_agents()
+            inputs = [
+                *self._summary_messages(),
+                *older,
+                {"role": "user", "content": SUMMARIZE_REQUEST},
+            ]
+            with trace("Routing session summary", group_id=workflow.info().workflow_id):
+                result = await Runner.run(
+                    agents[SUMMARIZER_AGENT], input=cast(list[TResponseInputItem], inputs)
+                )
+            self._state.summary = str(result.final_output)
+        self._state.messages = recent
+        self._state.compactions += 1
+        workflow.logger.info(
+            f"Compacted {len(older)} message(s); prompt now ~"
+            f"{estimate_tokens([*self._summary_messages(), *recent, next_message])} tokens"
+        )
+        return True
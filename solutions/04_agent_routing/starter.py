@@ -10,47 +10,157 @@ It demonstrates how to:
 
 To run: python starter.py "Your query here"
 Example: python starter.py "¡Hola! Cuéntame un trabalenguas."
+
+Streaming: python starter.py --stream "Your query here"
+Prints the specialist's answer as it is generated, then the final result.
+
+Speculation: python starter.py --speculate 2 "¿Qué tal?"
+When the query needs triage, the two likeliest specialists start alongside
+it and the one triage picks is kept (also works with --bulk).
+
+Chat mode: python starter.py --session
+Opens a RoutingSessionWorkflow and sends each line you type as a follow-up
+message. Type "exit" (or press Ctrl+D) to end the session.
+
+Bulk mode: python starter.py --bulk queries.jsonl --concurrency 50
+Each JSONL line is either a JSON string or an object with a "query", "msg"
+or "body" field. Results are printed as they finish, followed by a
+throughput and latency report.
+
+Idempotent submission: python starter.py --idempotency-key order-1234 "Hola"
+The workflow ID is derived from the key, so submitting again with the same
+key (after a timeout or crash, say) returns the existing run's answer
+instead of starting a duplicate. --on-duplicate chooses what happens when
+that workflow already exists (see DUPLICATE_POLICIES). In bulk mode the key
+names the batch and each line gets its own key, so a rerun of the same file
+only starts the lines that never started.
 """
 
+import argparse
 import asyncio
-import sys
+import hashlib
+import json
+import math
+import secrets
+import time
 from datetime import datetime
+from pathlib import Path
 
 import pytz
 from dotenv import load_dotenv
-from temporalio.client import Client
+from payload_codec import data_converter_from_env
+from session import RoutingSessionWorkflow, SessionConfig, SessionInput
+from temporalio.client import Client, WorkflowHandle
+from temporalio.common import WorkflowIDConflictPolicy, WorkflowIDReusePolicy
 from temporalio.contrib.openai_agents import OpenAIAgentsPlugin
+from temporalio.exceptions import WorkflowAlreadyStartedError
 
 # Import workflow class and task queue from workflow module
-from workflow import TASK_QUEUE, RoutingWorkflow
+from workflow import TASK_QUEUE, RoutingResult, RoutingWorkflow
 
 # Load environment variables from .env file (includes OPENAI_API_KEY)
 load_dotenv()
 
 
-async def main():
-    """
-    Execute the routing workflow with sample queries in different languages.
+# JSONL fields that may carry the query text, checked in order
+QUERY_KEYS = ("query", "msg", "body")
 
-    This function:
-    1. Connects to Temporal server with OpenAI Agents SDK plugin
-    2. Generates a unique workflow ID with timestamp
-    3. Starts the routing workflow with a user query
-    4. Waits for the workflow to complete
-    5. Displays the agent's response
+# What to do when the workflow for an idempotency key already exists:
+# (policy while it is running, policy once it has closed)
+DUPLICATE_POLICIES = {
+    # Attach to the existing run, running or closed; never start a second one
+    "attach": (WorkflowIDConflictPolicy.USE_EXISTING, WorkflowIDReusePolicy.REJECT_DUPLICATE),
+    # Attach while it runs; start again only if it failed, timed out or was cancelled
+    "retry-failed": (
+        WorkflowIDConflictPolicy.USE_EXISTING,
+        WorkflowIDReusePolicy.ALLOW_DUPLICATE_FAILED_ONLY,
+    ),
+    # Refuse: the key has already been used
+    "reject": (WorkflowIDConflictPolicy.FAIL, WorkflowIDReusePolicy.REJECT_DUPLICATE),
+}
 
-    The workflow will route the query to the appropriate language specialist.
+
+def load_queries(path: Path) -> list[str]:
+    """Read one query per non-empty JSONL line."""
+    queries = []
+    for line_number, line in enumerate(path.read_text(encoding="utf-8").splitlines(), 1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if isinstance(record, str):
+            queries.append(record)
+            continue
+        query = next((record[key] for key in QUERY_KEYS if key in record), None)
+        if not isinstance(query, str):
+            raise ValueError(f"{path}:{line_number}: expected one of {', '.join(QUERY_KEYS)}")
+        queries.append(query)
+    return queries
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def make_workflow_id(prefix: str) -> str:
+    """Build a unique workflow ID with an EST timestamp for human-readable tracking."""
+    # This follows the workshop convention: {prefix}-{day}-{month}-{date}-{time}est,
+    # on a 24-hour clock to the millisecond, plus a random suffix so IDs made in
+    # the same millisecond (by any number of processes) still differ
+    est = pytz.timezone("US/Eastern")  # Create EST timezone object
+    now = datetime.now(est)  # Get current time in EST
+    # Format timestamp as readable string with day-month-date-time pattern
+    timestamp = f"{now.strftime('%a-%b-%d-%H%M%S').lower()}.{now.microsecond // 1000:03d}"
+    return f"{prefix}-{timestamp}est-{secrets.token_hex(4)}"
+
+
+def idempotent_workflow_id(prefix: str, key: str) -> str:
+    """The workflow ID for a client-supplied idempotency key; the same key always maps to it."""
+    # Hashed, so any key (however long, whatever characters) makes a valid ID
+    return f"{prefix}-key-{hashlib.sha256(key.encode()).hexdigest()[:32]}"
+
+
+async def start_routing(
+    client: Client,
+    args: list,
+    workflow_id: str,
+    on_duplicate: str | None = None,
+) -> WorkflowHandle[RoutingWorkflow, RoutingResult]:
+    """Start RoutingWorkflow, or with ``on_duplicate`` attach to the run that has this ID.
+
+    A key stands for one submission: reusing it with a different query
+    returns the answer to the first one.
     """
-    # Get query from command line argument or use default
-    if len(sys.argv) > 1:
-        query = sys.argv[1]
-    else:
-        query = "Hi! Tell me a tongue twister."
+    if on_duplicate is None:
+        return await client.start_workflow(
+            RoutingWorkflow.run, args=args, id=workflow_id, task_queue=TASK_QUEUE
+        )
+    conflict_policy, reuse_policy = DUPLICATE_POLICIES[on_duplicate]
+    try:
+        return await client.start_workflow(
+            RoutingWorkflow.run,
+            args=args,
+            id=workflow_id,
+            task_queue=TASK_QUEUE,
+            id_conflict_policy=conflict_policy,
+            id_reuse_policy=reuse_policy,
+        )
+    except WorkflowAlreadyStartedError as e:
+        if on_duplicate == "reject":
+            raise
+        # The key's run has already closed: its result answers this submission too
+        return client.get_workflow_handle_for(RoutingWorkflow.run, workflow_id, run_id=e.run_id)
+
 
-    # Connect to local Temporal server
-    # OpenAI Agents SDK plugin is required to coordinate agent execution
-    client = await Client.connect(
+async def connect() -> Client:
+    """Connect to the local Temporal server with the OpenAI Agents SDK plugin."""
+    return await Client.connect(
         "localhost:7233",  # Temporal server address (default local dev server)
+        # Must match the worker's codec (PAYLOAD_COMPRESSION) to read results
+        data_converter=data_converter_from_env(),
         plugins=[
             # Enable OpenAI Agents SDK integration
             # This plugin handles agent execution as Temporal activities
@@ -58,26 +168,76 @@ async def main():
         ],
     )
 
-    # Generate workflow ID with EST timestamp for human-readable tracking
-    # This follows the workshop convention: {prefix}-{day}-{month}-{date}-{time}est
-    est = pytz.timezone("US/Eastern")  # Create EST timezone object
-    now = datetime.now(est)  # Get current time in EST
-    # Format timestamp as readable string with day-month-date-time pattern
-    workflow_id = f"routing-{now.strftime('%a-%b-%d-%I%M%S').lower()}est"
+
+async def print_streamed_output(handle: WorkflowHandle, poll_interval: float = 0.2) -> None:
+    """Poll the workflow's output_since query and print chunks as they arrive."""
+    offset = restarts = 0
+    while True:
+        snapshot = await handle.query(RoutingWorkflow.output_since, offset)
+        if snapshot.restarts != restarts:
+            # A model call was retried and its partial output discarded
+            print("\n🔁 Model call retried, restarting the answer...\n", flush=True)
+            offset, restarts = 0, snapshot.restarts
+            continue
+        for chunk in snapshot.chunks:
+            print(chunk, end="", flush=True)
+        offset += len(snapshot.chunks)
+        if snapshot.done:
+            # Nothing was streamed (e.g. a cached response): show the answer in one piece
+            if offset == 0 and snapshot.response:
+                print(snapshot.response, end="")
+            print("\n")
+            return
+        await asyncio.sleep(poll_interval)
+
+
+async def run_single(
+    query: str,
+    stream: bool = False,
+    speculate: int = 0,
+    idempotency_key: str | None = None,
+    on_duplicate: str = "attach",
+) -> None:
+    """
+    Execute the routing workflow for a single query.
+
+    This function:
+    1. Connects to Temporal server with OpenAI Agents SDK plugin
+    2. Generates a unique workflow ID with timestamp
+    3. Starts the routing workflow with a user query
+    4. Waits for the workflow to complete
+    5. Displays the agent's response
+
+    The workflow will route the query to the appropriate language specialist.
+    With an idempotency key, step 2 derives the ID from the key and step 3
+    may attach to the workflow an earlier submission with that key started.
+    """
+    client = await connect()
+    if idempotency_key is None:
+        workflow_id = make_workflow_id("routing")
+    else:
+        workflow_id = idempotent_workflow_id("routing", idempotency_key)
 
     print("🚀 Starting Routing Workflow")
     print(f"📋 Workflow ID: {workflow_id}")
+    if idempotency_key is not None:
+        print(f"🔑 Idempotency key: {idempotency_key} (on duplicate: {on_duplicate})")
     print(f"💬 Query: {query}")
 
     # Start the workflow and get handle for tracking
     # Using start_workflow (not execute_workflow) returns handle immediately
     # This allows observing workflow progress before it completes
-    handle = await client.start_workflow(
-        RoutingWorkflow.run,  # Workflow method to execute
-        query,  # User query parameter passed to workflow
-        id=workflow_id,  # Unique workflow ID for tracking in Temporal UI
-        task_queue=TASK_QUEUE,  # Queue where worker will pick up this workflow
-    )
+    try:
+        handle = await start_routing(
+            client,
+            # User query, whether to stream partial output, and speculative branches
+            [query, stream, speculate],
+            workflow_id,  # Unique workflow ID for tracking in Temporal UI
+            on_duplicate if idempotency_key is not None else None,
+        )
+    except WorkflowAlreadyStartedError:
+        print(f"❌ Idempotency key {idempotency_key!r} was already used by {workflow_id}")
+        return
 
     # Print Temporal UI link for observing workflow execution and agent handoffs
     print(f"✅ Workflow started: {handle.id}")
@@ -86,13 +246,240 @@ async def main():
     )
     print("⏳ Waiting for agent response...\n")
 
+    if stream:
+        # Show the answer as it is generated, before the workflow completes
+        print("💬 Agent Response (streaming): ", end="", flush=True)
+        await print_streamed_output(handle)
+
     # Wait for the workflow to complete and get the result
     result = await handle.result()
 
-    print(f"💬 Agent Response: {result}")
+    if not stream:
+        print(f"💬 Agent Response: {result.response}")
+    print(f"🔀 Routed via {result.route} to {result.agent} (confidence {result.confidence:.2f})")
+    if result.speculation:
+        print(f"🎲 Speculation: {result.speculation}")
+
+
+async def run_session(config: SessionConfig) -> None:
+    """
+    Chat with a RoutingSessionWorkflow from the terminal.
+
+    Each line is sent as a ``send_message`` update, which returns once the
+    workflow has answered it. The workflow keeps the conversation, compacts
+    it when it grows and continues as new on long histories; the same
+    workflow ID keeps working across those runs.
+    """
+    client = await connect()
+    workflow_id = make_workflow_id("routing-session")
+    handle = await client.start_workflow(
+        RoutingSessionWorkflow.run,
+        SessionInput(config=config),
+        id=workflow_id,
+        task_queue=TASK_QUEUE,
+    )
+
+    print("💬 Routing session started")
+    print(f"📋 Workflow ID: {workflow_id}")
+    print(
+        f"🔗 View in Temporal UI: http://localhost:8233/namespaces/default/workflows/{workflow_id}"
+    )
+    print('Type a message and press Enter; "exit" or Ctrl+D ends the session.\n')
+
+    while True:
+        try:
+            msg = (await asyncio.to_thread(input, "👤 ")).strip()
+        except EOFError:
+            break
+        if msg.lower() in ("exit", "quit"):
+            break
+        if not msg:
+            continue
+        reply = await handle.execute_update(RoutingSessionWorkflow.send_message, msg)
+        print(f"🤖 {reply.response}")
+        note = " (older turns compacted)" if reply.compacted else ""
+        print(
+            f"   [turn {reply.turn}: {reply.route} → {reply.agent}, "
+            f"~{reply.prompt_tokens} prompt tokens{note}]\n"
+        )
+
+    await handle.signal(RoutingSessionWorkflow.end_session)
+    state = await handle.result()
+    print(
+        f"\n👋 Session ended after {state.turns} turn(s), "
+        f"{state.compactions} compaction(s), {state.runs} run(s)"
+    )
+    print(f"🎯 Triage calls avoided by sticky routing: {state.triage_avoided}")
+
+
+async def run_bulk(
+    path: Path,
+    concurrency: int,
+    speculate: int = 0,
+    idempotency_key: str | None = None,
+    on_duplicate: str = "attach",
+) -> None:
+    """
+    Push every query in a JSONL file through RoutingWorkflow.
+
+    One client is shared by all workflows, and a semaphore caps how many are
+    in flight (started but not yet finished) at once. Results are printed as
+    they complete, then throughput and start-to-result latency percentiles
+    are reported so workers can be sized from real numbers.
+
+    With an idempotency key, line N is submitted under the key
+    ``{idempotency_key}/{N}``, so running the same file again attaches to
+    the workflows that already exist.
+    """
+    queries = load_queries(path)
+    if not queries:
+        print(f"No queries found in {path}")
+        return
+
+    client = await connect()
+    id_prefix = make_workflow_id("routing-bulk")
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(
+        index: int, query: str
+    ) -> tuple[int, float, str | None, RoutingResult | None]:
+        # Hold a slot from start to result so in-flight workflows stay bounded
+        async with semaphore:
+            started = time.perf_counter()
+            if idempotency_key is None:
+                workflow_id = f"{id_prefix}-{index:06d}"
+            else:
+                workflow_id = idempotent_workflow_id("routing-bulk", f"{idempotency_key}/{index}")
+            try:
+                handle = await start_routing(
+                    client,
+                    [query, False, speculate],
+                    workflow_id,
+                    on_duplicate if idempotency_key is not None else None,
+                )
+                result = await handle.result()
+                return index, time.perf_counter() - started, None, result
+            except Exception as e:
+                return index, time.perf_counter() - started, f"{type(e).__name__}: {e}", None
+
+    print(f"🚀 Starting {len(queries)} Routing Workflows (concurrency {concurrency})\n")
+    bulk_started = time.perf_counter()
+    latencies: list[float] = []
+    routes: dict[str, int] = {}
+    speculation: dict[str, int] = {}
+    failures = 0
+    tasks = [asyncio.create_task(run_one(i, q)) for i, q in enumerate(queries)]
+    for finished in asyncio.as_completed(tasks):
+        index, latency, error, result = await finished
+        if error or result is None:
+            failures += 1
+            print(f"❌ [{index}] {latency:.2f}s {error}")
+        else:
+            latencies.append(latency)
+            routes[result.route] = routes.get(result.route, 0) + 1
+            if result.speculation:
+                speculation[result.speculation] = speculation.get(result.speculation, 0) + 1
+            print(f"✅ [{index}] {latency:.2f}s [{result.route} → {result.agent}] {result.response}")
+    elapsed = time.perf_counter() - bulk_started
+
+    latencies.sort()
+    print("\n📊 Bulk run summary")
+    print(f"   Workflows:  {len(queries)} ({failures} failed)")
+    print(f"   Wall time:  {elapsed:.2f}s")
+    print(f"   Throughput: {len(latencies) / elapsed:.2f} workflows/s")
+    for pct in (50, 95, 99):
+        print(f"   p{pct} latency: {percentile(latencies, pct):.2f}s")
+    for route, count in sorted(routes.items()):
+        print(f"   Route {route}: {count}")
+    for outcome, count in sorted(speculation.items()):
+        print(f"   Speculation {outcome}: {count}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Start RoutingWorkflow executions.")
+    parser.add_argument(
+        "query",
+        nargs="?",
+        default="Hi! Tell me a tongue twister.",
+        help="Query to route (ignored in bulk mode).",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the answer as it is generated (single-query mode).",
+    )
+    parser.add_argument(
+        "--speculate",
+        type=int,
+        default=0,
+        metavar="N",
+        help="Start up to N likely specialists alongside triage (default: 0, off).",
+    )
+    parser.add_argument(
+        "--session",
+        action="store_true",
+        help="Chat with a long-lived RoutingSessionWorkflow.",
+    )
+    parser.add_argument(
+        "--token-budget",
+        type=int,
+        default=SessionConfig.prompt_token_budget,
+        help="Session mode: compact older turns past this many prompt tokens.",
+    )
+    parser.add_argument(
+        "--bulk",
+        type=Path,
+        metavar="JSONL",
+        help="Start one workflow per line of this JSONL file.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=10,
+        help="Maximum workflows in flight at once in bulk mode (default: 10).",
+    )
+    parser.add_argument(
+        "--idempotency-key",
+        metavar="KEY",
+        help="Derive the workflow ID from KEY so resubmissions reuse one workflow.",
+    )
+    parser.add_argument(
+        "--on-duplicate",
+        choices=list(DUPLICATE_POLICIES),
+        default="attach",
+        help="With --idempotency-key, when the key's workflow already exists: attach to "
+        "it, rerun it only if it failed (retry-failed), or refuse (reject). Default: attach.",
+    )
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.speculate < 0:
+        parser.error("--speculate cannot be negative")
+
+    if args.session:
+        asyncio.run(run_session(SessionConfig(prompt_token_budget=args.token_budget)))
+    elif args.bulk:
+        asyncio.run(
+            run_bulk(
+                args.bulk,
+                args.concurrency,
+                args.speculate,
+                args.idempotency_key,
+                args.on_duplicate,
+            )
+        )
+    else:
+        asyncio.run(
+            run_single(
+                args.query,
+                args.stream,
+                args.speculate,
+                args.idempotency_key,
+                args.on_duplicate,
+            )
+        )
 
 
 if __name__ == "__main__":
-    # Run the async main function
-    # This executes the workflow and displays results
-    asyncio.run(main())
+    # Parse arguments and run a single query, a chat session or a bulk file
+    main()
@@ -0,0 +1,158 @@
+"""
+Optional instrumentation for the routing worker.
+
+Enabled from launcher.py with ``--metrics-port`` (Prometheus scrape endpoint)
+and/or ``--tracing`` (OpenTelemetry spans). When neither is set nothing here
+is installed, so the worker runs exactly as before.
+
+Metrics come from several places and share one Prometheus endpoint per process:
+
+- The Temporal SDK itself, including queue-to-start delay
+  (``temporal_activity_schedule_to_start_latency``,
+  ``temporal_workflow_task_schedule_to_start_latency``) and activity latency
+  per activity type, which covers tool activities
+  (``temporal_activity_execution_latency``).
+- This module and the workflow: model latency, failures and token counts per
+  agent, and routing outcomes (``routing_outcomes``, recorded by
+  RoutingWorkflow through the workflow metric meter).
+- rate_limit.py, when model rate limiting is on: the concurrency limit, time
+  spent throttled and 429 responses.
+- hedging.py, when hedging is on: hedged calls per agent and which request
+  won (``agent_model_hedges``).
+
+Tracing adds Temporal's OpenTelemetry interceptor (spans for workflows and
+every activity) plus a span per model call carrying the agent and token
+counts. Spans go to an OTLP collector if ``opentelemetry-exporter-otlp`` is
+installed (configured with the standard OTEL_EXPORTER_OTLP_* variables),
+otherwise they are printed to the console.
+"""
+
+import contextlib
+import time
+from collections.abc import Iterable
+from datetime import timedelta
+from typing import Any
+
+from agents import Agent, ModelProvider, ModelResponse
+from model_middleware import CallNext, MiddlewareModelProvider, ModelCall
+from rate_limit import THROTTLED
+from temporalio import activity
+from temporalio.client import Interceptor
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
+
+# Metric names (the SDK's own metrics are prefixed with "temporal_")
+MODEL_LATENCY = "agent_model_latency"
+MODEL_FAILURES = "agent_model_failures"
+PROMPT_TOKENS = "agent_prompt_tokens"
+COMPLETION_TOKENS = "agent_completion_tokens"
+
+SERVICE_NAME = "routing-worker"
+
+# LLM calls take seconds, well past the SDK's default top bucket of 10s
+MODEL_LATENCY_BUCKETS_MS = [100, 250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000]
+
+
+def prometheus_runtime(bind_address: str) -> Runtime:
+    """A Temporal runtime that serves SDK and custom metrics for Prometheus to scrape."""
+    return Runtime(
+        telemetry=TelemetryConfig(
+            metrics=PrometheusConfig(
+                bind_address=bind_address,
+                histogram_bucket_overrides={
+                    MODEL_LATENCY: MODEL_LATENCY_BUCKETS_MS,
+                    # Rate limiter waits are on the same scale as the calls
+                    THROTTLED: MODEL_LATENCY_BUCKETS_MS,
+                },
+            )
+        )
+    )
+
+
+def tracing_interceptor() -> Interceptor:
+    """Set up an OpenTelemetry tracer provider and return Temporal's tracing interceptor."""
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from temporalio.contrib.opentelemetry import TracingInterceptor
+    except ImportError as e:
+        raise RuntimeError(
+            "Tracing needs OpenTelemetry: pip install 'temporalio[opentelemetry]' opentelemetry-sdk"
+        ) from e
+
+    # Respect a provider configured elsewhere (e.g. by opentelemetry-instrument)
+    if not isinstance(trace.get_tracer_provider(), TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(_span_exporter()))
+        trace.set_tracer_provider(provider)
+    return TracingInterceptor()
+
+
+def _span_exporter() -> Any:
+    try:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        from opentelemetry.sdk.trace.export import ConsoleSpanExporter
+
+        print("⚠️  opentelemetry-exporter-otlp not installed; printing spans to the console")
+        return ConsoleSpanExporter()
+    return OTLPSpanExporter()
+
+
+class InstrumentedModelProvider(MiddlewareModelProvider):
+    """Record latency, failures and token usage of every model call, per agent.
+
+    Place this inside the response cache so it measures real model calls and
+    the tokens actually spent; cache hits are counted by the cache itself.
+    """
+
+    def __init__(
+        self,
+        inner: ModelProvider | None = None,
+        agents: Iterable[Agent] = (),
+        tracing: bool = False,
+    ):
+        super().__init__(inner, agents)
+        self._tracer = None
+        if tracing:
+            from opentelemetry import trace
+
+            self._tracer = trace.get_tracer(__name__)
+
+    async def handle(self, call: ModelCall, call_next: CallNext) -> ModelResponse:
+        if not activity.in_activity():
+            return await call_next(call)
+
+        agent = call.agent_name or "unknown"
+        meter = activity.metric_meter().with_additional_attributes({"agent": agent})
+        span = (
+            self._tracer.start_as_current_span(f"model {agent}")
+            if self._tracer
+            else contextlib.nullcontext()
+        )
+        started = time.monotonic()
+        with span as current_span:
+            try:
+                response = await call_next(call)
+            except Exception:
+                meter.create_counter(MODEL_FAILURES, "Failed model calls").add(1)
+                raise
+            finally:
+                meter.create_histogram_timedelta(
+                    MODEL_LATENCY, "Model call latency", unit="ms"
+                ).record(timedelta(seconds=time.monotonic() - started))
+
+            usage = response.usage
+            if usage.input_tokens:
+                meter.create_counter(PROMPT_TOKENS, "Prompt tokens sent").add(usage.input_tokens)
+            if usage.output_tokens:
+                meter.create_counter(COMPLETION_TOKENS, "Completion tokens received").add(
+                    usage.output_tokens
+                )
+            if current_span is not None:
+                current_span.set_attribute("agent", agent)
+                current_span.set_attribute("model", call.model_name or "default")
+                current_span.set_attribute("gen_ai.usage.input_tokens", usage.input_tokens)
+                current_span.set_attribute("gen_ai.usage.output_tokens", usage.output_tokens)
+        return response
@@ -3,52 +3,295 @@ Temporal worker for the routing workflow pattern.
 
 A worker is a process that polls the Temporal server for workflow and activity
 tasks, then executes them. This worker is configured to:
-- Handle RoutingWorkflow executions
+- Handle RoutingWorkflow executions and long-lived RoutingSessionWorkflow chats
 - Use OpenAI Agents SDK plugin for agent integration
 - Poll the routing-workflow-queue for tasks
+- Stream partial model output back to workflows that ask for it
+- Optionally serve repeated model calls from a response cache
+- Optionally hold model calls to a host-wide rate limit (see rate_limit.py)
+- Optionally hedge slow model calls with a second request (see hedging.py)
+- Optionally export metrics and traces (see telemetry.py)
+- Optionally compress or offload large payloads in workflow history
+  (see payload_codec.py and claim_check.py)
+- Share its deterministic helper modules with every workflow sandbox
+  (see sandbox.py)
 
 To run: python worker.py
+
+Response caching is off by default. Enable it with environment variables:
+- MODEL_CACHE: "memory" for a per-process cache, or a path to a SQLite file
+  shared by all worker processes on this host
+- MODEL_CACHE_TTL_SECONDS: how long a response stays valid (default 600)
+- MODEL_CACHE_MAX_ENTRIES: LRU capacity (default 10000)
+- MODEL_CACHE_EXCLUDE_AGENTS: comma-separated agent names never to cache
+
+Model rate limiting is also off by default. Setting any of these enables it:
+- MODEL_RATE_LIMIT_RPM / MODEL_RATE_LIMIT_TPM: requests / tokens per minute
+  allowed across every worker process on this host
+- MODEL_RATE_LIMIT_STATE: SQLite file the processes share the limit through
+  (default: routing-model-rate-limit.sqlite in the temp directory), or
+  "memory" to apply the limit to each process separately
+- MODEL_CONCURRENCY_MAX: most model calls in flight per process (default 64);
+  the limit adapts below this to 429s and rising latency
+
+Hedging is off by default too. Enable it with:
+- MODEL_HEDGE_PERCENTILE: resend calls still running past this percentile
+  of the agent's recent latency (e.g. 95)
+- MODEL_HEDGE_BUDGET: most extra calls per agent, as a fraction of its
+  calls (default 0.05)
+- MODEL_HEDGE_EXCLUDE_AGENTS: comma-separated agent names never to hedge
 """
 
 import asyncio
+import os
+import tempfile
+from dataclasses import dataclass
 from datetime import timedelta
+from typing import TYPE_CHECKING, Any
 
+import agent_registry
+from agent_config import MODEL_ACTIVITY_PARAMS, load_agent_config, read_agent_config
+from agents import ModelProvider
 from dotenv import load_dotenv
-from temporalio.client import Client
-from temporalio.contrib.openai_agents import ModelActivityParameters, OpenAIAgentsPlugin
+from model_streaming import StreamingModelProvider
+from payload_codec import codecs_from_env, data_converter_from_env
+from sandbox import workflow_runner
+from session import RoutingSessionWorkflow
+from temporalio.client import Client, Interceptor
+from temporalio.contrib.openai_agents import OpenAIAgentsPlugin
+from temporalio.runtime import Runtime
 from temporalio.worker import Worker
 
 # Import the workflow class that this worker will execute
-from workflow import TASK_QUEUE, RoutingWorkflow
+from workflow import OUTPUT_SIGNAL, TASK_QUEUE, RoutingWorkflow, build_agents
+
+# The response cache, rate limiter, hedging and telemetry are optional, so
+# they are imported only when enabled and stay off the startup path otherwise
+if TYPE_CHECKING:
+    from hedging import HedgingModelProvider
+    from model_cache import CachingModelProvider
+    from rate_limit import RateLimitedModelProvider
 
 # Load environment variables from .env file (includes OPENAI_API_KEY)
 load_dotenv()
 
-async def main():
+
+def build_cache_provider(
+    agents: agent_registry.AgentRegistry, inner: ModelProvider
+) -> "CachingModelProvider | None":
+    """Wrap model calls in a response cache when MODEL_CACHE is set."""
+    cache_setting = os.getenv("MODEL_CACHE", "").strip()
+    if not cache_setting:
+        return None
+    from model_cache import CachingModelProvider, MemoryResponseCache, SqliteResponseCache
+
+    ttl_seconds = float(os.getenv("MODEL_CACHE_TTL_SECONDS", "600"))
+    max_entries = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", "10000"))
+    if cache_setting == "memory":
+        cache = MemoryResponseCache(max_entries, ttl_seconds)
+    else:
+        cache = SqliteResponseCache(cache_setting, max_entries, ttl_seconds)
+
+    excluded = os.getenv("MODEL_CACHE_EXCLUDE_AGENTS", "")
+    return CachingModelProvider(
+        cache,
+        inner,
+        # Lets the cache tell agents apart by their instructions
+        agents=agents.values(),
+        uncached_agents=[name.strip() for name in excluded.split(",") if name.strip()],
+    )
+
+
+def build_rate_limiter(
+    agents: agent_registry.AgentRegistry, inner: ModelProvider
+) -> "RateLimitedModelProvider | None":
+    """Hold model calls to a rate limit when MODEL_RATE_LIMIT_* or MODEL_CONCURRENCY_MAX is set."""
+    requests_per_minute = float(os.getenv("MODEL_RATE_LIMIT_RPM") or 0)
+    tokens_per_minute = float(os.getenv("MODEL_RATE_LIMIT_TPM") or 0)
+    max_concurrency = os.getenv("MODEL_CONCURRENCY_MAX")
+    if not (requests_per_minute or tokens_per_minute or max_concurrency):
+        return None
+    from rate_limit import (
+        AdaptiveConcurrency,
+        MemoryTokenBucket,
+        RateLimitedModelProvider,
+        SqliteTokenBucket,
+    )
+
+    bucket = None
+    if requests_per_minute or tokens_per_minute:
+        state = os.getenv("MODEL_RATE_LIMIT_STATE", "").strip() or os.path.join(
+            tempfile.gettempdir(), "routing-model-rate-limit.sqlite"
+        )
+        if state == "memory":
+            bucket = MemoryTokenBucket(requests_per_minute, tokens_per_minute)
+        else:
+            bucket = SqliteTokenBucket(state, requests_per_minute, tokens_per_minute)
+    concurrency = AdaptiveConcurrency(maximum=int(max_concurrency or 64))
+    return RateLimitedModelProvider(bucket, concurrency, inner, agents=agents.values())
+
+
+def build_hedging_provider(
+    agents: agent_registry.AgentRegistry, inner: ModelProvider
+) -> "HedgingModelProvider | None":
+    """Hedge slow model calls when MODEL_HEDGE_PERCENTILE is set."""
+    percentile = os.getenv("MODEL_HEDGE_PERCENTILE", "").strip()
+    if not percentile:
+        return None
+    from hedging import HedgingModelProvider
+
+    excluded = os.getenv("MODEL_HEDGE_EXCLUDE_AGENTS", "")
+    return HedgingModelProvider(
+        inner,
+        agents.values(),
+        percentile=float(percentile),
+        budget=float(os.getenv("MODEL_HEDGE_BUDGET", "0.05")),
+        unhedged_agents=[name.strip() for name in excluded.split(",") if name.strip()],
+    )
+
+
+@dataclass
+class ModelMiddleware:
+    """The optional model-call middleware enabled on a worker (None when off)."""
+
+    cache: "CachingModelProvider | None" = None
+    rate_limiter: "RateLimitedModelProvider | None" = None
+    hedging: "HedgingModelProvider | None" = None
+
+    def print_stats(self) -> None:
+        if self.cache:
+            stats = self.cache.stats
+            print(
+                f"🗄️  Cache hits: {stats.hits}, misses: {stats.misses}, "
+                f"bypassed: {stats.bypassed} (hit rate {stats.hit_rate:.0%})"
+            )
+        if self.rate_limiter:
+            limit_stats = self.rate_limiter.stats
+            print(
+                f"🚦 Model calls: {limit_stats.calls}, throttled: {limit_stats.throttled_calls} "
+                f"({limit_stats.throttled_seconds:.1f}s waiting), 429s: {limit_stats.rate_limited}, "
+                f"deferred: {limit_stats.deferred}, "
+                f"concurrency limit: {int(self.rate_limiter.concurrency.limit)}"
+            )
+        if self.hedging:
+            hedge_stats = self.hedging.stats
+            print(
+                f"⏱️  Hedged calls: {hedge_stats.hedged} of {hedge_stats.calls} "
+                f"(hedge won {hedge_stats.hedge_wins}), over budget: {hedge_stats.over_budget}"
+            )
+
+
+@dataclass
+class WorkerSettings:
+    """Concurrency and instrumentation settings for one worker process.
+
+    None keeps the SDK default for the concurrency limits.
     """
-    Start the Temporal worker that executes routing workflows.
 
-    The worker:
-    1. Connects to the Temporal server with OpenAI Agents SDK plugin
-    2. Registers the RoutingWorkflow for execution
-    3. Polls the task queue continuously for new work
-    4. Executes workflows when tasks are available
+    max_concurrent_workflow_tasks: int | None = None
+    max_concurrent_activities: int | None = None
+    max_concurrent_workflow_task_polls: int | None = None
+    max_concurrent_activity_task_polls: int | None = None
+    graceful_shutdown_seconds: float = 0
+    """How long running activities get to finish once shutdown starts."""
+    metrics_port: int | None = None
+    """Serve Prometheus metrics on this local port (off when None)."""
+    tracing: bool = False
+    """Export OpenTelemetry spans for workflows, activities and model calls."""
+
+    @property
+    def instrumented(self) -> bool:
+        return self.metrics_port is not None or self.tracing
+
+    def worker_options(self) -> dict[str, Any]:
+        """Keyword arguments for Worker(), leaving unset limits at their defaults."""
+        options: dict[str, Any] = {
+            "graceful_shutdown_timeout": timedelta(seconds=self.graceful_shutdown_seconds)
+        }
+        for name in (
+            "max_concurrent_workflow_tasks",
+            "max_concurrent_activities",
+            "max_concurrent_workflow_task_polls",
+            "max_concurrent_activity_task_polls",
+        ):
+            if getattr(self, name) is not None:
+                options[name] = getattr(self, name)
+        return options
+
+
+async def create_worker(
+    settings: WorkerSettings, runtime: Runtime | None = None
+) -> tuple[Worker, ModelMiddleware]:
+    """
+    Connect to Temporal and create (but do not start) the routing worker.
 
-    The worker runs indefinitely until stopped (Ctrl+C).
+    Returns the worker and its optional model middleware, so callers can
+    report their statistics. The
+    worker's client (``worker.client``) can also start workflows; gateway.py
+    uses it to start them eagerly on this worker.
     """
+    # Build the agent graph once; every workflow run looks agents up by name.
+    # Runs started after agents.toml changes build a graph for the new version.
+    agent_config = read_agent_config()
+    agents = agent_registry.install(build_agents(agent_config), key=agent_config.version)
+
+    # Model calls go through a chain of providers around the OpenAI model:
+    # streaming sits innermost so an optional response cache can wrap it
+    model_provider: ModelProvider = StreamingModelProvider(OUTPUT_SIGNAL)
+    if settings.instrumented:
+        from telemetry import InstrumentedModelProvider
+
+        # Inside the cache, so it measures real model calls and tokens spent
+        model_provider = InstrumentedModelProvider(
+            model_provider, agents.values(), tracing=settings.tracing
+        )
+    # Inside the cache, so cache hits never wait for the limit; outside the
+    # instrumentation, so model latency does not include time spent waiting
+    middleware = ModelMiddleware()
+    middleware.rate_limiter = build_rate_limiter(agents, model_provider)
+    if middleware.rate_limiter:
+        model_provider = middleware.rate_limiter
+    # Outside the rate limiter, so the extra calls it sends count against the limit
+    middleware.hedging = build_hedging_provider(agents, model_provider)
+    if middleware.hedging:
+        model_provider = middleware.hedging
+    middleware.cache = build_cache_provider(agents, model_provider)
+    if middleware.cache:
+        model_provider = middleware.cache
+
+    # SDK and custom metrics are served from the runtime's Prometheus endpoint
+    if runtime is None and settings.metrics_port is not None:
+        from telemetry import prometheus_runtime
+
+        runtime = prometheus_runtime(f"127.0.0.1:{settings.metrics_port}")
+
+    # Spans for workflow and activity execution, propagated through headers
+    interceptors: list[Interceptor] = []
+    if settings.tracing:
+        from telemetry import tracing_interceptor
+
+        interceptors.append(tracing_interceptor())
+
+    # Starters must use the same codec to read results written by this worker
+    data_converter = data_converter_from_env()
+
     # Connect to local Temporal server
     # The OpenAI Agents SDK plugin is required for agent-based workflows
     client = await Client.connect(
         "localhost:7233",  # Temporal server address (default local dev server)
+        runtime=runtime,  # None uses the default runtime
+        # Compresses large payloads when PAYLOAD_COMPRESSION is set
+        data_converter=data_converter,
+        interceptors=interceptors,
         plugins=[
             # Enable OpenAI Agents SDK integration with Temporal
             # This plugin handles the coordination between agents and Temporal activities
             OpenAIAgentsPlugin(
-                # Configure timeout settings for AI model inference activities
-                # LLM calls can take time, so we set a generous timeout
-                model_params=ModelActivityParameters(
-                    start_to_close_timeout=timedelta(seconds=30)  # Max time for each LLM call
-                )
+                # Activity options for model calls (30s timeout, retried for up to
+                # 10 minutes); the routing agents get their own timeout and
+                # retries from agents.toml
+                model_params=MODEL_ACTIVITY_PARAMS,
+                model_provider=model_provider,
             )
         ],
     )
@@ -58,20 +301,75 @@ async def main():
     worker = Worker(
         client,  # Use the connected Temporal client
         task_queue=TASK_QUEUE,  # Which queue to poll for tasks
-        workflows=[RoutingWorkflow],  # List of workflows this worker can execute
-        # Note: No activities are registered here because the OpenAI Agents SDK
-        # plugin automatically creates activities for agent execution
+        workflows=[RoutingWorkflow, RoutingSessionWorkflow],  # Workflows this worker can execute
+        # Each run gets a fresh sandbox; deterministic helper modules are shared
+        workflow_runner=workflow_runner(),
+        # Reads agents.toml when a run starts. The OpenAI Agents SDK plugin
+        # registers the model activities for agent execution itself.
+        activities=[load_agent_config],
+        **settings.worker_options(),  # Slot and poller limits (SDK defaults when unset)
     )
+    return worker, middleware
+
+
+async def main(
+    settings: WorkerSettings | None = None,
+    runtime: Runtime | None = None,
+    shutdown_event: asyncio.Event | None = None,
+):
+    """
+    Start the Temporal worker that executes routing workflows.
+
+    The worker:
+    1. Connects to the Temporal server with OpenAI Agents SDK plugin
+    2. Registers the RoutingWorkflow for execution
+    3. Polls the task queue continuously for new work
+    4. Executes workflows when tasks are available
+
+    The worker runs indefinitely until stopped (Ctrl+C), or until
+    ``shutdown_event`` is set, in which case it shuts down gracefully.
+    ``settings`` and ``runtime`` let launcher.py size and observe each process.
+    """
+    settings = settings or WorkerSettings()
+    worker, middleware = await create_worker(settings, runtime)
 
     # Log worker startup for observability
     print("🚀 Worker started successfully")
     print(f"📋 Task Queue: {TASK_QUEUE}")
-    print(f"🔄 Workflows: {RoutingWorkflow.__name__}")
+    print(f"🔄 Workflows: {RoutingWorkflow.__name__}, {RoutingSessionWorkflow.__name__}")
+    if middleware.cache:
+        print(f"🗄️  Model response cache: {os.getenv('MODEL_CACHE')}")
+    if middleware.rate_limiter:
+        bucket = middleware.rate_limiter.bucket
+        limits = (
+            [f"{rate * 60:g} {name}/min" for name, rate in bucket.rates.items()] if bucket else []
+        )
+        limits.append(f"up to {middleware.rate_limiter.concurrency.maximum} calls in flight")
+        print(f"🚦 Model rate limit: {', '.join(limits)}")
+    if middleware.hedging:
+        print(
+            f"⏱️  Hedging calls slower than p{middleware.hedging.percentile:g} "
+            f"(budget {middleware.hedging.budget:.0%} extra calls per agent)"
+        )
+    for codec in codecs_from_env():
+        print(f"🗜️  Payload codec: {type(codec).__name__}")
+    if settings.metrics_port is not None:
+        print(f"📈 Metrics: http://127.0.0.1:{settings.metrics_port}/metrics")
+    if settings.tracing:
+        print("🔭 OpenTelemetry tracing enabled")
     print("⏳ Polling for tasks... (Press Ctrl+C to stop)\n")
 
     # Start the worker - this blocks indefinitely, processing tasks as they arrive
     # The worker will continue running until explicitly stopped
-    await worker.run()
+    try:
+        if shutdown_event is None:
+            await worker.run()
+        else:
+            # Leaving the block stops polling and waits for in-flight tasks
+            async with worker:
+                await shutdown_event.wait()
+    finally:
+        middleware.print_stats()
 
 
 if __name__ == "__main__":
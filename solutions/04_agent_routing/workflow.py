@@ -4,16 +4,86 @@ Routing workflow implementation using OpenAI Agents SDK.
 Demonstrates intelligent request distribution to specialized language agents.
 The triage agent analyzes incoming queries and routes them to the appropriate
 language specialist (French, Spanish, or English) using the handoff pattern.
+
+Before paying for a triage model call, a local character-trigram classifier
+checks the query. When it is confident, the query goes straight to the
+matching specialist; otherwise the triage agent decides as before.
+
+With ``stream=True`` the model activities signal partial output back to the
+workflow as it is generated, and clients poll the ``output_since`` query to
+show it before the run completes.
+
+With ``speculative_branches > 0``, queries that need triage also start the
+classifier's likeliest specialists at the same time. The branch triage picks
+is kept and the others are cancelled, so the answer no longer waits for the
+two model calls one after the other.
+
+Each run reads the per-agent model settings in agents.toml (agent_config.py)
+when it starts, so configuration edits apply to new runs without a redeploy.
 """
 
+import asyncio
 from datetime import timedelta
+from typing import Any
 
-from agents import Agent, RunConfig, Runner, TResponseInputItem, trace
+from agents import (
+    Agent,
+    ModelSettings,
+    RunConfig,
+    RunContextWrapper,
+    RunHooks,
+    Runner,
+    RunResult,
+    TResponseInputItem,
+    trace,
+)
 from temporalio import workflow
 
+# Pure-Python and deterministic, so it is safe to share across sandboxed runs
+with workflow.unsafe.imports_passed_through():
+    import agent_registry
+    from agent_config import AgentConfig, configure_agent, load_agent_config
+    from language_detection import LanguageDetection, detect_language, rank_languages
+    from model_streaming import STREAM_METADATA_KEY
+    from routing_types import OutputChunk, OutputSnapshot, RoutingResult
+
 # Task queue name for this workflow pattern
 TASK_QUEUE = "routing-workflow-queue"
 
+# Minimum classifier confidence needed to skip the triage model call
+FAST_PATH_CONFIDENCE = 0.95
+
+# Classifier confidence at which a message counts as a switch away from the
+# conversation's current specialist (sessions only)
+LANGUAGE_SWITCH_CONFIDENCE = 0.6
+
+# Routing paths recorded in RoutingResult.route
+ROUTE_FAST_PATH = "fast-path"
+ROUTE_TRIAGE = "triage"
+ROUTE_STICKY = "sticky"
+
+# Signal the model activities use to deliver partial output
+OUTPUT_SIGNAL = "append_output"
+
+# Counter of routing decisions, exported when the worker serves metrics
+ROUTING_OUTCOMES_METRIC = "routing_outcomes"
+
+# Speculative mode: most specialists started next to triage, and its metrics
+MAX_SPECULATIVE_BRANCHES = 2
+SPECULATIVE_BRANCHES_METRIC = "speculative_branches"
+SPECULATION_SAVED_METRIC = "speculation_latency_saved"
+
+# RoutingResult.speculation outcomes
+SPECULATION_HIT = "hit"
+SPECULATION_MISS = "miss"
+
+# Agent names used to look agents up in the registry
+TRIAGE_AGENT = "Triage Agent"
+FRENCH_AGENT = "French Agent"
+SPANISH_AGENT = "Spanish Agent"
+ENGLISH_AGENT = "English Agent"
+SUMMARIZER_AGENT = "Summarizer Agent"
+
 
 def french_agent() -> Agent:
     """
@@ -23,7 +93,7 @@ def french_agent() -> Agent:
     Uses OpenAI's GPT-4 model for natural language understanding and generation.
     """
     return Agent(
-        name="French Agent",
+        name=FRENCH_AGENT,
         # Instruct the agent to respond exclusively in French
         instructions="You only speak French. Respond naturally to user queries in French.",
         model="gpt-4",  # OpenAI model as per workshop requirements
@@ -38,7 +108,7 @@ def spanish_agent() -> Agent:
     Uses OpenAI's GPT-4 model for natural language understanding and generation.
     """
     return Agent(
-        name="Spanish Agent",
+        name=SPANISH_AGENT,
         # Instruct the agent to respond exclusively in Spanish
         instructions="You only speak Spanish. Respond naturally to user queries in Spanish.",
         model="gpt-4",  # OpenAI model as per workshop requirements
@@ -53,17 +123,20 @@ def english_agent() -> Agent:
     Uses OpenAI's GPT-4 model for natural language understanding and generation.
     """
     return Agent(
-        name="English Agent",
+        name=ENGLISH_AGENT,
         # Instruct the agent to respond exclusively in English
         instructions="You only speak English. Respond naturally to user queries in English.",
         model="gpt-4",  # OpenAI model as per workshop requirements
     )
 
 
-def triage_agent() -> Agent:
+def triage_agent(specialists: list[Agent] | None = None) -> Agent:
     """
     Create a triage agent that routes requests to language specialists.
 
+    Pass ``specialists`` to hand off to existing agent instances; by default
+    a fresh French, Spanish and English agent is created.
+
     This agent analyzes the language of incoming queries and hands off to
     the appropriate specialist agent. This demonstrates the handoff pattern
     where one agent can transfer control to another specialized agent.
@@ -72,7 +145,7 @@ def triage_agent() -> Agent:
     agents have different specializations and can collaborate on tasks.
     """
     return Agent(
-        name="Triage Agent",
+        name=TRIAGE_AGENT,
         # Instruct the triage agent to detect language and route appropriately
         instructions=(
             "Identify the primary language of the user's message. "
@@ -85,26 +158,266 @@ def triage_agent() -> Agent:
         ),
         # Provide list of specialist agents available for handoff
         # The triage agent will choose which specialist to invoke based on language
-        handoffs=[french_agent(), spanish_agent(), english_agent()],
+        handoffs=specialists or [french_agent(), spanish_agent(), english_agent()],
         model="gpt-4",  # OpenAI model for language detection and routing
     )
 
 
+def summarizer_agent() -> Agent:
+    """
+    Create an agent that condenses earlier turns of a conversation.
+
+    Used by RoutingSessionWorkflow (session.py) to keep long chats within
+    the prompt budget without losing what the specialists need to know.
+    """
+    return Agent(
+        name=SUMMARIZER_AGENT,
+        instructions=(
+            "You condense conversations between a user and an assistant. "
+            "Summarize the conversation you are given in a few sentences, keeping "
+            "names, facts, preferences and open questions the assistant needs to continue. "
+            "Write the summary in the language the conversation is in."
+        ),
+        model="gpt-4",
+    )
+
+
+def build_agents(config: AgentConfig | None = None) -> list[Agent]:
+    """
+    Build the whole agent graph once: three specialists plus a triage agent
+    that hands off to those same instances, and the session summarizer.
+
+    ``config`` sets each agent's model, token limit and model activity
+    timeout and retries (agent_config.py); built-in defaults when omitted.
+
+    The worker installs the result in ``agent_registry`` at startup so
+    workflow runs and replays reuse it instead of rebuilding agents.
+    """
+    config = config or AgentConfig()
+    specialists = [
+        configure_agent(agent, config)
+        for agent in (french_agent(), spanish_agent(), english_agent())
+    ]
+    return [
+        configure_agent(triage_agent(specialists), config),
+        *specialists,
+        configure_agent(summarizer_agent(), config),
+    ]
+
+
+async def load_agents() -> agent_registry.AgentRegistry:
+    """Read the agent configuration for this run and return the matching agent graph.
+
+    The local activity's result is recorded in history, so replays build the
+    same graph even if the file has changed since.
+    """
+    config = await workflow.execute_local_activity(
+        load_agent_config, start_to_close_timeout=timedelta(seconds=5)
+    )
+    return agent_registry.get_registry(lambda: build_agents(config), key=config.version)
+
+
+# Specialist agent names keyed by the language names the classifier reports
+SPECIALISTS: dict[str, str] = {
+    "French": FRENCH_AGENT,
+    "Spanish": SPANISH_AGENT,
+    "English": ENGLISH_AGENT,
+}
+
+
+def choose_starting_agent(
+    agents: agent_registry.AgentRegistry, msg: str, sticky_agent: str | None = None
+) -> tuple[Agent, str, LanguageDetection]:
+    """Pick the agent that handles ``msg``: a specialist directly, or triage.
+
+    ``sticky_agent`` is the specialist already serving this conversation. It
+    keeps the message unless the classifier is fairly sure the user has
+    switched language, so short follow-ups ("gracias", "ok") skip triage.
+
+    Returns the agent, the route taken and the classifier's detection.
+    """
+    # Classify locally first; a confident answer saves the triage model call
+    detection = detect_language(msg)
+    switched = (
+        detection.confidence >= LANGUAGE_SWITCH_CONFIDENCE
+        and SPECIALISTS[detection.language] != sticky_agent
+    )
+    if detection.confidence >= FAST_PATH_CONFIDENCE:
+        route = ROUTE_FAST_PATH
+        starting_agent = agents[SPECIALISTS[detection.language]]
+    elif sticky_agent is not None and not switched:
+        route = ROUTE_STICKY
+        starting_agent = agents[sticky_agent]
+    else:
+        route = ROUTE_TRIAGE
+        starting_agent = agents[TRIAGE_AGENT]
+    workflow.logger.info(
+        f"Routing via {route} (detected {detection.language}, "
+        f"confidence {detection.confidence:.2f})"
+    )
+    return starting_agent, route, detection
+
+
+def record_routing_outcome(route: str, language: str, agent: str) -> None:
+    """Count how a query was routed (not recorded again on replay).
+
+    Every ``route="sticky"`` outcome is a triage model call avoided.
+    """
+    workflow.metric_meter().create_counter(
+        ROUTING_OUTCOMES_METRIC, "Routing decisions by route and specialist"
+    ).add(1, {"route": route, "language": language, "agent": agent})
+
+
+class HandoffDecided(Exception):  # noqa: N818 - control flow, not an error
+    """Ends a triage run as soon as it has picked a specialist."""
+
+    def __init__(self, agent_name: str):
+        super().__init__(agent_name)
+        self.agent_name = agent_name
+
+
+class StopAtHandoff(RunHooks):
+    """Run hooks that stop a run at its first handoff, before the specialist is called."""
+
+    async def on_handoff(
+        self, context: RunContextWrapper[Any], from_agent: Agent, to_agent: Agent
+    ) -> None:
+        raise HandoffDecided(to_agent.name)
+
+
+async def run_speculatively(
+    agents: agent_registry.AgentRegistry,
+    inputs: list[TResponseInputItem],
+    msg: str,
+    branches: int,
+) -> tuple[RunResult, str]:
+    """Run triage and the likeliest specialists concurrently; keep the one triage picks.
+
+    Returns the specialist's run and whether speculation was a hit or a miss.
+    On a miss every branch is cancelled and the chosen specialist runs after
+    triage, exactly as without speculation.
+    """
+    candidates = [SPECIALISTS[d.language] for d in rank_languages(msg)[:branches]]
+    started = workflow.now()
+
+    async def branch(name: str) -> tuple[RunResult, timedelta]:
+        result = await Runner.run(agents[name], input=inputs)
+        return result, workflow.now() - started
+
+    tasks = {name: asyncio.create_task(branch(name)) for name in candidates}
+    meter = workflow.metric_meter()
+    speculated = meter.create_counter(
+        SPECULATIVE_BRANCHES_METRIC, "Speculative specialist branches by outcome"
+    )
+    try:
+        try:
+            await Runner.run(agents[TRIAGE_AGENT], input=inputs, hooks=StopAtHandoff())
+            # Triage is told never to answer itself; fall back as it would
+            chosen = ENGLISH_AGENT
+        except HandoffDecided as decided:
+            chosen = decided.agent_name
+        triage_time = workflow.now() - started
+        winner = tasks.pop(chosen, None)
+    finally:
+        losers = list(tasks.values())
+        for task in losers:
+            task.cancel()
+        await asyncio.gather(*losers, return_exceptions=True)
+
+    if losers:
+        speculated.add(len(losers), {"outcome": "wasted"})
+    workflow.logger.info(
+        f"Speculated on {', '.join(candidates)}; triage chose {chosen} "
+        f"after {triage_time.total_seconds():.2f}s"
+    )
+    if winner is None:
+        return await Runner.run(agents[chosen], input=inputs), SPECULATION_MISS
+
+    result, specialist_time = await winner
+    speculated.add(1, {"outcome": "hit"})
+    # Run one after the other, the two calls take triage_time + specialist_time
+    meter.create_histogram_timedelta(
+        SPECULATION_SAVED_METRIC, "Latency saved by speculative specialists", unit="ms"
+    ).record(min(triage_time, specialist_time))
+    return result, SPECULATION_HIT
+
+
 @workflow.defn
 class RoutingWorkflow:
+    def __init__(self) -> None:
+        # Partial output streamed in by the model activities, with the
+        # activity that sent each chunk and its latest attempt
+        self._output_chunks: list[str] = []
+        self._output_sources: list[str] = []
+        self._output_attempts: dict[str, int] = {}
+        self._output_restarts = 0
+        self._final_output: str | None = None
+
+    @workflow.signal(name=OUTPUT_SIGNAL)
+    def append_output(self, chunk: OutputChunk) -> None:
+        attempt = self._output_attempts.get(chunk.activity_id, chunk.attempt)
+        if chunk.attempt < attempt:
+            # A late signal from an attempt that has since been retried
+            return
+        if chunk.attempt > attempt:
+            # A retried model call streams its answer again from the start
+            kept = [
+                (text, source)
+                for text, source in zip(self._output_chunks, self._output_sources)
+                if source != chunk.activity_id
+            ]
+            self._output_chunks = [text for text, _ in kept]
+            self._output_sources = [source for _, source in kept]
+            self._output_restarts += 1
+        self._output_attempts[chunk.activity_id] = chunk.attempt
+        self._output_chunks.append(chunk.text)
+        self._output_sources.append(chunk.activity_id)
+
+    @workflow.query
+    def output_since(self, offset: int) -> OutputSnapshot:
+        """Chunks received after the first ``offset`` ones, for polling clients."""
+        return OutputSnapshot(
+            chunks=self._output_chunks[offset:],
+            done=self._final_output is not None,
+            response=self._final_output,
+            restarts=self._output_restarts,
+        )
+
     @workflow.run
-    async def run(self, msg: str) -> str:
-        config = RunConfig()
+    async def run(
+        self, msg: str, stream: bool = False, speculative_branches: int = 0
+    ) -> RoutingResult:
+        # Streaming is requested per call through model settings metadata,
+        # which the worker's StreamingModelProvider picks up and strips
+        config = RunConfig(
+            model_settings=ModelSettings(metadata={STREAM_METADATA_KEY: "1"}) if stream else None
+        )
 
         with trace("Routing example"):
             inputs: list[TResponseInputItem] = [{"content": msg, "role": "user"}]
 
-            # Run the triage agent to determine which language agent to handoff to
-            result = await Runner.run(
-                triage_agent(),
-                input=inputs,
-                run_config=config,
-            )
+            # Prebuilt agents for the current configuration, shared by runs on this worker
+            agents = await load_agents()
+
+            starting_agent, route, detection = choose_starting_agent(agents, msg)
+
+            speculation = None
+            if route == ROUTE_TRIAGE and speculative_branches > 0:
+                # Start the likeliest specialists alongside triage. Their output
+                # is not streamed, since the losing branches would show up too.
+                branches = min(speculative_branches, MAX_SPECULATIVE_BRANCHES)
+                result, speculation = await run_speculatively(agents, inputs, msg, branches)
+            else:
+                # Run the specialist directly, or let the triage agent hand off to one
+                result = await Runner.run(
+                    starting_agent,
+                    input=inputs,
+                    run_config=config,
+                )
+            # Let polling clients show the answer without waiting for the pause below
+            self._final_output = str(result.final_output)
+
+            record_routing_outcome(route, detection.language, result.last_agent.name)
 
             # Add a delay to demonstrate Temporal durability
             # This allows the instructor to kill the worker and show that
@@ -115,5 +428,12 @@ class RoutingWorkflow:
             # Log that the handoff to the specialist agent has completed
             workflow.logger.info("Handoff completed")
 
-            # Return the formatted response from the specialist agent
-            return f"Response: {result.final_output}"
+            # Return the specialist's response together with how it was routed
+            return RoutingResult(
+                response=f"Response: {result.final_output}",
+                agent=result.last_agent.name,
+                route=route,
+                detected_language=detection.language,
+                confidence=detection.confidence,
+                speculation=speculation,
+            )
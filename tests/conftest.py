@@ -0,0 +1,32 @@
+"""Shared setup: the routing solution's modules use flat imports."""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+from temporalio.runtime import MetricBuffer, Runtime, TelemetryConfig
+from temporalio.testing import WorkflowEnvironment
+
+ROUTING_DIR = Path(__file__).resolve().parents[1] / "solutions" / "04_agent_routing"
+sys.path.insert(0, str(ROUTING_DIR))
+
+
+@pytest.fixture
+def metrics() -> MetricBuffer:
+    """Metrics recorded by workers on ``workflow_env``, drained with retrieve_updates()."""
+    return MetricBuffer(10_000)
+
+
+@pytest.fixture
+async def workflow_env(metrics: MetricBuffer):
+    """Temporal's time-skipping test server (see workflow_harness.py)."""
+    runtime = Runtime(telemetry=TelemetryConfig(metrics=metrics))
+    try:
+        env = await WorkflowEnvironment.start_time_skipping(
+            runtime=runtime, test_server_existing_path=os.getenv("TEMPORAL_SERVER_PATH")
+        )
+    except RuntimeError as e:
+        pytest.skip(f"Temporal test server unavailable: {e}")
+    async with env:
+        yield env
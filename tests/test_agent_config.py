@@ -0,0 +1,113 @@
+import dataclasses
+from datetime import timedelta
+
+import pytest
+from agent_config import (
+    DEFAULT_GIVE_UP_SECONDS,
+    DEFAULT_TIMEOUT_SECONDS,
+    MODEL_ACTIVITY_PARAMS,
+    RetrySettings,
+    configure_agent,
+    parse_agent_config,
+)
+from agents import Agent
+from temporalio.contrib.openai_agents import ModelActivityParameters
+
+# The private plugin internals configure_agent relies on; these tests fail
+# when a temporalio release moves or changes them
+from temporalio.contrib.openai_agents._openai_runner import _convert_agent
+from temporalio.contrib.openai_agents._temporal_model_stub import _TemporalModelStub
+
+CONFIG = """
+[defaults]
+model = "gpt-4"
+timeout_seconds = 30
+
+[tiers.fast]
+model = "gpt-4o-mini"
+timeout_seconds = 10
+
+[agents."Triage Agent"]
+tier = "fast"
+max_tokens = 64
+retry = { maximum_attempts = 3, initial_interval_seconds = 0.5 }
+
+[agents."English Agent"]
+timeout_seconds = 45
+"""
+
+
+def test_agent_settings_layer_defaults_tier_then_agent():
+    config = parse_agent_config(CONFIG)
+    triage = config.for_agent("Triage Agent")
+    assert (triage.model, triage.timeout_seconds, triage.max_tokens) == ("gpt-4o-mini", 10, 64)
+    assert triage.retry == RetrySettings(maximum_attempts=3, initial_interval_seconds=0.5)
+
+    english = config.for_agent("English Agent")
+    assert (english.model, english.timeout_seconds, english.max_tokens) == ("gpt-4", 45, None)
+
+
+def test_unconfigured_agents_get_the_defaults():
+    config = parse_agent_config(CONFIG)
+    assert config.for_agent("French Agent") == config.defaults
+    assert parse_agent_config("").defaults.timeout_seconds == DEFAULT_TIMEOUT_SECONDS
+
+
+@pytest.mark.parametrize(
+    "text, message",
+    [
+        ('[agents."Triage Agent"]\ntier = "slow"', "unknown tier 'slow'"),
+        ("[defaults]\ntimeout = 5", "unknown setting(s) timeout"),
+    ],
+)
+def test_invalid_config_is_rejected(text, message):
+    with pytest.raises(ValueError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        parse_agent_config(text)
+
+
+def test_retries_are_limited_in_time_not_attempts():
+    # Rate limiter deferrals are attempts too, so only time bounds the retries
+    assert RetrySettings().policy().maximum_attempts == 0
+    assert MODEL_ACTIVITY_PARAMS.retry_policy.maximum_attempts == 0
+    assert MODEL_ACTIVITY_PARAMS.schedule_to_close_timeout == timedelta(
+        seconds=DEFAULT_GIVE_UP_SECONDS
+    )
+
+
+def test_configured_agents_keep_the_workers_activity_options():
+    base = dataclasses.replace(
+        MODEL_ACTIVITY_PARAMS,
+        heartbeat_timeout=timedelta(seconds=5),
+        summary_override="model call",
+        task_queue="models",
+    )
+    config = parse_agent_config(CONFIG)
+    triage = configure_agent(Agent(name="Triage Agent", instructions="Route."), config, base)
+    english = configure_agent(Agent(name="English Agent", instructions="Answer."), config, base)
+
+    assert isinstance(triage.model, _TemporalModelStub)
+    params = triage.model.model_params
+    assert params.start_to_close_timeout == timedelta(seconds=10)
+    assert params.retry_policy.maximum_attempts == 3
+    assert (params.heartbeat_timeout, params.summary_override, params.task_queue) == (
+        timedelta(seconds=5),
+        "model call",
+        "models",
+    )
+    # No retry table: the worker's policy
+    assert english.model.model_params.retry_policy == base.retry_policy
+    # Per-agent retries still give up after the worker's time limit
+    assert params.schedule_to_close_timeout == base.schedule_to_close_timeout
+
+
+def test_plugin_leaves_configured_agents_alone():
+    config = parse_agent_config(CONFIG)
+    english = configure_agent(Agent(name="English Agent", instructions="Answer."), config)
+    triage = configure_agent(Agent(name="Triage Agent", instructions="Route."), config)
+    triage.handoffs = [english]
+
+    # What the plugin does to the starting agent of every run
+    converted = _convert_agent(ModelActivityParameters(), triage, None)
+    assert converted is triage
+    assert converted.model.model_params.start_to_close_timeout == timedelta(seconds=10)
+    assert converted.handoffs[0].model.model_params.start_to_close_timeout == timedelta(seconds=45)
@@ -0,0 +1,71 @@
+import asyncio
+import json
+
+import pytest
+from gateway import MAX_BODY_BYTES, MAX_HEADERS, RoutingGateway
+
+
+async def exchange(request: bytes) -> tuple[int, dict]:
+    """Send raw bytes to a gateway (with no Temporal client) and read its reply."""
+    gateway = RoutingGateway(client=None)
+    server = await asyncio.start_server(gateway.handle_connection, "127.0.0.1", 0)
+    async with server:
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname())
+        writer.write(request)
+        await writer.drain()
+        reply = await reader.read()
+        writer.close()
+    head, _, body = reply.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+async def test_stats_are_served():
+    status, body = await exchange(b"GET /stats HTTP/1.1\r\nConnection: close\r\n\r\n")
+    assert status == 200
+    assert body["requests"] == 1
+
+
+@pytest.mark.parametrize(
+    ("request_bytes", "status"),
+    [
+        (b"GET /stats\r\n\r\n", 400),
+        (b"GET /stats HTTP/1.1\r\nno colon here\r\n\r\n", 400),
+        (b"POST /route HTTP/1.1\r\nContent-Length: ten\r\n\r\n", 400),
+        (b"POST /route HTTP/1.1\r\nContent-Length: -1\r\n\r\n", 400),
+        (f"POST /route HTTP/1.1\r\nContent-Length: {MAX_BODY_BYTES + 1}\r\n\r\n".encode(), 413),
+        (b"GET /" + b"a" * 70_000 + b" HTTP/1.1\r\n\r\n", 414),
+        (b"GET /stats HTTP/1.1\r\nX-Big: " + b"a" * 70_000 + b"\r\n\r\n", 431),
+        (b"GET /stats HTTP/1.1\r\n" + b"X-Many: 1\r\n" * (MAX_HEADERS + 1) + b"\r\n", 431),
+        (
+            b"POST /route HTTP/1.1\r\nConnection: close\r\nContent-Length: 35\r\n\r\n"
+            b'{"query": "Hi!", "speculate": true}',
+            400,
+        ),
+    ],
+    ids=[
+        "no-version",
+        "header-without-colon",
+        "non-numeric-length",
+        "negative-length",
+        "body-too-large",
+        "request-line-too-long",
+        "header-too-long",
+        "too-many-headers",
+        "boolean-speculate",
+    ],
+)
+async def test_malformed_requests_are_rejected(request_bytes: bytes, status: int):
+    assert (await exchange(request_bytes))[0] == status
+
+
+async def test_unknown_paths_and_methods():
+    assert (await exchange(b"GET /nope HTTP/1.1\r\nConnection: close\r\n\r\n"))[0] == 404
+    assert (await exchange(b"GET /route HTTP/1.1\r\nConnection: close\r\n\r\n"))[0] == 405
+
+
+async def test_route_needs_a_query():
+    body = b'{"query": " "}'
+    request = b"POST /route HTTP/1.1\r\nConnection: close\r\nContent-Length: %d\r\n\r\n" % len(body)
+    status, reply = await exchange(request + body)
+    assert status == 400
+    assert "query" in reply["error"]
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from agents import ModelResponse, ModelSettings, Usage
+from agents.models.interface import ModelTracing
+from hedging import HedgingModelProvider
+from model_middleware import ModelCall
+from model_streaming import STREAM_METADATA_KEY
+from temporalio.testing import ActivityEnvironment
+
+FAST = 0.001
+SLOW = 0.2
+
+
+def model_call(agent: str = "Triage Agent", metadata: dict | None = None) -> ModelCall:
+    return ModelCall(
+        agent_name=agent,
+        model_name="gpt-4o",
+        system_instructions="Route the query.",
+        input="Bonjour",
+        model_settings=ModelSettings(metadata=metadata),
+        tools=[],
+        output_schema=None,
+        handoffs=[],
+        tracing=ModelTracing.DISABLED,
+    )
+
+
+class FakeModel:
+    """Answers after the next queued latency (FAST once the queue is empty)."""
+
+    def __init__(self, latencies: list[float] = ()):
+        self.latencies = list(latencies)
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, call: ModelCall) -> ModelResponse:
+        self.calls += 1
+        latency = self.latencies.pop(0) if self.latencies else FAST
+        try:
+            await asyncio.sleep(latency)
+        except asyncio.CancelledError:
+            # Cleanup that takes a moment, like closing the connection
+            await asyncio.sleep(FAST)
+            self.cancelled += 1
+            raise
+        return ModelResponse(output=[], usage=Usage(requests=1), response_id=str(latency))
+
+
+async def send(provider: HedgingModelProvider, model: FakeModel, **call) -> ModelResponse:
+    return await ActivityEnvironment().run(provider.handle, model_call(**call), model)
+
+
+async def warm_up(provider: HedgingModelProvider, model: FakeModel, calls: int) -> None:
+    for _ in range(calls):
+        await send(provider, model)
+
+
+async def test_no_hedging_without_enough_history():
+    provider = HedgingModelProvider(budget=1, min_samples=5)
+    model = FakeModel([SLOW])
+    await send(provider, model)
+    assert (model.calls, provider.stats.hedged) == (1, 0)
+
+
+async def test_first_call_without_a_history_minimum_is_not_hedged():
+    provider = HedgingModelProvider(budget=1, min_samples=0)
+    model = FakeModel()
+    await send(provider, model)
+    assert (model.calls, provider.stats.hedged) == (1, 0)
+
+
+async def test_slow_call_is_hedged_and_the_loser_cancelled():
+    provider = HedgingModelProvider(budget=0.5, min_samples=5)
+    model = FakeModel()
+    await warm_up(provider, model, 5)
+    model.latencies = [SLOW, FAST]  # The primary stalls, the hedge answers
+    response = await send(provider, model)
+    assert response.response_id == str(FAST)
+    assert (provider.stats.hedged, provider.stats.hedge_wins) == (1, 1)
+    # The loser has finished unwinding by the time the call returns
+    assert model.cancelled == 1
+
+
+async def test_hedges_stay_within_the_agent_budget():
+    provider = HedgingModelProvider(percentile=50, budget=0.25, max_credits=1, min_samples=30)
+    model = FakeModel()
+    # Too little history to hedge yet; saves up the most budget allowed: one hedge
+    await warm_up(provider, model, 30)
+    model.latencies = [SLOW] * 20
+    for _ in range(5):
+        await send(provider, model)
+    # The saved hedge, then another once four more calls earn it; the rest wait
+    assert provider.stats.hedged == 2
+    assert provider.stats.over_budget == 3
+
+
+async def test_budget_is_tracked_per_agent():
+    provider = HedgingModelProvider(budget=1, max_credits=1, min_samples=5)
+    model = FakeModel()
+    await warm_up(provider, model, 5)
+    model.latencies = [SLOW, FAST]
+    await send(provider, model, agent="French Agent")  # No history for this agent
+    assert provider.stats.hedged == 0
+
+
+@pytest.mark.parametrize(
+    "call",
+    [{"metadata": {STREAM_METADATA_KEY: "1"}}, {"agent": "English Agent"}],
+)
+async def test_streamed_and_excluded_calls_are_never_hedged(call):
+    provider = HedgingModelProvider(budget=1, min_samples=0, unhedged_agents=["English Agent"])
+    model = FakeModel([SLOW, SLOW])
+    await send(provider, model, **call)
+    assert (model.calls, provider.stats.hedged) == (1, 0)
+
+
+async def test_a_failed_hedge_falls_back_to_the_primary():
+    provider = HedgingModelProvider(budget=1, min_samples=5)
+    model = FakeModel()
+    await warm_up(provider, model, 5)
+    primary_started = asyncio.Event()
+
+    async def flaky(call: ModelCall) -> ModelResponse:
+        if not primary_started.is_set():
+            primary_started.set()
+            return await model(call)
+        raise RuntimeError("hedge failed")
+
+    model.latencies = [SLOW]
+    response = await ActivityEnvironment().run(provider.handle, model_call(), flaky)
+    assert response.response_id == str(SLOW)
+    assert provider.stats.hedge_wins == 0
@@ -0,0 +1,71 @@
+import logging
+
+import pytest
+from language_detection import detect_language
+from temporalio import workflow
+from workflow import (
+    ENGLISH_AGENT,
+    FAST_PATH_CONFIDENCE,
+    ROUTE_FAST_PATH,
+    ROUTE_STICKY,
+    ROUTE_TRIAGE,
+    SPANISH_AGENT,
+    TRIAGE_AGENT,
+    build_agents,
+    choose_starting_agent,
+)
+
+
+@pytest.fixture(scope="module")
+def agents():
+    return {agent.name: agent for agent in build_agents()}
+
+
+@pytest.fixture(autouse=True)
+def _workflow_logger(monkeypatch):
+    # choose_starting_agent logs through workflow.logger, which needs a running workflow
+    monkeypatch.setattr(workflow, "logger", logging.getLogger("routing-test"))
+
+
+@pytest.mark.parametrize(
+    "query, language",
+    [
+        ("Bonjour! Comment allez-vous aujourd'hui?", "French"),
+        ("¿Cuál es la capital de Francia? Necesito saberlo.", "Spanish"),
+        ("What is the capital of France? I need to know.", "English"),
+        ("Tres tristes tigres tragaban trigo en un trigal.", "Spanish"),
+    ],
+)
+def test_supported_languages_take_the_fast_path(agents, query, language):
+    detection = detect_language(query)
+    assert detection.language == language
+    assert detection.confidence >= FAST_PATH_CONFIDENCE
+    _, route, _ = choose_starting_agent(agents, query)
+    assert route == ROUTE_FAST_PATH
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        # Portuguese looks like Spanish, German like French
+        "Qual é a capital de Portugal?",
+        "Olá, tudo bem? Eu gostaria de saber o tempo em Lisboa amanhã.",
+        "Wie spät ist es? Ich möchte ein Bier bestellen, bitte.",
+        "Guten Morgen, können Sie mir helfen?",
+        # Too short to judge
+        "Hi!",
+        "¿Qué tal?",
+        # Mixed languages
+        "Hello, je voudrais una cerveza please",
+    ],
+)
+def test_unsupported_short_and_mixed_text_goes_to_triage(agents, query):
+    assert detect_language(query).confidence < FAST_PATH_CONFIDENCE
+    agent, route, _ = choose_starting_agent(agents, query)
+    assert (agent.name, route) == (TRIAGE_AGENT, ROUTE_TRIAGE)
+
+
+def test_unsupported_language_does_not_switch_a_sticky_conversation(agents):
+    agent, route, _ = choose_starting_agent(agents, "Qual é a capital de Portugal?", ENGLISH_AGENT)
+    assert (agent.name, route) == (ENGLISH_AGENT, ROUTE_STICKY)
+    assert agent.name != SPANISH_AGENT
@@ -0,0 +1,73 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import model_cache
+import pytest
+from model_cache import MemoryResponseCache, SqliteResponseCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(model_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_cache(request, tmp_path):
+    def make(max_entries: int, ttl_seconds: float):
+        if request.param == "memory":
+            return MemoryResponseCache(max_entries, ttl_seconds)
+        return SqliteResponseCache(tmp_path / "cache.sqlite", max_entries, ttl_seconds)
+
+    return make
+
+
+def test_entries_expire_after_the_ttl(clock, make_cache):
+    cache = make_cache(max_entries=10, ttl_seconds=60)
+    cache.put("a", b"1")
+    clock.now += 59
+    assert cache.get("a") == b"1"
+    clock.now += 1
+    assert cache.get("a") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock, make_cache):
+    cache = make_cache(max_entries=2, ttl_seconds=60)
+    cache.put("a", b"1")
+    clock.now += 1
+    cache.put("b", b"2")
+    clock.now += 1
+    assert cache.get("a") == b"1"  # Now more recently used than "b"
+    clock.now += 1
+    cache.put("c", b"3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (b"1", None, b"3")
+
+
+def test_put_replaces_an_entry_and_renews_its_ttl(clock, make_cache):
+    cache = make_cache(max_entries=10, ttl_seconds=60)
+    cache.put("a", b"old")
+    clock.now += 50
+    cache.put("a", b"new")
+    clock.now += 50
+    assert cache.get("a") == b"new"
+
+
+def test_concurrent_threads_keep_the_cache_consistent(make_cache):
+    cache = make_cache(max_entries=8, ttl_seconds=60)
+
+    def hammer(thread: int) -> None:
+        for i in range(500):
+            cache.put(f"{thread}-{i % 16}", b"x")
+            cache.get(f"{(thread + 1) % 4}-{i % 16}")
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(hammer, range(4)))
+    assert sum(cache.get(f"{t}-{i}") is not None for t in range(4) for i in range(16)) <= 8
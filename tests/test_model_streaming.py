@@ -0,0 +1,102 @@
+import dataclasses
+
+from agents import ModelSettings
+from agents.models.interface import ModelTracing
+from model_middleware import ModelCall
+from model_streaming import STREAM_METADATA_KEY, StreamingModelProvider
+from openai.types.responses import Response, ResponseCompletedEvent, ResponseTextDeltaEvent
+from routing_types import OutputChunk
+from temporalio.testing import ActivityEnvironment
+from workflow import OUTPUT_SIGNAL, RoutingWorkflow
+
+
+class FakeModel:
+    """Streams the given deltas, then a completed response."""
+
+    def __init__(self, deltas: list[str]):
+        self.deltas = deltas
+
+    async def stream_response(self, *args, **kwargs):
+        for sequence, delta in enumerate(self.deltas):
+            yield ResponseTextDeltaEvent(
+                type="response.output_text.delta",
+                item_id="msg",
+                output_index=0,
+                content_index=0,
+                delta=delta,
+                logprobs=[],
+                sequence_number=sequence,
+            )
+        yield ResponseCompletedEvent(
+            type="response.completed",
+            sequence_number=len(self.deltas),
+            response=Response(
+                id="fake-response",
+                created_at=0,
+                model="fake",
+                object="response",
+                output=[],
+                parallel_tool_calls=False,
+                tool_choice="auto",
+                tools=[],
+            ),
+        )
+
+
+class FakeHandle:
+    def __init__(self):
+        self.signals: list[tuple[str, OutputChunk]] = []
+
+    async def signal(self, name: str, chunk: OutputChunk) -> None:
+        self.signals.append((name, chunk))
+
+
+class FakeClient:
+    def __init__(self):
+        self.handle = FakeHandle()
+
+    def get_workflow_handle(self, workflow_id: str, run_id: str | None = None) -> FakeHandle:
+        return self.handle
+
+
+async def test_signals_carry_the_activity_attempt():
+    client = FakeClient()
+    env = ActivityEnvironment(client=client)
+    env.info = dataclasses.replace(env.info, activity_id="model-1", attempt=3)
+    call = ModelCall(
+        agent_name="French Agent",
+        model_name="gpt-4o",
+        system_instructions="Réponds en français.",
+        input="Bonjour",
+        model_settings=ModelSettings(metadata={STREAM_METADATA_KEY: "1"}),
+        tools=[],
+        output_schema=None,
+        handoffs=[],
+        tracing=ModelTracing.DISABLED,
+        model=FakeModel(["Bon", "jour"]),
+    )
+    response = await env.run(StreamingModelProvider(OUTPUT_SIGNAL).handle, call, None)
+    assert response.response_id == "fake-response"
+    assert client.handle.signals == [(OUTPUT_SIGNAL, OutputChunk("model-1", 3, "Bonjour"))]
+    # The flag is stripped before the call reaches OpenAI
+    assert call.model_settings.metadata is None
+
+
+def test_retried_call_replaces_its_partial_output():
+    wf = RoutingWorkflow()
+    wf.append_output(OutputChunk("model-1", 1, "Bon"))
+    wf.append_output(OutputChunk("model-2", 1, "Hola"))
+    wf.append_output(OutputChunk("model-1", 2, "Bonjour"))
+    snapshot = wf.output_since(0)
+    assert snapshot.chunks == ["Hola", "Bonjour"]
+    assert snapshot.restarts == 1
+
+
+def test_late_signal_from_an_old_attempt_is_ignored():
+    wf = RoutingWorkflow()
+    wf.append_output(OutputChunk("model-1", 2, "Bonjour"))
+    wf.append_output(OutputChunk("model-1", 1, "Bon"))
+    wf.append_output(OutputChunk("model-1", 2, " !"))
+    snapshot = wf.output_since(1)
+    assert snapshot.chunks == [" !"]
+    assert snapshot.restarts == 0
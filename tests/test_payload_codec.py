@@ -0,0 +1,118 @@
+import json
+import os
+import random
+import time
+
+import pytest
+from claim_check import ENCODING as CLAIM_CHECK_ENCODING
+from claim_check import ClaimCheckCodec, FileBlobStore, collect, delete_stale, referenced_keys
+from payload_codec import ENCODING as COMPRESSION_ENCODING
+from payload_codec import CodecChain, CompressionCodec
+from temporalio.api.common.v1 import Header, Payload, Payloads
+from temporalio.api.history.v1 import (
+    ActivityTaskScheduledEventAttributes,
+    HistoryEvent,
+    WorkflowExecutionStartedEventAttributes,
+)
+
+
+def json_payload(value: object) -> Payload:
+    return Payload(metadata={"encoding": b"json/plain"}, data=json.dumps(value).encode())
+
+
+LARGE = json_payload({"text": "routing " * 1000})
+SMALL = json_payload({"text": "hi"})
+
+
+async def test_compression_round_trip_skips_small_payloads():
+    codec = CompressionCodec(min_bytes=1024)
+    encoded = await codec.encode([LARGE, SMALL])
+    assert encoded[0].metadata["encoding"] == COMPRESSION_ENCODING
+    assert encoded[0].ByteSize() < LARGE.ByteSize()
+    assert encoded[1] == SMALL
+    assert await codec.decode(encoded) == [LARGE, SMALL]
+
+
+async def test_incompressible_payloads_are_left_alone():
+    noise = Payload(metadata={"encoding": b"binary/plain"}, data=random.Random(0).randbytes(4096))
+    assert await CompressionCodec(min_bytes=0).encode([noise]) == [noise]
+
+
+async def test_codec_chain_compresses_then_offloads(tmp_path):
+    store = FileBlobStore(tmp_path)
+    chain = CodecChain([CompressionCodec(min_bytes=1024), ClaimCheckCodec(store, min_bytes=64)])
+    encoded = await chain.encode([LARGE, SMALL])
+    assert encoded[0].metadata["encoding"] == CLAIM_CHECK_ENCODING
+    assert encoded[1] == SMALL
+    assert list(store.keys()) == [encoded[0].data.decode()]
+    assert await chain.decode(encoded) == [LARGE, SMALL]
+
+
+async def test_claim_check_detects_corrupt_blobs(tmp_path):
+    store = FileBlobStore(tmp_path)
+    codec = ClaimCheckCodec(store, min_bytes=64)
+    [reference] = await codec.encode([LARGE])
+    key = reference.data.decode()
+    (tmp_path / key[:2] / key).write_bytes(b"tampered")
+    with pytest.raises(ValueError, match="corrupt"):
+        await codec.decode([reference])
+    store.delete(key)
+    with pytest.raises(LookupError, match="missing"):
+        await codec.decode([reference])
+
+
+def reference(key: str) -> Payload:
+    return Payload(metadata={"encoding": CLAIM_CHECK_ENCODING}, data=key.encode())
+
+
+def test_referenced_keys_finds_nested_repeated_and_map_payloads():
+    started = HistoryEvent(
+        workflow_execution_started_event_attributes=WorkflowExecutionStartedEventAttributes(
+            input=Payloads(payloads=[SMALL, reference("input-key")]),
+            header=Header(fields={"context": reference("header-key"), "plain": SMALL}),
+        )
+    )
+    scheduled = HistoryEvent(
+        activity_task_scheduled_event_attributes=ActivityTaskScheduledEventAttributes(
+            input=Payloads(payloads=[reference("activity-key")])
+        )
+    )
+    keys = {key for event in (started, scheduled) for key in referenced_keys(event)}
+    assert keys == {"input-key", "header-key", "activity-key"}
+
+
+def test_collect_keeps_referenced_and_recent_blobs(tmp_path):
+    store = FileBlobStore(tmp_path)
+    for key in ("kept", "garbage"):
+        store.put(key, b"data")
+    assert collect(store, referenced={"kept"}, min_age_seconds=-1) == ["garbage"]
+    assert collect(store, referenced={"kept"}, min_age_seconds=3600) == []
+
+
+def test_put_rewrites_a_blob_collected_while_it_was_stored(tmp_path, monkeypatch):
+    store = FileBlobStore(tmp_path)
+    store.put("key", b"data")
+    utime = os.utime
+
+    def collected_first(path, *args, **kwargs):
+        store.delete("key")
+        utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(os, "utime", collected_first)
+    store.put("key", b"data")
+    assert store.get("key") == b"data"
+
+
+def test_blobs_stored_again_after_collection_are_not_deleted(tmp_path):
+    store = FileBlobStore(tmp_path)
+    hour_ago = time.time() - 3600
+    for key in ("stale", "stored-again"):
+        store.put(key, b"data")
+        os.utime(store._path(key), (hour_ago, hour_ago))
+    garbage = collect(store, referenced=set(), min_age_seconds=60)
+    assert sorted(garbage) == ["stale", "stored-again"]
+
+    store.put("stored-again", b"data")
+    assert delete_stale(store, [*garbage, "deleted-already"], min_age_seconds=60) == ["stale"]
+    assert store.get("stale") is None
+    assert store.get("stored-again") == b"data"
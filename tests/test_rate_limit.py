@@ -0,0 +1,245 @@
+import asyncio
+import dataclasses
+import math
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import rate_limit
+from agents import ModelSettings
+from agents.models.interface import ModelTracing
+from model_middleware import ModelCall
+from rate_limit import (
+    AdaptiveConcurrency,
+    MemoryTokenBucket,
+    RateLimitedModelProvider,
+    SqliteTokenBucket,
+    estimate_tokens,
+)
+from temporalio.exceptions import ApplicationError
+from temporalio.testing import ActivityEnvironment
+from workflow import ENGLISH_AGENT, RoutingWorkflow, build_agents
+from workflow_harness import ScriptedModel, ScriptedModelProvider, routing_worker
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_bucket(request, tmp_path):
+    def make(**limits):
+        if request.param == "memory":
+            return MemoryTokenBucket(**limits)
+        return SqliteTokenBucket(tmp_path / "limit.sqlite", **limits)
+
+    return make
+
+
+def test_burst_then_callers_queue_behind_the_debt(clock, make_bucket):
+    # 60 requests/minute: one per second, ten seconds' burst
+    bucket = make_bucket(requests_per_minute=60)
+    assert [bucket.reserve(1, 0, math.inf) for _ in range(10)] == [0.0] * 10
+    assert bucket.reserve(1, 0, math.inf) == pytest.approx(1.0)
+    assert bucket.reserve(1, 0, math.inf) == pytest.approx(2.0)
+    clock.now += 2
+    assert bucket.reserve(1, 0, math.inf) == pytest.approx(1.0)
+
+
+def test_nothing_is_reserved_when_the_wait_is_too_long(clock, make_bucket):
+    bucket = make_bucket(requests_per_minute=60, burst_seconds=1)
+    assert bucket.reserve(1, 0, 0) == 0.0
+    assert bucket.reserve(1, 0, 0.5) == pytest.approx(1.0)
+    # The refused call took nothing, so the next one waits the same
+    assert bucket.reserve(1, 0, math.inf) == pytest.approx(1.0)
+
+
+def test_token_estimates_are_corrected_after_the_call(clock, make_bucket):
+    # 100 tokens/second, 1000 burst
+    bucket = make_bucket(tokens_per_minute=6000)
+    assert bucket.reserve(1, 1500, math.inf) == pytest.approx(5.0)
+    bucket.adjust(-1000)  # The call used 1000 fewer tokens than estimated
+    assert bucket.reserve(1, 500, math.inf) == 0.0
+
+
+def test_refunds_return_a_reservation_up_to_the_capacity(clock, make_bucket):
+    bucket = make_bucket(requests_per_minute=60, burst_seconds=2)
+    assert bucket.reserve(1, 0, math.inf) == 0.0
+    bucket.refund(1, 0)
+    bucket.refund(1, 0)  # More than was taken: the burst stays at two requests
+    assert [bucket.reserve(1, 0, math.inf) for _ in range(3)] == pytest.approx([0, 0, 1])
+
+
+def test_drain_pauses_every_caller(clock, make_bucket):
+    bucket = make_bucket(requests_per_minute=60)
+    bucket.drain(5)
+    assert bucket.reserve(1, 0, math.inf) == pytest.approx(6.0)
+
+
+def test_sqlite_bucket_is_shared_between_instances(clock, tmp_path):
+    path = tmp_path / "limit.sqlite"
+    first = SqliteTokenBucket(path, requests_per_minute=60, burst_seconds=2)
+    second = SqliteTokenBucket(path, requests_per_minute=60, burst_seconds=2)
+    assert first.reserve(1, 0, math.inf) == 0.0
+    assert second.reserve(1, 0, math.inf) == 0.0
+    assert first.reserve(1, 0, math.inf) == pytest.approx(1.0)
+
+
+def test_concurrency_grows_additively_and_halves_on_429(clock):
+    concurrency = AdaptiveConcurrency(maximum=20, initial=4)
+    for _ in range(8):
+        concurrency.on_success("gpt-4o", 1.0)
+    assert 5 < concurrency.limit < 6
+    concurrency.on_overload()
+    assert 2.5 < concurrency.limit < 3
+
+
+def test_only_one_decrease_per_round_trip(clock):
+    concurrency = AdaptiveConcurrency(maximum=20, initial=16)
+    concurrency.on_success("gpt-4o", 1.0)
+    concurrency.on_overload()
+    limit = concurrency.limit
+    concurrency.on_overload()  # Same round trip: the same overload
+    assert concurrency.limit == limit
+    clock.now += 2
+    concurrency.on_overload()
+    assert concurrency.limit == pytest.approx(limit / 2)
+
+
+def test_rising_latency_shrinks_the_limit(clock):
+    concurrency = AdaptiveConcurrency(maximum=64, initial=32)
+    for _ in range(20):
+        concurrency.on_success("gpt-4o", 1.0)
+    before = concurrency.limit
+    clock.now += 10
+    for _ in range(3):
+        concurrency.on_success("gpt-4o", 10.0)
+    assert concurrency.limit < before
+
+
+def test_limit_stays_within_bounds(clock):
+    concurrency = AdaptiveConcurrency(maximum=3, initial=3, minimum=2)
+    for _ in range(50):
+        concurrency.on_success(None, 1.0)
+    assert concurrency.limit == 3
+    for _ in range(5):
+        clock.now += 10
+        concurrency.on_overload()
+    assert concurrency.limit == 2
+
+
+async def test_acquire_waits_for_a_free_slot():
+    concurrency = AdaptiveConcurrency(maximum=1, initial=1)
+    assert await concurrency.acquire(timeout=0)
+    assert not await concurrency.acquire(timeout=0.01)
+    concurrency.release()
+    assert await concurrency.acquire(timeout=0)
+
+
+def model_call() -> ModelCall:
+    return ModelCall(
+        agent_name="Triage Agent",
+        model_name="gpt-4o",
+        system_instructions="Route the query.",
+        input="Bonjour",
+        model_settings=ModelSettings(),
+        tools=[],
+        output_schema=None,
+        handoffs=[],
+        tracing=ModelTracing.DISABLED,
+    )
+
+
+def activity_env(start_to_close_seconds: float) -> ActivityEnvironment:
+    """An activity context whose attempt started now; calls may wait half its time."""
+    env = ActivityEnvironment()
+    env.info = dataclasses.replace(
+        env.info,
+        started_time=datetime.now(timezone.utc),
+        start_to_close_timeout=timedelta(seconds=start_to_close_seconds),
+    )
+    return env
+
+
+async def test_call_deferred_for_concurrency_gives_back_its_reservation():
+    bucket = MemoryTokenBucket(requests_per_minute=60, tokens_per_minute=60_000, burst_seconds=1)
+    concurrency = AdaptiveConcurrency(maximum=1, initial=1)
+    assert await concurrency.acquire(timeout=0)  # Every slot is taken
+    provider = RateLimitedModelProvider(bucket, concurrency)
+    call = model_call()
+    # Waits 0.05 seconds for a slot, then defers
+    with pytest.raises(ApplicationError, match="calls in flight"):
+        await activity_env(0.1).run(provider.handle, call, None)
+    assert provider.stats.deferred == 1
+    # The burst holds one request: still there, so the retry need not wait
+    assert bucket.reserve(1, estimate_tokens(call), 0) == 0.0
+
+
+async def test_call_cancelled_while_throttled_gives_back_its_reservation():
+    # One request per second, one second's burst, already spent
+    bucket = MemoryTokenBucket(requests_per_minute=60, burst_seconds=1)
+    assert bucket.reserve(1, 0, math.inf) == 0.0
+    provider = RateLimitedModelProvider(bucket, AdaptiveConcurrency())
+    task = asyncio.create_task(activity_env(10).run(provider.handle, model_call(), None))
+    await asyncio.sleep(0.05)  # Waiting out the rate limit
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    # Only the first call's debt remains: about a second, not two
+    assert bucket.reserve(1, 0, math.inf) < 1.0
+
+
+class DeferringBucket:
+    """A host limit that defers the first ``deferrals`` calls, then lets calls through."""
+
+    def __init__(self, deferrals: int):
+        self.deferrals = deferrals
+        self.reservations = 0
+
+    def reserve(self, requests: float, tokens: float, max_wait: float) -> float:
+        self.reservations += 1
+        return max_wait + 1 if self.reservations <= self.deferrals else 0.0
+
+    def adjust(self, tokens: float) -> None:
+        pass
+
+    def refund(self, requests: float, tokens: float) -> None:
+        pass
+
+    def drain(self, seconds: float) -> None:
+        pass
+
+
+async def test_workflow_completes_however_often_its_model_call_is_deferred(workflow_env):
+    model = ScriptedModel()
+    limiter = RateLimitedModelProvider(
+        DeferringBucket(deferrals=8),
+        AdaptiveConcurrency(),
+        ScriptedModelProvider(model),
+        agents=build_agents(),
+    )
+    query = "Hi! Could you tell me a tongue twister that is fun to say out loud?"
+    async with routing_worker(workflow_env.client, limiter) as (client, task_queue):
+        result = await client.execute_workflow(
+            RoutingWorkflow.run,
+            query,
+            id=f"test-deferred-{task_queue}",
+            task_queue=task_queue,
+        )
+    # More deferrals than a typical attempt limit, then one real call
+    assert limiter.stats.deferred == 8
+    assert model.calls == [ENGLISH_AGENT]
+    assert result.response == f"Response: {ENGLISH_AGENT}: {query}"
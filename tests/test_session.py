@@ -0,0 +1,223 @@
+import asyncio
+
+import pytest
+from routing_types import SessionConfig, SessionInput, SessionState
+from session import RoutingSessionWorkflow, estimate_tokens
+from temporalio import workflow
+from temporalio.client import Client, WorkflowHandle
+from workflow import (
+    ENGLISH_AGENT,
+    FRENCH_AGENT,
+    ROUTE_FAST_PATH,
+    ROUTE_STICKY,
+    ROUTING_OUTCOMES_METRIC,
+    SUMMARIZER_AGENT,
+    TRIAGE_AGENT,
+)
+from workflow_harness import (
+    SUMMARY,
+    ScriptedModel,
+    ScriptedModelProvider,
+    metric_total,
+    routing_worker,
+)
+
+ENGLISH_QUESTIONS = [
+    "Could you recommend a good book for the holidays, please?",
+    "What is the weather usually like in Lisbon in the spring?",
+]
+FRENCH_QUESTION = "Bonjour ! Pouvez-vous me recommander un bon livre pour les vacances ?"
+# Too short to classify, so a session with a specialist stays with it
+FOLLOW_UP = "ok"
+
+
+async def start_session(
+    client: Client,
+    task_queue: str,
+    config: SessionConfig | None = None,
+    state: SessionState | None = None,
+) -> WorkflowHandle:
+    return await client.start_workflow(
+        RoutingSessionWorkflow.run,
+        SessionInput(config=config or SessionConfig(), state=state),
+        id=f"test-session-{task_queue}",
+        task_queue=task_queue,
+    )
+
+
+async def test_concurrent_messages_are_answered_one_at_a_time(workflow_env):
+    # Slow enough that the second update arrives while the first is answered
+    model = ScriptedModel(latency={ENGLISH_AGENT: 0.2})
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(model)) as (
+        client,
+        task_queue,
+    ):
+        handle = await start_session(client, task_queue)
+        replies = await asyncio.gather(
+            *(
+                handle.execute_update(RoutingSessionWorkflow.send_message, question)
+                for question in ENGLISH_QUESTIONS
+            )
+        )
+        await handle.signal(RoutingSessionWorkflow.end_session)
+        state = await handle.result()
+
+    assert sorted(reply.turn for reply in replies) == [1, 2]
+    assert state.turns == 2
+    # Each answer directly follows its question
+    questions, answers = state.messages[::2], state.messages[1::2]
+    assert sorted(message["content"] for message in questions) == sorted(ENGLISH_QUESTIONS)
+    for question, answer in zip(questions, answers, strict=True):
+        assert question["role"] == "user"
+        assert answer == {"role": "assistant", "content": f"{ENGLISH_AGENT}: {question['content']}"}
+
+
+async def test_idle_session_ends(workflow_env):
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(ScriptedModel())) as (
+        client,
+        task_queue,
+    ):
+        handle = await start_session(client, task_queue, SessionConfig(idle_timeout_seconds=60))
+        await handle.execute_update(RoutingSessionWorkflow.send_message, ENGLISH_QUESTIONS[0])
+        # The test server skips the idle minute
+        state = await handle.result()
+    assert state.turns == 1
+    assert state.runs == 1
+
+
+async def test_end_session_returns_the_conversation(workflow_env):
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(ScriptedModel())) as (
+        client,
+        task_queue,
+    ):
+        handle = await start_session(client, task_queue)
+        reply = await handle.execute_update(
+            RoutingSessionWorkflow.send_message, ENGLISH_QUESTIONS[0]
+        )
+        await handle.signal(RoutingSessionWorkflow.end_session)
+        state = await handle.result()
+    assert reply.response == f"{ENGLISH_AGENT}: {ENGLISH_QUESTIONS[0]}"
+    assert state.turns == 1
+    assert state.messages[-1] == {"role": "assistant", "content": reply.response}
+
+
+async def test_follow_up_stays_with_the_specialist(workflow_env, metrics):
+    model = ScriptedModel()
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(model)) as (
+        client,
+        task_queue,
+    ):
+        handle = await start_session(client, task_queue)
+        first = await handle.execute_update(RoutingSessionWorkflow.send_message, FRENCH_QUESTION)
+        follow_up = await handle.execute_update(RoutingSessionWorkflow.send_message, FOLLOW_UP)
+        await handle.signal(RoutingSessionWorkflow.end_session)
+        state = await handle.result()
+
+    assert (first.route, first.agent) == (ROUTE_FAST_PATH, FRENCH_AGENT)
+    assert (follow_up.route, follow_up.agent) == (ROUTE_STICKY, FRENCH_AGENT)
+    assert TRIAGE_AGENT not in model.calls
+    assert state.agent == FRENCH_AGENT
+    assert state.triage_avoided == 1
+    updates = metrics.retrieve_updates()
+    assert metric_total(updates, ROUTING_OUTCOMES_METRIC, route=ROUTE_STICKY) == 1
+
+
+def earlier_conversation(turns: int) -> list[dict[str, str]]:
+    """Alternating question and answer messages for a session being resumed."""
+    messages = []
+    for turn in range(turns):
+        question = f"Question number {turn}: what else would you recommend reading?"
+        messages += [
+            {"role": "user", "content": question},
+            {"role": "assistant", "content": f"{FRENCH_AGENT}: {question}"},
+        ]
+    return messages
+
+
+async def test_turns_are_summarized_once_the_prompt_passes_the_budget(workflow_env):
+    messages = earlier_conversation(4)
+    # The first follow-up fits exactly; the second one does not
+    budget = estimate_tokens([*messages, {"role": "user", "content": FOLLOW_UP}])
+    config = SessionConfig(prompt_token_budget=budget, keep_recent_messages=2)
+    state = SessionState(messages=messages, turns=4, agent=FRENCH_AGENT)
+    model = ScriptedModel()
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(model)) as (
+        client,
+        task_queue,
+    ):
+        handle = await start_session(client, task_queue, config, state)
+        at_budget = await handle.execute_update(RoutingSessionWorkflow.send_message, FOLLOW_UP)
+        over_budget = await handle.execute_update(RoutingSessionWorkflow.send_message, FOLLOW_UP)
+        await handle.signal(RoutingSessionWorkflow.end_session)
+        state = await handle.result()
+
+    assert not at_budget.compacted
+    assert at_budget.prompt_tokens == budget
+    assert over_budget.compacted
+    assert over_budget.prompt_tokens < budget
+    assert model.calls.count(SUMMARIZER_AGENT) == 1
+    assert state.summary == SUMMARY
+    assert state.compactions == 1
+    # The follow-ups are kept verbatim, everything before them is summarized
+    follow_up_turn = [
+        {"role": "user", "content": FOLLOW_UP},
+        {"role": "assistant", "content": f"{FRENCH_AGENT}: {FOLLOW_UP}"},
+    ]
+    assert state.messages == follow_up_turn * 2
+
+
+def server_suggests_continue_as_new_at(events: int):
+    """Stand-in for Info.is_continue_as_new_suggested on a server configured to suggest it."""
+    return lambda info: info.get_current_history_length() >= events
+
+
+@pytest.mark.parametrize("trigger", ["history-length", "server-suggested"])
+async def test_conversation_carries_over_continue_as_new(workflow_env, monkeypatch, trigger):
+    # One answered turn takes the history past eight events
+    if trigger == "history-length":
+        config = SessionConfig(max_history_events=8)
+    else:
+        config = SessionConfig()
+        monkeypatch.setattr(
+            workflow.Info, "is_continue_as_new_suggested", server_suggests_continue_as_new_at(8)
+        )
+    earlier = SessionState(
+        messages=earlier_conversation(1),
+        summary=SUMMARY,
+        turns=5,
+        compactions=2,
+        agent=FRENCH_AGENT,
+        triage_avoided=3,
+    )
+    model = ScriptedModel()
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(model)) as (
+        client,
+        task_queue,
+    ):
+        first_run = await start_session(client, task_queue, config, earlier)
+        await first_run.execute_update(RoutingSessionWorkflow.send_message, FOLLOW_UP)
+
+        # Without a run ID the handle follows the session to its latest run
+        session = client.get_workflow_handle(first_run.id)
+        for _ in range(100):
+            state = await session.query(RoutingSessionWorkflow.conversation)
+            if state.runs == 2:
+                break
+            await asyncio.sleep(0.1)
+        assert state.runs == 2
+        assert state.summary == SUMMARY
+        assert state.agent == FRENCH_AGENT
+        assert (state.turns, state.compactions, state.triage_avoided) == (6, 2, 4)
+        assert state.messages[-1] == {
+            "role": "assistant",
+            "content": f"{FRENCH_AGENT}: {FOLLOW_UP}",
+        }
+
+        # The new run still skips triage for the specialist
+        reply = await session.execute_update(RoutingSessionWorkflow.send_message, FOLLOW_UP)
+        await session.signal(RoutingSessionWorkflow.end_session)
+        state = await session.result()
+
+    assert (reply.route, reply.agent, reply.turn) == (ROUTE_STICKY, FRENCH_AGENT, 7)
+    assert TRIAGE_AGENT not in model.calls
+    assert state.triage_avoided == 5
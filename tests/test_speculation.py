@@ -0,0 +1,71 @@
+from workflow import (
+    ENGLISH_AGENT,
+    FRENCH_AGENT,
+    ROUTE_TRIAGE,
+    SPANISH_AGENT,
+    SPECULATION_HIT,
+    SPECULATION_MISS,
+    SPECULATION_SAVED_METRIC,
+    SPECULATIVE_BRANCHES_METRIC,
+    TRIAGE_AGENT,
+    RoutingWorkflow,
+)
+from workflow_harness import ScriptedModel, ScriptedModelProvider, metric_total, routing_worker
+
+# Too short for the classifier, so it goes to triage. Ranked English, French, Spanish.
+AMBIGUOUS = "¿Qué tal?"
+
+
+async def test_triage_choosing_a_speculated_specialist_uses_its_branch(workflow_env, metrics):
+    # English would still be answering when triage picks French
+    model = ScriptedModel(
+        route=lambda message: FRENCH_AGENT,
+        latency={TRIAGE_AGENT: 0.1, FRENCH_AGENT: 0.05, ENGLISH_AGENT: 1.0},
+    )
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(model)) as (
+        client,
+        task_queue,
+    ):
+        result = await client.execute_workflow(
+            RoutingWorkflow.run,
+            args=[AMBIGUOUS, False, 2],
+            id=f"test-speculation-hit-{task_queue}",
+            task_queue=task_queue,
+        )
+    assert result.route == ROUTE_TRIAGE
+    assert result.speculation == SPECULATION_HIT
+    assert result.agent == FRENCH_AGENT
+    assert result.response == f"Response: {FRENCH_AGENT}: {AMBIGUOUS}"
+    # No second French call after triage: the speculative one was kept
+    assert model.calls.count(FRENCH_AGENT) == 1
+    assert model.calls.count(TRIAGE_AGENT) == 1
+
+    updates = metrics.retrieve_updates()
+    assert metric_total(updates, SPECULATIVE_BRANCHES_METRIC, outcome="hit") == 1
+    assert metric_total(updates, SPECULATIVE_BRANCHES_METRIC, outcome="wasted") == 1
+    assert [u for u in updates if u.metric.name == SPECULATION_SAVED_METRIC]
+
+
+async def test_triage_choosing_another_specialist_runs_it_after_triage(workflow_env, metrics):
+    model = ScriptedModel(route=lambda message: SPANISH_AGENT)
+    async with routing_worker(workflow_env.client, ScriptedModelProvider(model)) as (
+        client,
+        task_queue,
+    ):
+        # One branch: only English is speculated on
+        result = await client.execute_workflow(
+            RoutingWorkflow.run,
+            args=[AMBIGUOUS, False, 1],
+            id=f"test-speculation-miss-{task_queue}",
+            task_queue=task_queue,
+        )
+    assert result.speculation == SPECULATION_MISS
+    assert result.agent == SPANISH_AGENT
+    assert result.response == f"Response: {SPANISH_AGENT}: {AMBIGUOUS}"
+    assert model.calls[-1] == SPANISH_AGENT
+    assert FRENCH_AGENT not in model.calls
+
+    updates = metrics.retrieve_updates()
+    assert metric_total(updates, SPECULATIVE_BRANCHES_METRIC, outcome="hit") == 0
+    assert metric_total(updates, SPECULATIVE_BRANCHES_METRIC, outcome="wasted") == 1
+    assert not [u for u in updates if u.metric.name == SPECULATION_SAVED_METRIC]
@@ -0,0 +1,135 @@
+"""Run the routing workflows on Temporal's time-skipping test server with a fake model.
+
+The ``workflow_env`` fixture (conftest.py) starts the server. Set
+TEMPORAL_SERVER_PATH to a pre-downloaded test server binary on machines
+without network access; without one those tests are skipped.
+"""
+
+import asyncio
+import uuid
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import asynccontextmanager
+from typing import Any
+
+from agent_config import MODEL_ACTIVITY_PARAMS, load_agent_config
+from agents import (
+    AgentOutputSchemaBase,
+    Handoff,
+    Model,
+    ModelProvider,
+    ModelResponse,
+    ModelSettings,
+    ModelTracing,
+    Tool,
+    TResponseInputItem,
+)
+from model_middleware import agent_names_by_instructions
+from sandbox import workflow_runner
+from session import RoutingSessionWorkflow
+from temporalio.client import Client
+from temporalio.contrib.openai_agents import OpenAIAgentsPlugin
+from temporalio.contrib.openai_agents.testing import ResponseBuilders
+from temporalio.runtime import BufferedMetricUpdate
+from temporalio.worker import Worker
+from workflow import ENGLISH_AGENT, SUMMARIZER_AGENT, RoutingWorkflow, build_agents
+
+SUMMARY = "The user asked for book recommendations."
+
+
+def last_user_text(input: str | list[TResponseInputItem]) -> str:
+    """The latest user message in a model input."""
+    if isinstance(input, str):
+        return input
+    for item in reversed(input):
+        if isinstance(item, dict) and item.get("role") == "user":
+            content = item.get("content")
+            return content if isinstance(content, str) else ""
+    return ""
+
+
+class ScriptedModel(Model):
+    """Stand-in for the OpenAI model.
+
+    Triage hands off to ``route(message)``, the summarizer returns SUMMARY
+    and every other agent answers "<agent>: <message>". Each call takes
+    ``latency[agent]`` seconds of real time.
+    """
+
+    def __init__(
+        self,
+        route: Callable[[str], str] = lambda message: ENGLISH_AGENT,
+        latency: dict[str, float] | None = None,
+    ):
+        self.route = route
+        self.latency = latency or {}
+        self.calls: list[str] = []
+        """Agent names, in the order their calls arrived."""
+        self.agent_names = agent_names_by_instructions(build_agents())
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchemaBase | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        **kwargs: Any,
+    ) -> ModelResponse:
+        agent = self.agent_names.get(system_instructions or "", "unknown")
+        self.calls.append(agent)
+        await asyncio.sleep(self.latency.get(agent, 0))
+        message = last_user_text(input)
+        if handoffs:
+            target = self.route(message)
+            handoff = next(h for h in handoffs if h.agent_name == target)
+            return ResponseBuilders.tool_call("{}", handoff.tool_name)
+        if agent == SUMMARIZER_AGENT:
+            return ResponseBuilders.output_message(SUMMARY)
+        return ResponseBuilders.output_message(f"{agent}: {message}")
+
+    def stream_response(self, *args: Any, **kwargs: Any) -> Any:
+        raise NotImplementedError("The workflow tests do not stream")
+
+
+class ScriptedModelProvider(ModelProvider):
+    def __init__(self, model: Model):
+        self.model = model
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.model
+
+
+def metric_total(updates: Sequence[BufferedMetricUpdate], name: str, **attributes: str) -> float:
+    """Sum of a counter's updates (from the ``metrics`` buffer) that carry ``attributes``."""
+    return sum(
+        update.value
+        for update in updates
+        if update.metric.name == name
+        and all(update.attributes.get(k) == v for k, v in attributes.items())
+    )
+
+
+@asynccontextmanager
+async def routing_worker(
+    env_client: Client, model_provider: ModelProvider
+) -> AsyncIterator[tuple[Client, str]]:
+    """Run a worker like worker.py's, with ``model_provider`` in place of OpenAI.
+
+    Yields a client with the agents plugin and the worker's task queue.
+    """
+    config = env_client.config()
+    config["plugins"] = [
+        OpenAIAgentsPlugin(model_params=MODEL_ACTIVITY_PARAMS, model_provider=model_provider)
+    ]
+    client = Client(**config)
+    task_queue = f"test-routing-{uuid.uuid4()}"
+    async with Worker(
+        client,
+        task_queue=task_queue,
+        workflows=[RoutingWorkflow, RoutingSessionWorkflow],
+        workflow_runner=workflow_runner(),
+        activities=[load_agent_config],
+    ):
+        yield client, task_queue